@@ -0,0 +1,87 @@
+#!/router/bin/python
+
+import functional_general_test
+from trex_stl_lib.trex_stl_async_client import CTRexStatsKeyRouter, CTRexAsyncStatsManager
+from trex_stl_lib.trex_stl_stats import CRxStreamStats
+from trex_stl_lib.trex_stl_alerts import CStatsAlertRule, CStatsAlertEngine
+from nose.tools import assert_equal
+
+
+class CStlAsyncStats_Test(functional_general_test.CGeneralFunctional_Test):
+
+    def test_key_router (self):
+        router = CTRexStatsKeyRouter()
+        snapshot = {'m_cpu_util': 1.5, 'unknown': 0, 'opackets-0': 10, 'opackets-9': 90, 'opackets-10': 100, 'm_total_tx_bps-63': 630}
+
+        general, ports = router.split(snapshot)
+        assert_equal(general, {'m_cpu_util': 1.5, 'unknown': 0})
+        assert_equal(ports, {0: {'opackets': 10}, 9: {'opackets': 90}, 10: {'opackets': 100}, 63: {'m_total_tx_bps': 630}})
+
+        # cached routes give the same result
+        assert_equal(router.split(snapshot), (general, ports))
+        assert_equal(router.route('ipackets-12'), (12, 'ipackets'))
+        assert_equal(router.route('-12'), None)
+
+
+    def test_stats_manager (self):
+        manager = CTRexAsyncStatsManager()
+        manager.update({'m_cpu_util': 3, 'obytes-11': 1000})
+
+        assert_equal(manager.get_general_stats().get('m_cpu_util'), 3)
+        assert_equal(manager.get_port_stats(11).get('obytes'), 1000)
+        assert_equal(manager.get_port_stats(1), None)
+
+
+    def test_rx_stats_aging (self):
+        rx_stats = CRxStreamStats()
+        rx_stats.update({'ts': {'value': 1000, 'freq': 1000}, 'flows': {'7': {'tx': {'0': 100}, 'rx': {'1': 100}}}})
+        rx_stats.update({'ts': {'value': 1500, 'freq': 1000}, 'flows': {'7': {'tx': {'0': 150}, 'rx': {'1': 150}}}})
+        assert_equal(rx_stats.get(0, 7)['tx_pps'], 100)
+        assert_equal(rx_stats.get_stats()[7]['rx_pkts']['total'], 150)
+
+        # the server stopped publishing - nothing is reported after a few intervals
+        rx_stats.last_update_ts -= 3 * 0.5 + 0.1
+        assert_equal(rx_stats.get(0, 7), None)
+        assert_equal(rx_stats.get_stats(), {})
+
+        # the next snapshot after the gap has no rates yet
+        rx_stats.update({'ts': {'value': 9000, 'freq': 1000}, 'flows': {'7': {'tx': {'0': 10}}}})
+        assert_equal(rx_stats.get(0, 7), {'tx_pkts': 10, 'rx_pkts': 0, 'tx_pps': 0.0, 'rx_pps': 0.0})
+
+    def test_rx_stats_readded (self):
+        rx_stats = CRxStreamStats()
+        rx_stats.update({'ts': {'value': 1000, 'freq': 1000}, 'flows': {'7': {'tx': {'0': 100}, 'rx': {'1': 100}}}})
+        rx_stats.clear()
+
+        # the stream is removed and added again with the same user_id - the server counts from 0
+        rx_stats.update({'ts': {'value': 1500, 'freq': 1000}, 'flows': {}})
+        rx_stats.update({'ts': {'value': 2000, 'freq': 1000}, 'flows': {'7': {'tx': {'0': 30}, 'rx': {'1': 20}}}})
+        stats = rx_stats.get_stats()[7]
+        assert_equal(stats['tx_pkts']['total'], 30)
+        assert_equal(stats['rx_pkts']['total'], 20)
+        assert_equal(stats['loss'], 10)
+
+        # re-added between two snapshots - the counters went back
+        rx_stats.clear()
+        rx_stats.update({'ts': {'value': 2500, 'freq': 1000}, 'flows': {'7': {'tx': {'0': 50}, 'rx': {'1': 40}}}})
+        assert_equal(rx_stats.get(0, 7)['tx_pkts'], 20)
+        rx_stats.update({'ts': {'value': 3000, 'freq': 1000}, 'flows': {'7': {'tx': {'0': 5}, 'rx': {'1': 5}}}})
+        assert_equal(rx_stats.get(0, 7)['tx_pkts'], 5)
+        assert_equal(rx_stats.get(1, 7)['rx_pkts'], 5)
+
+    def test_alerts_delta_scope (self):
+        engine = CStatsAlertEngine()
+        rule_id = engine.add(CStatsAlertRule('ierrors delta > 0', [0]))
+        engine.evaluate({}, {0: {'ierrors': 0}})
+
+        # errors while the port had no rules are not a delta of the next rule
+        engine.remove(rule_id)
+        engine.evaluate({}, {0: {'ierrors': 10}})
+        engine.add(CStatsAlertRule('ierrors delta > 0', [0]))
+        assert_equal(engine.evaluate({}, {0: {'ierrors': 10}}), [])
+        assert_equal(len(engine.evaluate({}, {0: {'ierrors': 11}})), 1)
+
+        # nor are errors before a clear
+        engine.clear()
+        assert_equal(engine.evaluate({}, {0: {'ierrors': 20}}), [])
+        assert_equal(engine.get_fired(), [])
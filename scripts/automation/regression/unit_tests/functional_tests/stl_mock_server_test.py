@@ -0,0 +1,376 @@
+#!/router/bin/python
+
+import functional_general_test
+from trex_stl_lib.api import *
+from trex_stl_lib.trex_stl_mock_server import STLMockServer
+from trex_stl_lib import trex_stl_stats
+from trex_stl_lib import trex_stl_rpc_replay
+from trex_stl_lib.trex_stl_metrics_exporter import STLMetricsExporter
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+import os
+import tempfile
+import time
+import urllib2
+
+# runs the stateless client against the mock server
+class CStlMockServer_Test(functional_general_test.CGeneralFunctional_Test):
+
+    def setUp (self):
+        self.server = STLMockServer(port_count = 4, sync_port = 14801, async_port = 14800, stats_rate = 20)
+        self.server.start()
+
+        self.c = STLClient(server = '127.0.0.1', sync_port = 14801, async_port = 14800)
+        self.c.connect()
+        self.c.reset()
+
+    def tearDown (self):
+        self.c.disconnect()
+        self.server.stop()
+
+    def pkt (self):
+        return STLPktBuilder(pkt = Ether()/IP()/UDP())
+
+    def test_streams (self):
+        self.c.add_streams([STLStream(name = 'a', packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 10), next = 'b'),
+                            STLStream(name = 'b', packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 10))],
+                           ports = [0, 1])
+
+        # streams survive a reconnect
+        self.c.connect()
+        self.c.acquire(force = True)
+        streams = self.c.ports[0].get_all_streams()
+        assert_equal(len(streams), 2)
+        assert_equal(streams[1]['next_id'], 2)
+
+        # 'get_pkt' is optional - packets are returned by default
+        rc = self.c._transmit("get_all_streams", {"port_id": 0})
+        assert(rc)
+        assert('packet' in rc.data()['streams']['1'])
+
+        self.c.remove_all_streams(ports = [0])
+        assert_equal(self.c.ports[0].get_all_streams(), {})
+        assert_equal(len(self.c.ports[1].get_all_streams()), 2)
+
+
+    def test_streams_chunks (self):
+        port = self.c.ports[0]
+        port.ADD_STREAMS_CHUNK_SIZE = 2
+
+        # requests in flight when each chunk is sent
+        in_flight = []
+        transmit_batch_async = port.comm_link.transmit_batch_async
+        def transmit (batch_list):
+            in_flight.append(len(port.comm_link.rpc_link.in_flight))
+            return transmit_batch_async(batch_list)
+        port.comm_link.transmit_batch_async = transmit
+
+        uploaded = []
+        try:
+            rc = port.add_streams([STLStream(packet = self.pkt(), mode = STLTXCont()) for _ in range(5)],
+                                  progress = lambda port_id, count, total: uploaded.append(count))
+        finally:
+            del port.comm_link.transmit_batch_async
+
+        assert(rc)
+        assert_equal(in_flight, [0, 1, 1])
+        assert_equal(uploaded, [2, 4, 5])
+        assert_equal(len(port.get_all_streams()), 5)
+
+
+    def test_not_pipelined (self):
+        c = STLClient(server = '127.0.0.1', sync_port = 14801, async_port = 14800, pipelined = False)
+        c.connect()
+        try:
+            assert_equal(c.comm_link.rpc_link.pipelined, False)
+            c.reset()
+            c.add_streams(STLStream(packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 10)), ports = [0])
+            assert_equal(len(c.ports[0].get_all_streams()), 1)
+        finally:
+            c.disconnect()
+
+    def test_codecs (self):
+        # the server reports its codecs with its version
+        assert_equal(self.c.get_server_version()['codecs'], ['zlib'])
+        assert('codec:zlib' not in self.c.get_server_supported_cmds())
+
+        # a packet large enough to be compressed
+        pkt = STLPktBuilder(pkt = Ether()/IP()/UDP()/('x' * 5000))
+        self.c.add_streams(STLStream(packet = pkt, mode = STLTXSingleBurst(total_pkts = 10)), ports = [0])
+
+        codecs = self.c.get_rpc_stats()['add_stream']['codecs']
+        assert_equal(codecs.keys(), ['zlib-fast'])
+        assert(codecs['zlib-fast']['ratio'] > 1)
+
+    def test_rpc_replay (self):
+        filename = tempfile.mktemp(suffix = '.rpc')
+        try:
+            self.c.start_rpc_recording(filename)
+            self.c.reset(ports = [0])
+            self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXCont(pps = 100)), ports = [0])
+            self.c.start(ports = [0])
+            self.c.stop(ports = [0])
+            self.c.release(ports = [0])
+            self.c.stop_rpc_recording()
+
+            records = trex_stl_rpc_replay.load_records(filename)
+            methods = [record['method'] for record in records]
+            assert('acquire' in methods)
+            assert('start_traffic' in methods)
+            assert(all(0 <= record['rtt'] < 1 for record in records))
+
+            # one recorded success turned into a failure
+            start = methods.index('start_traffic')
+            records[start]['response'] = '{"id": 1, "jsonrpc": "2.0", "error": {"code": -32000, "message": "recorded failure"}}'
+
+            summary = trex_stl_rpc_replay.RpcReplayer(records, '127.0.0.1', 14801).run()
+            assert_equal(summary['requests'], len(records))
+            assert_equal(summary['mismatch'], 1)
+            assert_equal(summary['methods']['start_traffic']['mismatch'], 1)
+
+            # the port was acquired again - the recorded handler is sent as the new one
+            old, new = summary['handlers'].items()[0]
+            assert(old != new)
+            assert_equal(self.server.ports[0].handler, '')
+        finally:
+            os.remove(filename)
+
+    def test_stats_history (self):
+        # off by default - nothing is allocated
+        assert(not self.c.global_stats.has_history())
+        assert(not self.c.ports[0].port_stats.has_history())
+        assert_equal(self.c.ports[0].port_stats.get_window('m_total_tx_pps'), None)
+
+        c = STLClient(server = '127.0.0.1', sync_port = 14801, async_port = 14800, stats_history = 60)
+        c.connect()
+        try:
+            c.get_stats(ports = [0], min_seq = c.get_stats_seq() + 3)
+            assert_equal(len(c.ports[0].port_stats.series.ts), 120)
+            assert(c.ports[0].port_stats.get_window('m_total_tx_pps', 'max') != None)
+            assert(c.global_stats.get_rollup('m_cpu_util', resolution = 1))
+        finally:
+            c.disconnect()
+
+    def test_stats_rollup (self):
+        assert_raises(STLError, self.c.get_stats_rollup, [0], 'm_total_tx_pps')
+        assert('trex_port_tx_pps_1m_avg' not in STLMetricsExporter(self.c).render())
+
+        c = STLClient(server = '127.0.0.1', sync_port = 14801, async_port = 14800, stats_history = 300)
+        c.connect()
+        try:
+            c.get_stats(ports = [0], min_seq = c.get_stats_seq() + 3)
+
+            rollups = c.get_stats_rollup(0, 'm_total_tx_pps', resolution = 1)
+            assert_equal(sorted(rollups.keys()), [0, 'global'])
+            assert(rollups[0])
+            assert_raises(STLArgumentError, c.get_stats_rollup, [0], 'm_total_tx_pps', resolution = 5)
+            assert_raises(STLArgumentError, c.get_stats_rollup, [7], 'm_total_tx_pps')
+        finally:
+            c.disconnect()
+
+        # a closed minute of port 0 - exported as the average and peak of the last minute
+        minute = (int(time.time()) / 60 - 1) * 60
+        stats = c.ports[0].port_stats
+        stats.rollups = trex_stl_stats.CStatsRollup(trex_stl_stats.CStatsRollup.get_levels(300))
+        for ts, pps in [(minute + 5, 100.0), (minute + 15, 300.0), (minute + 65, 0.0), (minute + 75, 0.0), (minute + 76, 0.0)]:
+            stats.rollups.append(ts, {'m_total_tx_pps': pps})
+
+        lines = STLMetricsExporter(c).render().splitlines()
+        assert('trex_port_tx_pps_1m_avg{port="0"} 200.0' in lines)
+        assert('trex_port_tx_pps_1m_max{port="0"} 300.0' in lines)
+
+
+    def test_traffic (self):
+        self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 20, pps = 200)), ports = [0])
+        self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXCont(pps = 1000)), ports = [1])
+
+        self.c.start(ports = [0, 1])
+        self.c.wait_on_traffic(ports = [0], timeout = 5)
+
+        stats = self.c.get_stats()
+        assert_equal(stats[0]['opackets'], 20)
+        assert_equal(self.c.get_active_ports(), [1])
+
+        self.c.stop(ports = [1])
+        assert_equal(self.c.get_active_ports(), [])
+
+        # above line rate
+        self.c.start(ports = [1], mult = "100gbps", force = True)
+        self.c.stop(ports = [1])
+        assert_raises(STLError, self.c.start, ports = [1], mult = "100gbps")
+
+
+    def test_wait (self):
+        done = []
+        self.c.register_event_callback(lambda type, data: done.append(data['port_id']), event_types = [4])
+
+        self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 10, pps = 100)), ports = [0])
+        self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXCont(pps = 100)), ports = [1])
+        self.c.start(ports = [0, 1])
+
+        assert_equal(self.c.wait_any(ports = [0, 1], state = 'idle', timeout = 5), [0])
+        assert_equal(done, [0])
+        assert_raises(STLTimeoutError, self.c.wait_for, ports = [1], state = 'idle', timeout = 0.2)
+
+        self.c.stop(ports = [1])
+        self.c.wait_for(ports = [0, 1], state = 'idle', timeout = 1)
+
+    def test_wait_latency (self):
+        done = []
+        self.c.register_event_callback(lambda type, data: done.append(time.time()), event_types = [4])
+
+        # best of a few runs - the waiter should wake right after the event
+        latency = []
+        for i in xrange(3):
+            self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 10, pps = 100)), ports = [0])
+            self.c.start(ports = [0])
+            self.c.wait_for(ports = [0], state = 'idle', timeout = 5)
+            latency.append(time.time() - done[-1])
+            self.c.remove_all_streams(ports = [0])
+
+        assert(min(latency) < 0.005)
+
+    def test_server_restart (self):
+        # a server that runs for a while
+        self.server.stats_seq = 1000
+        seq = self.c.get_stats(min_seq = 1000)['global']['seq']
+
+        # a restarted server numbers its snapshots from the start
+        self.server.stop()
+        self.server = STLMockServer(port_count = 4, sync_port = 14801, async_port = 14800, stats_rate = 20)
+        self.server.start()
+
+        # ... but the client sequence goes on
+        self.c.connect()
+        self.c.get_stats(ports = [0], min_seq = seq + 1, timeout = 3)
+        assert(self.c.get_stats_seq() > seq)
+
+    def test_marks (self):
+        self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 20, pps = 100)), ports = [0])
+
+        self.c.mark('start', async_barrier = True)
+        self.c.start(ports = [0])
+        self.c.wait_on_traffic(ports = [0], timeout = 5)
+        self.c.get_stats()
+        self.c.mark('end')
+
+        # marks are not affected by clearing the stats
+        self.c.clear_stats()
+
+        diff = self.c.diff('start', 'end')
+        assert_equal(diff[0]['opackets'], 20)
+        assert_equal(diff[1]['opackets'], 0)
+        assert_equal(diff['total']['opackets'], 20)
+        assert(diff[0]['opackets_rate'] > 0)
+        assert_raises(STLArgumentError, self.c.diff, 'start', 'nothing')
+
+        assert_equal(sorted(self.c.diff('start', 'end', ports = 0).keys()), [0, 'duration', 'global', 'total'])
+        assert_raises(STLArgumentError, self.c.diff, 'start', 'end', ports = [0, 9])
+
+    def test_alerts (self):
+        fired = []
+        self.c.add_alert('ierrors delta > 0', ports = [0])
+        self.c.add_alert('rx_pps < 0.99 * tx_pps for 2 samples', ports = [0, 1])
+        self.c.add_alert('tx_pps > 50 for 2 samples', callback = fired.append, abort = False, is_global = True)
+        assert_raises(STLError, self.c.add_alert, 'rx_pps <> tx_pps')
+
+        self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXCont(pps = 100)), ports = [0])
+        self.c.start(ports = [0])
+
+        # a non aborting alert does not stop a wait
+        assert_raises(STLTimeoutError, self.c.wait_on_traffic, ports = [0], timeout = 0.5)
+        assert_equal([alert['scope'] for alert in fired], ['global'])
+
+        self.server.ports[0].counters['ierrors'] += 5
+        with assert_raises(STLError) as cm:
+            self.c.wait_on_traffic(ports = [0], timeout = 5)
+        assert('ierrors delta' in cm.exception.brief())
+        assert_equal([alert['rule'] for alert in self.c.get_alerts()], ['tx_pps > 50 for 2 samples', 'ierrors delta > 0'])
+
+        self.c.clear_alerts()
+        self.c.stop(ports = [0])
+        self.c.wait_on_traffic(ports = [0], timeout = 1)
+
+    def test_alert_callback_error (self):
+        def callback (alert):
+            raise ValueError('bad callback')
+
+        self.c.add_alert('tx_pps > 50', ports = [0], callback = callback, abort = False)
+        self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 20, pps = 100)), ports = [0])
+        self.c.start(ports = [0])
+
+        # the async thread keeps running after the callback raised
+        self.c.wait_on_traffic(ports = [0], timeout = 5)
+        seq = self.c.get_stats_seq()
+        self.c.get_stats(min_seq = seq + 2, timeout = 2)
+
+        assert_equal(len(self.c.get_alerts()), 1)
+        assert(any('alert callback failed: bad callback' in event for event in self.c.get_events()))
+
+    def test_groups (self):
+        self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 10, pps = 100)), ports = [0])
+        self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 30, pps = 100)), ports = [2])
+        self.c.set_port_group('dir_a', [0, 2])
+        assert_raises(STLArgumentError, self.c.set_port_group, 'bad', [0, 9])
+
+        self.c.start(ports = [0, 2])
+        self.c.wait_on_traffic(ports = [0, 2], timeout = 5)
+        self.c.get_stats()
+
+        stats = self.c.get_group_stats('dir_a')
+        assert_equal(stats['ports'], [0, 2])
+        assert_equal(stats['total']['opackets'], 40)
+        assert_equal(stats['mean']['opackets'], 20)
+        assert_equal((stats['min']['opackets'], stats['max']['opackets']), (10, 30))
+
+        assert_equal(self.c.get_group_stats([1, 3])['total']['opackets'], 0)
+
+        # the total column of the ports table
+        assert_equal(self.c.port_groups.get_total_stats([0, 2]).get_rel('opackets'), 40)
+        table = self.c.stats_generator.generate_single_statistic([0, 2], trex_stl_stats.PORT_STATS)
+        assert('port_statistics' in table)
+        assert_raises(STLArgumentError, self.c.get_group_stats, 'nothing')
+
+        self.c.clear_stats()
+        assert_equal(self.c.get_group_stats('dir_a')['total']['opackets'], 0)
+
+    def test_rx_stats (self):
+        self.c.add_streams([STLStream(packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 20, pps = 100), rx_stats = STLRxStats(7)),
+                            STLStream(packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 20, pps = 100))], ports = [0])
+        self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 10, pps = 100), rx_stats = STLRxStats(7)), ports = [1])
+
+        self.c.start(ports = [0, 1])
+        self.c.wait_on_traffic(ports = [0, 1], timeout = 5)
+
+        # rx stats are published after the global stats of the same tick
+        self.c.get_stats(min_seq = self.c.get_stats_seq() + 2)
+
+        stats = self.c.get_rx_stats()
+        assert_equal(stats.keys(), [7])
+        assert_equal(stats[7]['tx_pkts'], {0: 20, 1: 10, 'total': 30})
+        assert_equal(stats[7]['loss'], 0)
+        assert_equal(self.c.async_client.get_stats().rx_stats.get(1, 7)['rx_pkts'], 10)
+
+        self.c.clear_stats(ports = [0])
+        assert_equal(self.c.get_rx_stats([7])[7]['rx_pkts']['total'], 10)
+
+    def test_metrics_exporter (self):
+        port = self.c.start_metrics_exporter(port = 0, host = '127.0.0.1')
+        try:
+            self.c.add_streams(STLStream(packet = self.pkt(), mode = STLTXSingleBurst(total_pkts = 10, pps = 100)), ports = [0])
+            self.c.start(ports = [0])
+            self.c.wait_on_traffic(ports = [0], timeout = 5)
+            self.c.get_stats(min_seq = self.c.get_stats_seq() + 1)
+
+            response = urllib2.urlopen('http://127.0.0.1:{0}/metrics'.format(port), timeout = 5)
+            assert_equal(response.info()['Content-Type'], 'application/openmetrics-text; version=1.0.0; charset=utf-8')
+
+            lines = response.read().splitlines()
+            assert(any(line.startswith('trex_port_tx_pps{port="0"} ') for line in lines))
+            assert('trex_port_opackets_total{port="0"} 10' in lines)
+            assert_equal(lines[-1], '# EOF')
+
+            assert_raises(urllib2.HTTPError, urllib2.urlopen, 'http://127.0.0.1:{0}/other'.format(port), timeout = 5)
+        finally:
+            self.c.stop_metrics_exporter()
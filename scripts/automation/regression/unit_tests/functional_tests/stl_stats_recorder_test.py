@@ -0,0 +1,58 @@
+#!/router/bin/python
+
+import functional_general_test
+from trex_stl_lib.trex_stl_stats_recorder import CStatsRecorder, CStatsFileReader
+from nose.tools import assert_equal
+
+import math
+import shutil
+import tempfile
+import os
+
+
+class CStlStatsRecorder_Test(functional_general_test.CGeneralFunctional_Test):
+
+    def setUp (self):
+        self.dir = tempfile.mkdtemp()
+        self.prefix = os.path.join(self.dir, 'run')
+
+    def tearDown (self):
+        shutil.rmtree(self.dir)
+
+
+    def test_record_and_read (self):
+        recorder = CStatsRecorder(self.prefix)
+        for i in xrange(10):
+            data = {'m_tx_pps': i * 100.0, 'opackets-0': i, 'lat': {'max': i}, 'name': 'x'}
+            if i == 5:
+                del data['opackets-0']
+
+            recorder.record('trex-global', {'name': 'trex-global', 'type': 0, 'seq': i + 1, 'data': data})
+            recorder.record('trex-event', {'name': 'trex-event', 'type': 0, 'data': {'port_id': 0}})
+
+        recorder.close()
+
+        files = recorder.get_files()
+        assert_equal(files.keys(), ['trex-global'])
+
+        with CStatsFileReader(files['trex-global']) as r:
+            assert_equal(len(r), 10)
+            assert_equal(r.fields, ['ts', 'seq', 'lat.max', 'm_tx_pps', 'opackets-0'])
+            assert_equal(r[3]['m_tx_pps'], 300.0)
+            assert_equal(r[-1]['seq'], 10)
+            assert(math.isnan(r[5]['opackets-0']))
+            assert_equal(list(r.column('lat.max', 7)), [7.0, 8.0, 9.0])
+            assert_equal(list(r.column('m_tx_pps', 2, 9, chunk = 3)), [i * 100.0 for i in xrange(2, 9)])
+            assert_equal(r.find_ts(r[4]['ts']) <= 4, True)
+
+
+    def test_append (self):
+        for session in xrange(2):
+            recorder = CStatsRecorder(self.prefix)
+            recorder.record('trex-global', {'name': 'trex-global', 'type': 0, 'data': {'a': session}})
+            recorder.close()
+
+        # same schema - appended to the same file
+        with CStatsFileReader(recorder.get_files()['trex-global']) as r:
+            assert_equal(list(r.column('a')), [0.0, 1.0])
+
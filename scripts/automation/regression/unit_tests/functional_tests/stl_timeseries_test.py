@@ -0,0 +1,58 @@
+#!/router/bin/python
+
+import functional_general_test
+from trex_stl_lib.trex_stl_timeseries import CTimeSeries, CStatsRollup, CRollupBucket
+from nose.tools import assert_equal
+
+
+class CStlTimeSeries_Test(functional_general_test.CGeneralFunctional_Test):
+
+    def test_ring (self):
+        series = CTimeSeries(capacity = 5)
+        for i in xrange(8):
+            snapshot = {'opackets': i * 10, 'name': 'port'}
+            if i >= 3:
+                snapshot['tx_pps'] = 100.0 + i
+            if i == 6:
+                del snapshot['opackets']
+
+            series.append(100.0 + i, snapshot)
+
+        # only the last 5 samples are kept
+        assert_equal(len(series), 5)
+        assert_equal(list(series.window('opackets')[0]), [103.0, 104.0, 105.0, 106.0, 107.0])
+        assert_equal(list(series.values('opackets')), [30.0, 40.0, 50.0, 70.0])
+        assert_equal(sorted(series.get_fields()), ['opackets', 'tx_pps'])
+
+
+    def test_queries (self):
+        series = CTimeSeries(capacity = 100)
+        for i in xrange(10):
+            series.append(float(i), {'obytes': i * 1000, 'tx_pps': i})
+
+        assert_equal(series.mean('tx_pps'), 4.5)
+        assert_equal(series.max('tx_pps', seconds = 2), 9)
+        assert_equal(series.min('tx_pps', seconds = 2), 7)
+        assert_equal(series.rate('obytes'), 1000.0)
+        assert_equal(series.percentile('tx_pps', 50), 4)
+        assert_equal(series.percentile('tx_pps', 100), 9)
+        assert_equal(series.mean('nothing'), None)
+
+
+    def test_rollup (self):
+        rollup = CStatsRollup([(1, 5), (10, 3)])
+        for i in xrange(60):
+            rollup.append(1000.0 + i * 0.5, {'tx_pps': i, 'name': 'port'})
+
+        # finest level keeps the last 5 seconds
+        buckets = rollup.get_series('tx_pps', 1)
+        assert_equal([b.ts for b in buckets], [1025, 1026, 1027, 1028, 1029])
+        assert_equal(buckets[-1], CRollupBucket(1029, 58.0, 59.0, 58.5, 59.0, 2))
+
+        # closed 1s buckets are folded into 10s buckets
+        buckets = rollup.get_series('tx_pps', 10)
+        assert_equal(buckets[0], CRollupBucket(1000, 0.0, 19.0, 9.5, 19.0, 20))
+        assert_equal(buckets[-1].count, 18)
+
+        # levels sized to the history kept
+        assert_equal(CStatsRollup.get_levels(600), [(1, 120), (10, 60), (60, 10), (600, 1)])
@@ -20,6 +20,7 @@ class AsynchronousTRexSession(threading.Thread):
     def __init__(self, trexObj , trex_launch_path, trex_cmd_data):
         super(AsynchronousTRexSession, self).__init__()
         self.stoprequest                            = threading.Event()
+        self.wakeup                                 = threading.Event()     # stop request or TRex exit
         self.terminateFlag                          = False
         self.launch_path                            = trex_launch_path
         self.cmd, self.export_path, self.duration   = trex_cmd_data
@@ -34,14 +35,18 @@ class AsynchronousTRexSession(threading.Thread):
             self.time_stamps['start'] = self.time_stamps['run_time'] = time.time()
             self.session   = subprocess.Popen("exec "+self.cmd, cwd = self.launch_path, shell=True, stdin = DEVNULL, stderr = subprocess.PIPE, preexec_fn=os.setsid)
             logger.info("TRex session initialized successfully, Parent process pid is {pid}.".format( pid = self.session.pid ))
-            while self.session.poll() is None:  # subprocess is NOT finished
-                time.sleep(0.5)
-                if self.stoprequest.is_set():
-                    logger.debug("Abort request received by handling thread. Terminating TRex session." )
-                    os.killpg(self.session.pid, signal.SIGUSR1)
-                    self.trexObj.set_status(TRexStatus.Idle)
-                    self.trexObj.set_verbose_status("TRex is Idle")
-                    break
+
+            # wait for TRex to exit on a helper thread - no polling
+            waiter = threading.Thread(target = self.wait_session)
+            waiter.setDaemon(True)
+            waiter.start()
+
+            self.wakeup.wait()
+            if self.stoprequest.is_set() and self.session.returncode is None:  # subprocess is NOT finished
+                logger.debug("Abort request received by handling thread. Terminating TRex session." )
+                os.killpg(self.session.pid, signal.SIGUSR1)
+                self.trexObj.set_status(TRexStatus.Idle)
+                self.trexObj.set_verbose_status("TRex is Idle")
 
             self.time_stamps['run_time'] = time.time() - self.time_stamps['start']
 
@@ -73,8 +78,13 @@ class AsynchronousTRexSession(threading.Thread):
                 logger.debug("Finished handling a single run of TRex.")
                 self.trexObj.zmq_dump   = None
 
+    def wait_session (self):
+        self.session.wait()
+        self.wakeup.set()
+
     def join (self, timeout = None):
         self.stoprequest.set()
+        self.wakeup.set()
         super(AsynchronousTRexSession, self).join(timeout)
 
     def load_trex_output (self, export_path):
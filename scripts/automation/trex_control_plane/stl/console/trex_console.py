@@ -480,6 +480,14 @@ class TRexConsole(TRexGeneralCmd):
     def help_streams(self):
         self.do_streams("-h")
 
+    def do_rpcstats(self, line):
+        '''Show RPC counters per method\n'''
+        self.stateless_client.show_rpc_stats_line(line)
+
+
+    def help_rpcstats(self):
+        self.do_rpcstats("-h")
+
     @verify_connected
     def do_clear(self, line):
         '''Clear cached local statistics\n'''
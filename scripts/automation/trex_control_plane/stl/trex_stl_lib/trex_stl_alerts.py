@@ -0,0 +1,226 @@
+#!/router/bin/python
+
+import operator
+import re
+import threading
+import time
+
+from trex_stl_exceptions import STLError
+
+# threshold alerts on async stats snapshots
+#
+# a rule is a comparison of two operands, optionally held for N samples:
+#
+#   rx_pps < 0.99 * tx_pps for 2 samples
+#   ierrors delta > 0
+#   cpu_util >= 90
+#
+# an operand is a number or '[coef *] field [delta]' - 'delta' is the change
+# from the previous snapshot. a rule is compiled once to a check function
+# and evaluated by the async thread on every snapshot of its ports (or of
+# the global stats), so it fires within one publish interval
+
+# short names for snapshot fields - any other name is a raw snapshot field
+PORT_FIELDS = {'tx_pps':    'm_total_tx_pps',
+               'rx_pps':    'm_total_rx_pps',
+               'tx_bps':    'm_total_tx_bps',
+               'rx_bps':    'm_total_rx_bps',
+               'tx_bps_L1': 'm_total_tx_bps_L1',
+               'line_util': 'm_percentage'}
+
+GLOBAL_FIELDS = {'cpu_util':    'm_cpu_util',
+                 'tx_pps':      'm_tx_pps',
+                 'rx_pps':      'm_rx_pps',
+                 'tx_bps':      'm_tx_bps',
+                 'rx_bps':      'm_rx_bps',
+                 'tx_bps_L1':   'm_tx_bps_L1',
+                 'rx_drop_bps': 'm_rx_drop_bps',
+                 'queue_full':  'm_total_queue_full',
+                 'queue_drop':  'm_total_queue_drop',
+                 'alloc_error': 'm_total_alloc_error'}
+
+OPERATORS = {'<':  operator.lt,
+             '<=': operator.le,
+             '>':  operator.gt,
+             '>=': operator.ge,
+             '==': operator.eq,
+             '!=': operator.ne}
+
+NUMBER  = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+OPERAND = r'(?:{0}\s*\*\s*)?[a-zA-Z_][\w.]*(?:\s+delta)?|{0}'.format(NUMBER)
+
+RULE_RE    = re.compile(r'^\s*({0})\s*(<=|>=|==|!=|<|>)\s*({0})\s*(?:for\s+(\d+)\s+samples?)?\s*$'.format(OPERAND))
+OPERAND_RE = re.compile(r'^(?:({0})\s*\*\s*)?([a-zA-Z_][\w.]*)(\s+delta)?$'.format(NUMBER))
+NUMBER_RE  = re.compile(r'^{0}$'.format(NUMBER))
+
+
+# operand -> f(snapshot, previous snapshot)
+# a missing field (or no previous snapshot for 'delta') raises KeyError / TypeError
+def compile_operand (text, fields):
+    text = text.strip()
+
+    if NUMBER_RE.match(text):
+        value = float(text)
+        return lambda cur, prev: value
+
+    coef, name, delta = OPERAND_RE.match(text).groups()
+    coef  = float(coef) if coef != None else 1.0
+    field = fields.get(name, name)
+
+    if delta:
+        return lambda cur, prev: coef * (cur[field] - prev[field])
+    else:
+        return lambda cur, prev: coef * cur[field]
+
+
+# "'name' on port 1"
+def format_alert (alert):
+    scope = 'global stats' if alert['scope'] == 'global' else 'port {0}'.format(alert['scope'])
+    return "'{0}' on {1}".format(alert['name'], scope)
+
+
+class CStatsAlertRule(object):
+    def __init__ (self, rule, scopes, callback = None, abort = True, name = None):
+        m = RULE_RE.match(rule)
+        if not m:
+            raise STLError("invalid alert rule '{0}' - expecting '<operand> <op> <operand> [for <n> samples]'".format(rule))
+
+        lhs, op, rhs, samples = m.groups()
+
+        self.rule     = rule
+        self.name     = name or rule
+        self.scopes   = scopes
+        self.callback = callback
+        self.abort    = abort
+        self.samples  = int(samples) if samples else 1
+
+        if self.samples < 1:
+            raise STLError("invalid alert rule '{0}' - samples should be at least 1".format(rule))
+
+        # global and port snapshots name fields differently
+        fields = GLOBAL_FIELDS if scopes == ['global'] else PORT_FIELDS
+
+        self.op  = OPERATORS[op]
+        self.lhs = compile_operand(lhs, fields)
+        self.rhs = compile_operand(rhs, fields)
+
+        # scope -> consecutive samples that matched
+        self.count = {}
+
+
+    # True when the rule fires on this snapshot
+    def evaluate (self, scope, cur, prev):
+        try:
+            match = self.op(self.lhs(cur, prev), self.rhs(cur, prev))
+        except (KeyError, TypeError):
+            # not evaluable - the field is missing or there is no previous snapshot
+            return False
+
+        if not match:
+            self.count[scope] = 0
+            return False
+
+        count = self.count.get(scope, 0) + 1
+        self.count[scope] = count
+
+        # fire once when the condition starts to hold - again only after it clears
+        return count == self.samples
+
+
+class CStatsAlertEngine(object):
+    def __init__ (self):
+        self.rules    = {}
+        self.rule_id  = 0
+        self.lock     = threading.Lock()
+
+        # scope ('global' or port id) -> rules, rebuilt on changes
+        # so the async thread reads it without a lock
+        self.by_scope = {}
+
+        # scope -> previous snapshot for 'delta'
+        self.prev = {}
+
+        # fired alerts and the first one that asked to abort
+        self.fired   = []
+        self.aborted = None
+
+
+    def add (self, rule):
+        with self.lock:
+            self.rule_id += 1
+            self.rules[self.rule_id] = rule
+            self.__rebuild()
+            return self.rule_id
+
+
+    def remove (self, rule_id):
+        with self.lock:
+            self.rules.pop(rule_id, None)
+            self.__rebuild()
+
+
+    def __rebuild (self):
+        by_scope = {}
+        for rule in self.rules.values():
+            for scope in rule.scopes:
+                by_scope.setdefault(scope, []).append(rule)
+
+        self.by_scope = by_scope
+
+        # a scope without rules is not evaluated - its previous snapshot would go stale
+        for scope in self.prev.keys():
+            if scope not in by_scope:
+                self.prev.pop(scope, None)
+
+
+    # clear fired alerts, the abort flag, the sample counters and the previous snapshots
+    def clear (self):
+        with self.lock:
+            for rule in self.rules.values():
+                rule.count = {}
+
+            self.prev.clear()
+
+            self.fired   = []
+            self.aborted = None
+
+
+    def get_fired (self):
+        return list(self.fired)
+
+
+    # called by the async thread per snapshot
+    # returns (alert, callback) of the alerts fired - the caller runs the callbacks
+    def evaluate (self, global_stats, port_stats):
+        by_scope = self.by_scope
+        if not by_scope:
+            return []
+
+        fired = []
+
+        rules = by_scope.get('global')
+        if rules:
+            self.__evaluate(fired, 'global', rules, global_stats)
+
+        for port_id, snapshot in port_stats.iteritems():
+            rules = by_scope.get(port_id)
+            if rules:
+                self.__evaluate(fired, port_id, rules, snapshot)
+
+        return fired
+
+
+    def __evaluate (self, fired, scope, rules, snapshot):
+        prev = self.prev.get(scope)
+        self.prev[scope] = snapshot
+
+        for rule in rules:
+            if not rule.evaluate(scope, snapshot, prev):
+                continue
+
+            alert = {'ts': time.time(), 'name': rule.name, 'rule': rule.rule, 'scope': scope}
+            self.fired.append(alert)
+            fired.append((alert, rule.callback))
+
+            if rule.abort and not self.aborted:
+                self.aborted = alert
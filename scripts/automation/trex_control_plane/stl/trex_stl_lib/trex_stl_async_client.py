@@ -5,10 +5,11 @@ import threading
 import time
 import datetime
 import zmq
-import re
 import random
+from collections import deque
 
 from trex_stl_jsonrpc_client import JsonRpcClient, BatchMessage
+from trex_stl_stats_recorder import CStatsRecorder
 
 from utils.text_opts import *
 from trex_stl_stats import *
@@ -68,18 +69,72 @@ class CTRexAsyncStatsGeneral(CTRexAsyncStats):
 
 # per port stats
 class CTRexAsyncStatsPort(CTRexAsyncStats):
-    def __init__ (self):
+    def __init__ (self, port_id = None, rx_stats = None):
         super(CTRexAsyncStatsPort, self).__init__()
+        self.port_id  = port_id
+        self.rx_stats = rx_stats
 
+    # RX stats of a stream by its STLRxStats user id (see CRxStreamStats.get)
     def get_stream_stats (self, stream_id):
-        return None
+        if self.rx_stats is None:
+            return None
+
+        return self.rx_stats.get(self.port_id, stream_id)
+
+# routes the keys of a stats snapshot - 'opackets-12' is field 'opackets' of port 12
+# the keys are the same on every snapshot so each key is parsed only once
+class CTRexStatsKeyRouter(object):
+    # guard against a server sending ever changing keys
+    MAX_KEYS = 10000
+
+    def __init__ (self):
+        self.routes = {}
+
+    # (port_id, field) or None for a general key
+    def route (self, key):
+        try:
+            return self.routes[key]
+        except KeyError:
+            pass
+
+        field, sep, port_id = key.rpartition('-')
+        r = (int(port_id), field) if (sep and field and port_id.isdigit()) else None
+
+        if len(self.routes) >= self.MAX_KEYS:
+            self.routes.clear()
+
+        self.routes[key] = r
+        return r
+
+    # single pass split of a snapshot to general stats and per port dicts
+    def split (self, snapshot):
+        general_stats = {}
+        port_stats = {}
+        routes = self.routes
+
+        for key, value in snapshot.iteritems():
+            r = routes[key] if key in routes else self.route(key)
+            if r is None:
+                general_stats[key] = value
+                continue
+
+            port_id, field = r
+            if port_id in port_stats:
+                port_stats[port_id][field] = value
+            else:
+                port_stats[port_id] = {field: value}
+
+        return general_stats, port_stats
+
 
 # stats manager
 class CTRexAsyncStatsManager():
-    def __init__ (self):
+    def __init__ (self, rx_stats = None):
 
         self.general_stats = CTRexAsyncStatsGeneral()
         self.port_stats = {}
+        self.key_router = CTRexStatsKeyRouter()
+        self.rx_stats = rx_stats
 
 
     def get_general_stats(self):
@@ -98,36 +153,18 @@ class CTRexAsyncStatsManager():
 
     def __handle_snapshot(self, snapshot):
 
-        general_stats = {}
-        port_stats = {}
-
         # filter the values per port and general
-        for key, value in snapshot.iteritems():
-            
-            # match a pattern of ports
-            m = re.search('(.*)\-([0-8])', key)
-            if m:
-
-                port_id = m.group(2)
-                field_name = m.group(1)
-
-                if not port_id in port_stats:
-                    port_stats[port_id] = {}
-
-                port_stats[port_id][field_name] = value
-
-            else:
-                # no port match - general stats
-                general_stats[key] = value
+        general_stats, port_stats = self.key_router.split(snapshot)
 
         # update the general object with the snapshot
         self.general_stats.update(general_stats)
 
         # update all ports
         for port_id, data in port_stats.iteritems():
+            port_id = str(port_id)
 
             if not port_id in self.port_stats:
-                self.port_stats[port_id] = CTRexAsyncStatsPort()
+                self.port_stats[port_id] = CTRexAsyncStatsPort(int(port_id), self.rx_stats)
 
             self.port_stats[port_id].update(data)
 
@@ -136,7 +173,24 @@ class CTRexAsyncStatsManager():
 
 
 class CTRexAsyncClient():
-    def __init__ (self, server, port, stateless_client):
+    # every message starts with {"name":"<topic>" - used as a ZMQ subscription prefix
+    TOPIC_PREFIX = '{{"name":"{0}"'
+
+    # stats snapshots can be coalesced - only the latest one matters
+    STATS_PREFIX = TOPIC_PREFIX.format('trex-global')
+
+    # topic groups for selective subscription
+    TOPICS = {'stats':   ['trex-global'],
+              'events':  ['trex-event'],
+              'latency': ['trex-latecny', 'trex-latecny-v2'],
+              'rx':      ['rx-stats']}
+
+    # conflate - ZMQ keeps only the last message on the socket
+    #            events and barriers can be lost too - for monitoring only
+    # hwm      - ZMQ receive high water mark (messages)
+    # topics   - list of topic groups (see TOPICS) or message names to subscribe to
+    #            None for all - barriers are always received
+    def __init__ (self, server, port, stateless_client, conflate = False, hwm = None, topics = None):
 
         self.port = port
         self.server = server
@@ -148,13 +202,52 @@ class CTRexAsyncClient():
 
         self.raw_snapshot = {}
 
-        self.stats = CTRexAsyncStatsManager()
+        self.stats = CTRexAsyncStatsManager(stateless_client.rx_stats)
 
         self.last_data_recv_ts = 0
         self.async_barrier     = None
 
+        self.conflate = conflate
+        self.hwm      = hwm
+        self.set_topics(topics)
+
+        # hand-off from the receive thread to the decode thread
+        # events and barriers are queued, stats snapshots overwrite a pending one
+        self.pending       = deque()
+        self.pending_stats = None
+        self.pending_cv    = threading.Condition()
+        self.coalesced     = 0
+
+        # number and server time of the last stats snapshot
+        # servers that do not stamp snapshots get a local count
+        self.stats_seq = 0
+        self.stats_ts  = None
+
+        # the server sequence starts over when the server restarts - it is
+        # rebased on the local one so 'stats_seq' never goes back
+        self.stats_seq_base = 0
+        self.stats_rebase   = False
+
+        # optional binary recording of snapshots
+        self.recorder = None
+
         self.connected = False
  
+    def set_topics (self, topics):
+        if topics == None:
+            self.topics = None
+            return
+
+        self.topics = set(['trex-barrier'])
+        for topic in topics:
+            self.topics.update(self.TOPICS.get(topic, [topic]))
+
+
+    # stats are published periodically - without them silence is not a failure
+    def has_heartbeat (self):
+        return (self.topics == None) or ('trex-global' in self.topics)
+
+
     # connects the async channel
     def connect (self):
 
@@ -168,13 +261,24 @@ class CTRexAsyncClient():
         self.socket = self.context.socket(zmq.SUB)
 
 
-        # before running the thread - mark as active
+        with self.pending_cv:
+            self.pending.clear()
+            self.pending_stats = None
+
+        # the server may have restarted - rebase on its next snapshot
+        self.stats_ts     = None
+        self.stats_rebase = True
+
+        # before running the threads - mark as active
         self.active = True
         self.t = threading.Thread(target = self._run)
+        self.decode_t = threading.Thread(target = self._decode_run)
 
-        # kill this thread on exit and don't add it to the join list
+        # kill these threads on exit and don't add them to the join list
         self.t.setDaemon(True)
         self.t.start()
+        self.decode_t.setDaemon(True)
+        self.decode_t.start()
 
         self.connected = True
 
@@ -200,6 +304,10 @@ class CTRexAsyncClient():
         self.active = False
         self.t.join()
 
+        with self.pending_cv:
+            self.pending_cv.notify()
+        self.decode_t.join()
+
         # done
         self.connected = False
 
@@ -208,8 +316,19 @@ class CTRexAsyncClient():
     def _run (self):
 
         # socket must be created on the same thread 
-        self.socket.setsockopt(zmq.SUBSCRIBE, '')
+        if self.topics == None:
+            self.socket.setsockopt(zmq.SUBSCRIBE, '')
+        else:
+            for topic in self.topics:
+                self.socket.setsockopt(zmq.SUBSCRIBE, self.TOPIC_PREFIX.format(topic))
         self.socket.setsockopt(zmq.RCVTIMEO, 5000)
+
+        if self.hwm != None:
+            self.socket.setsockopt(zmq.RCVHWM, self.hwm)
+
+        if self.conflate:
+            self.socket.setsockopt(zmq.CONFLATE, 1)
+
         self.socket.connect(self.tr)
 
         got_data = False
@@ -230,7 +349,7 @@ class CTRexAsyncClient():
             except zmq.Again:
 
                 # signal once
-                if got_data:
+                if got_data and self.has_heartbeat():
                     self.event_handler.on_async_dead()
                     got_data = False
 
@@ -240,18 +359,112 @@ class CTRexAsyncClient():
                 # outside thread signaled us to exit
                 break
 
-            msg = json.loads(line)
+            self.__hand_off(line)
+
+        
+        # closing of socket must be from the same thread
+        self.socket.close(linger = 0)
+
+
+    # pass a message to the decode thread
+    def __hand_off (self, line):
+        with self.pending_cv:
+            if line.startswith(self.STATS_PREFIX):
+                # a snapshot not decoded yet is replaced by the new one
+                if self.pending_stats:
+                    self.pending_stats[0] = line
+                    self.coalesced += 1
+                    return
+
+                self.pending_stats = [line]
+                self.pending.append(self.pending_stats)
+            else:
+                self.pending.append([line])
+
+            self.pending_cv.notify()
+
+
+    # decode thread function - decodes and dispatches in arrival order
+    def _decode_run (self):
+        while True:
+            with self.pending_cv:
+                while self.active and not self.pending:
+                    self.pending_cv.wait()
+
+                if not self.active:
+                    break
+
+                entry = self.pending.popleft()
+                if entry is self.pending_stats:
+                    self.pending_stats = None
+
+            try:
+                msg = json.loads(entry[0])
+            except ValueError:
+                continue
 
             name = msg['name']
             data = msg['data']
             type = msg['type']
             self.raw_snapshot[name] = data
 
-            self.__dispatch(name, type, data)
+            recorder = self.recorder
+            if recorder:
+                recorder.record(name, msg)
+
+            if name == "trex-global":
+                self.__handle_stats(data, msg.get('seq'), msg.get('ts'))
+            else:
+                self.__dispatch(name, type, data)
+
+
+    # number of stats snapshots replaced before they were decoded
+    def get_coalesced_count (self):
+        return self.coalesced
+
+
+    # record snapshots to '<prefix>.<name>.trxs' (see trex_stl_stats_recorder)
+    # names - snapshot names to record, None for stats and latency
+    def start_recording (self, prefix, names = None):
+        self.stop_recording()
+        self.recorder = CStatsRecorder(prefix, names)
+
+    # returns the recorded files - name -> filename
+    def stop_recording (self):
+        recorder, self.recorder = self.recorder, None
+        if not recorder:
+            return {}
+
+        recorder.close()
+        return recorder.get_files()
 
-        
-        # closing of socket must be from the same thread
-        self.socket.close(linger = 0)
+
+    # sequence number of the last stats snapshot applied
+    # increases across reconnects and server restarts
+    def get_stats_seq (self):
+        return self.stats_seq
+
+    def get_stats_ts (self):
+        return self.stats_ts
+
+
+    # apply a stats snapshot and wake anyone waiting for a newer one
+    def __handle_stats (self, data, seq, ts):
+        self.event_handler.handle_async_stats_update(data)
+
+        if seq == None:
+            self.stats_seq += 1
+
+        else:
+            # after a connect, or a lower sequence when the socket reconnected to a restarted server
+            if self.stats_rebase or (self.stats_seq_base + seq < self.stats_seq):
+                self.stats_seq_base = self.stats_seq + 1 - seq
+                self.stats_rebase   = False
+
+            self.stats_seq = self.stats_seq_base + seq
+
+        self.stats_ts = ts
+        self.event_handler.notify()
 
 
     # did we get info for the last 3 seconds ?
@@ -267,16 +480,16 @@ class CTRexAsyncClient():
     def get_raw_snapshot (self):
         return self.raw_snapshot
 
-    # dispatch the message to the right place
+    # dispatch the message to the right place - stats are handled by __handle_stats
     def __dispatch (self, name, type, data):
-        # stats
-        if name == "trex-global":
-            self.event_handler.handle_async_stats_update(data)
-
         # events
-        elif name == "trex-event":
+        if name == "trex-event":
             self.event_handler.handle_async_event(type, data)
 
+        # per stream rx stats
+        elif name == "rx-stats":
+            self.event_handler.handle_async_rx_stats(data)
+
         # barriers
         elif name == "trex-barrier":
             self.handle_async_barrier(type, data)
@@ -4,12 +4,14 @@
 from trex_stl_lib.trex_stl_exceptions import *
 from trex_stl_lib.trex_stl_streams import *
 
-from trex_stl_jsonrpc_client import JsonRpcClient, BatchMessage
+from trex_stl_jsonrpc_client import JsonRpcClient, BatchMessage, RpcFuture
 import trex_stl_stats
 
-from trex_stl_port import Port
+from trex_stl_port import Port, PortOp
 from trex_stl_types import *
-from trex_stl_async_client import CTRexAsyncClient
+from trex_stl_async_client import CTRexAsyncClient, CTRexStatsKeyRouter
+from trex_stl_metrics_exporter import STLMetricsExporter
+from trex_stl_alerts import CStatsAlertRule, CStatsAlertEngine, format_alert
 
 from utils import parsing_opts, text_tables, common
 from utils.text_opts import *
@@ -18,11 +20,14 @@ from utils.text_opts import *
 from collections import namedtuple
 from yaml import YAMLError
 import time
+import threading
 import datetime
-import re
 import random
 import json
 import traceback
+import os
+import select
+import fcntl
 
 ############################     logger     #############################
 ############################                #############################
@@ -134,6 +139,18 @@ class AsyncEventHandler(object):
 
         self.events = []
 
+        # maps each stats key to its port once
+        self.key_router = CTRexStatsKeyRouter()
+
+        # every waiter has a pipe - each async event writes a byte to all of them
+        # and the waiters re-check their condition (write ends of the pipes)
+        self.waiters = set()
+        self.lock = threading.Lock()
+
+        # user callbacks for async events - id -> (callback, event types)
+        self.callbacks = {}
+        self.callback_id = 0
+
     # public functions
 
     def get_events (self):
@@ -144,11 +161,74 @@ class AsyncEventHandler(object):
         self.events = []
 
 
+    # call 'callback(type, data)' on async events of 'event_types' (None for all)
+    # called from the async thread - should return fast
+    def register_callback (self, callback, event_types = None):
+        with self.lock:
+            self.callback_id += 1
+            self.callbacks[self.callback_id] = (callback, event_types)
+            return self.callback_id
+
+
+    def unregister_callback (self, callback_id):
+        with self.lock:
+            self.callbacks.pop(callback_id, None)
+
+
+    # block until predicate() is true - re-checked on every async event
+    # returns False on timeout or when the connection is lost
+    #
+    # the waiter sleeps in select() - it wakes as soon as an event is notified
+    # (a timed Condition.wait on Python 2 polls) and Ctrl-C interrupts it
+    def wait_until (self, predicate, timeout):
+        if predicate():
+            return True
+
+        r, w = os.pipe()
+        fcntl.fcntl(w, fcntl.F_SETFL, fcntl.fcntl(w, fcntl.F_GETFL) | os.O_NONBLOCK)
+
+        # registered before the first check - an event in between is not lost
+        with self.lock:
+            self.waiters.add(w)
+
+        try:
+            expire = time.time() + timeout
+            while not predicate():
+                remaining = expire - time.time()
+                if (remaining <= 0) or not self.client.connected:
+                    return False
+
+                readable, _, _ = select.select([r], [], [], remaining)
+                if readable:
+                    os.read(r, 4096)
+
+            return True
+
+        finally:
+            with self.lock:
+                self.waiters.discard(w)
+
+            os.close(r)
+            os.close(w)
+
+
+    # wake all waiters
+    def notify (self):
+        with self.lock:
+            for w in self.waiters:
+                try:
+                    os.write(w, 'x')
+                except OSError:
+                    # the pipe is full - the waiter has a wake up pending anyway
+                    pass
+
+
     def on_async_dead (self):
         if self.client.connected:
             msg = 'lost connection to server'
             self.__add_event_log(msg, 'local', True)
             self.client.connected = False
+            self.notify()
 
 
     def on_async_alive (self):
@@ -157,32 +237,34 @@ class AsyncEventHandler(object):
 
     # handles an async stats update from the subscriber
     def handle_async_stats_update(self, dump_data):
-        global_stats = {}
-        port_stats = {}
-
         # filter the values per port and general
-        for key, value in dump_data.iteritems():
-            # match a pattern of ports
-            m = re.search('(.*)\-([0-8])', key)
-            if m:
-                port_id = int(m.group(2))
-                field_name = m.group(1)
-                if self.client.ports.has_key(port_id):
-                    if not port_id in port_stats:
-                        port_stats[port_id] = {}
-                    port_stats[port_id][field_name] = value
-                else:
-                    continue
-            else:
-                # no port match - general stats
-                global_stats[key] = value
+        global_stats, port_stats = self.key_router.split(dump_data)
 
         # update the general object with the snapshot
         self.client.global_stats.update(global_stats)
 
-        # update all ports
+        # update all ports - keys of unknown ports are dropped
+        ports = self.client.ports
         for port_id, data in port_stats.iteritems():
-            self.client.ports[port_id].port_stats.update(data)
+            if port_id in ports:
+                ports[port_id].port_stats.update(data)
+
+        # alert rules - before waiters are woken
+        for alert, callback in self.client.alerts.evaluate(global_stats, port_stats):
+            self.__add_event_log("alert {0}".format(format_alert(alert)), 'local', True)
+
+            # a failing user callback must not stop the async thread
+            if callback:
+                try:
+                    callback(alert)
+                except Exception as e:
+                    self.__add_event_log("alert callback failed: {0}".format(e), 'local', True)
+
+
+    # per stream counters of streams with rx stats
+    def handle_async_rx_stats (self, data):
+        self.client.rx_stats.update(data)
+        self.notify()
 
 
     # dispatcher for server async events (port started, port stopped and etc.)
@@ -261,9 +343,27 @@ class AsyncEventHandler(object):
 
         self.__add_event_log(ev, 'server', show_event)
 
+        # callbacks first - a woken waiter sees their side effects
+        self.__run_callbacks(type, data)
+        self.notify()
+
 
     # private functions
 
+    def __run_callbacks (self, type, data):
+        with self.lock:
+            callbacks = self.callbacks.values()
+
+        for callback, event_types in callbacks:
+            if (event_types != None) and (type not in event_types):
+                continue
+
+            try:
+                callback(type, data)
+            except Exception as e:
+                self.__add_event_log("event callback failed: {0}".format(e), 'local', True)
+
+
     def __async_event_port_stopped (self, port_id):
         self.client.ports[port_id].async_event_port_stopped()
 
@@ -313,11 +413,11 @@ class AsyncEventHandler(object):
 
 class CCommLink(object):
     """describes the connectivity of the stateless client method"""
-    def __init__(self, server="localhost", port=5050, virtual=False, prn_func = None):
+    def __init__(self, server="localhost", port=5050, virtual=False, prn_func = None, pipelined = True):
         self.virtual = virtual
         self.server = server
         self.port = port
-        self.rpc_link = JsonRpcClient(self.server, self.port, prn_func)
+        self.rpc_link = JsonRpcClient(self.server, self.port, prn_func, pipelined)
 
     @property
     def is_connected(self):
@@ -362,6 +462,17 @@ class CCommLink(object):
             # invoke the batch
             return batch.invoke()
 
+    # send a batch without waiting for its response - returns a future
+    def transmit_batch_async(self, batch_list):
+        if self.virtual:
+            self.transmit_batch(batch_list)
+            return RpcFuture.resolved(RC_OK())
+        else:
+            batch = self.rpc_link.create_batch()
+            for command in batch_list:
+                batch.add(command.method, command.params)
+            return batch.invoke(block = False)
+
     def _prompt_virtual_tx_msg(self):
         print "Transmitting virtually over tcp://{server}:{port}".format(server=self.server,
                                                                          port=self.port)
@@ -382,7 +493,12 @@ class STLClient(object):
                  async_port = 4500,
                  verbose_level = LoggerApi.VERBOSE_QUIET,
                  logger = None,
-                 virtual = False):
+                 virtual = False,
+                 async_conflate = False,
+                 async_hwm = None,
+                 async_topics = None,
+                 pipelined = True,
+                 stats_history = None):
 
 
         self.username   = username
@@ -394,25 +510,44 @@ class STLClient(object):
         self.session_id = random.getrandbits(32)
         self.connected = False
 
+        # named stats bookmarks (see mark / diff)
+        self.bookmarks = {}
+
+        # seconds of per field stats history (get_window / rollups) - None keeps none
+        self.stats_history = stats_history
+
+        # embedded OpenMetrics server (see start_metrics_exporter)
+        self.metrics_exporter = None
+
+        # threshold rules on async stats (see add_alert)
+        self.alerts = CStatsAlertEngine()
+
         # logger
         self.logger = DefaultLogger() if not logger else logger
 
         # initial verbose
         self.logger.set_verbose(verbose_level)
 
-        # low level RPC layer
+        # low level RPC layer - 'pipelined' allows many requests in flight
         self.comm_link = CCommLink(server,
                                    sync_port,
                                    virtual,
-                                   self.logger)
+                                   self.logger,
+                                   pipelined)
 
         # async event handler manager
         self.event_handler = AsyncEventHandler(self)
 
+        # per stream RX stats (see get_rx_stats)
+        self.rx_stats = trex_stl_stats.CRxStreamStats()
+
         # async subscriber level
         self.async_client = CTRexAsyncClient(server,
                                              async_port,
-                                             self)
+                                             self,
+                                             async_conflate,
+                                             async_hwm,
+                                             async_topics)
 
         
       
@@ -428,9 +563,15 @@ class STLClient(object):
         self.global_stats = trex_stl_stats.CGlobalStats(self.connection_info,
                                                     self.server_version,
                                                     self.ports)
+        if self.stats_history:
+            self.global_stats.enable_history(self.stats_history)
+
+        # named port groups for aggregated stats (see set_port_group)
+        self.port_groups = trex_stl_stats.CPortStatsGroups(self.ports)
 
         self.stats_generator = trex_stl_stats.CTRexInfoGenerator(self.global_stats,
-                                                              self.ports)
+                                                              self.ports,
+                                                              self.port_groups)
 
  
  
@@ -457,38 +598,53 @@ class STLClient(object):
         return port_id_list
 
 
-    # sync ports
-    def __sync_ports (self, port_id_list = None, force = False):
-        port_id_list = self.__ports(port_id_list)
+    # execute an operation on many ports as a single batch
+    # the responses are fanned back to each port by the order of the commands
+    def __exec_ports_op (self, port_id_list, op_func, *args):
+        ops = [op_func(self.ports[port_id], *args) for port_id in port_id_list]
+
+        batch = [cmd for op in ops if isinstance(op, PortOp) for cmd in op.cmds]
+
+        responses = []
+        if batch:
+            batch_rc = self._transmit_batch(batch)
+            responses = batch_rc.split()
+
+            # the batch has failed as a whole - every command gets the error
+            if len(responses) != len(batch):
+                responses = [batch_rc] * len(batch)
 
         rc = RC()
+        index = 0
 
-        for port_id in port_id_list:
-            rc.add(self.ports[port_id].sync())
+        for op in ops:
+            if isinstance(op, PortOp):
+                count = len(op.cmds)
+                rc.add(op.on_response(*responses[index:index + count]))
+                index += count
+            else:
+                rc.add(op)
 
         return rc
 
-    # acquire ports, if port_list is none - get all
-    def __acquire (self, port_id_list = None, force = False):
+
+    # sync ports
+    def __sync_ports (self, port_id_list = None, force = False):
         port_id_list = self.__ports(port_id_list)
 
-        rc = RC()
+        return self.__exec_ports_op(port_id_list, Port.sync_op)
 
-        for port_id in port_id_list:
-            rc.add(self.ports[port_id].acquire(force))
+    # acquire ports, if port_list is none - get all
+    def __acquire (self, port_id_list = None, force = False):
+        port_id_list = self.__ports(port_id_list)
 
-        return rc
+        return self.__exec_ports_op(port_id_list, Port.acquire_op, force)
 
     # release ports
     def __release (self, port_id_list = None):
         port_id_list = self.__ports(port_id_list)
 
-        rc = RC()
-
-        for port_id in port_id_list:
-            rc.add(self.ports[port_id].release())
-
-        return rc
+        return self.__exec_ports_op(port_id_list, Port.release_op)
 
 
     def __add_streams(self, stream_list, port_id_list = None):
@@ -497,8 +653,13 @@ class STLClient(object):
 
         rc = RC()
 
+        # report progress only for profiles that are uploaded in more than one chunk
+        progress = None
+        if len(stream_list) > Port.ADD_STREAMS_CHUNK_SIZE:
+            progress = lambda port_id, uploaded, total: self.logger.log("\nport {0}: uploaded {1}/{2} streams".format(port_id, uploaded, total), newline = False)
+
         for port_id in port_id_list:
-            rc.add(self.ports[port_id].add_streams(stream_list))
+            rc.add(self.ports[port_id].add_streams(stream_list, progress))
 
         return rc
 
@@ -547,77 +708,47 @@ class STLClient(object):
 
         port_id_list = self.__ports(port_id_list)
 
-        rc = RC()
-
-        for port_id in port_id_list:
-            rc.add(self.ports[port_id].start(multiplier, duration, force))
-
-        return rc
+        return self.__exec_ports_op(port_id_list, Port.start_op, multiplier, duration, force)
 
 
     def __resume (self, port_id_list = None, force = False):
 
         port_id_list = self.__ports(port_id_list)
-        rc = RC()
 
-        for port_id in port_id_list:
-            rc.add(self.ports[port_id].resume())
-
-        return rc
+        return self.__exec_ports_op(port_id_list, Port.resume_op)
 
     def __pause (self, port_id_list = None, force = False):
 
         port_id_list = self.__ports(port_id_list)
-        rc = RC()
 
-        for port_id in port_id_list:
-            rc.add(self.ports[port_id].pause())
-
-        return rc
+        return self.__exec_ports_op(port_id_list, Port.pause_op)
 
 
     def __stop (self, port_id_list = None, force = False):
 
         port_id_list = self.__ports(port_id_list)
-        rc = RC()
-
-        for port_id in port_id_list:
-            rc.add(self.ports[port_id].stop(force))
 
-        return rc
+        return self.__exec_ports_op(port_id_list, Port.stop_op, force)
 
 
     def __update (self, mult, port_id_list = None, force = False):
 
         port_id_list = self.__ports(port_id_list)
-        rc = RC()
 
-        for port_id in port_id_list:
-            rc.add(self.ports[port_id].update(mult, force))
-
-        return rc
+        return self.__exec_ports_op(port_id_list, Port.update_op, mult, force)
 
 
     def __validate (self, port_id_list = None):
         port_id_list = self.__ports(port_id_list)
 
-        rc = RC()
-
-        for port_id in port_id_list:
-            rc.add(self.ports[port_id].validate())
-
-        return rc
+        return self.__exec_ports_op(port_id_list, Port.validate_op)
 
 
     def __set_port_attr (self, port_id_list = None, attr_dict = None):
 
         port_id_list = self.__ports(port_id_list)
-        rc = RC()
-
-        for port_id in port_id_list:
-            rc.add(self.ports[port_id].set_attr(attr_dict))
 
-        return rc
+        return self.__exec_ports_op(port_id_list, Port.set_attr_op, attr_dict)
 
     # connect to server
     def __connect(self):
@@ -637,43 +768,50 @@ class STLClient(object):
         if not rc:
             return rc
 
-        # version
-        rc = self._transmit("get_version")
+        # version, system info and supported commands on a single batch
+        rc = self._transmit_batch([RpcCmdData("get_version", {}),
+                                   RpcCmdData("get_system_info", {}),
+                                   RpcCmdData("get_supported_cmds", {})])
         if not rc:
             return rc
 
+        rc_version, rc_system_info, rc_supported_cmds = rc.split()
 
-        self.server_version = rc.data()
-        self.global_stats.server_version = rc.data()
+        self.server_version = rc_version.data()
+        self.global_stats.server_version = rc_version.data()
 
         # cache system info
-        rc = self._transmit("get_system_info")
-        if not rc:
-            return rc
+        self.system_info = rc_system_info.data()
 
-        self.system_info = rc.data()
+        # the server reports the payload codecs it accepts with its version
+        self.comm_link.rpc_link.negotiate_codecs(self.server_version)
 
         # cache supported commands
-        rc = self._transmit("get_supported_cmds")
-        if not rc:
-            return rc
-
-        self.supported_cmds = rc.data()
+        self.supported_cmds = rc_supported_cmds.data()
 
         # create ports
         for port_id in xrange(self.system_info["port_count"]):
             speed = self.system_info['ports'][port_id]['speed']
             driver = self.system_info['ports'][port_id]['driver']
 
-            self.ports[port_id] = Port(port_id,
-                                       speed,
-                                       driver,
-                                       self.username,
-                                       self.comm_link,
-                                       self.session_id)
+            port = Port(port_id,
+                        speed,
+                        driver,
+                        self.username,
+                        self.comm_link,
+                        self.session_id)
+
+            # on reconnect, keep the known streams - the sync reuses packets that did not change
+            if port_id in self.ports:
+                port.streams = self.ports[port_id].streams
+
+            if self.stats_history:
+                port.port_stats.enable_history(self.stats_history)
 
+            self.ports[port_id] = port
 
-        # sync the ports
+
+        # sync the ports - all of them on a single batch
         rc = self.__sync_ports()
         if not rc:
             return rc
@@ -715,6 +853,8 @@ class STLClient(object):
         if clear_global:
             self.global_stats.clear_stats()
 
+        self.rx_stats.clear(port_id_list)
+
         self.logger.log_cmd("clearing stats on port(s) {0}:".format(port_id_list))
 
         return RC
@@ -724,7 +864,10 @@ class STLClient(object):
     def __get_stats (self, port_id_list):
         stats = {}
 
+        seq = self.async_client.get_stats_seq()
         stats['global'] = self.global_stats.get_stats()
+        stats['global']['seq'] = seq
+        stats['global']['ts']  = self.async_client.get_stats_ts()
 
         total = {}
         for port_id in port_id_list:
@@ -930,7 +1073,9 @@ class STLClient(object):
 
 
     # get stats
-    def get_stats (self, ports = None, async_barrier = True):
+    # min_seq - instead of a barrier wait for the snapshot 'min_seq' or newer
+    #           (see get_stats_seq and stats['global']['seq'])
+    def get_stats (self, ports = None, async_barrier = True, min_seq = None, timeout = 5):
         # by default use all ports
         if ports == None:
             ports = self.get_acquired_ports()
@@ -947,18 +1092,289 @@ class STLClient(object):
             raise STLArgumentError('async_barrier', async_barrier)
 
 
+        # wait for a snapshot - no round trip to the server
+        if min_seq != None:
+            if not self.event_handler.wait_until(lambda: self.async_client.get_stats_seq() >= min_seq, timeout):
+                raise STLTimeoutError(timeout)
+
         # if the user requested a barrier - use it
-        if async_barrier:
+        elif async_barrier:
             rc = self.async_client.barrier()
             if not rc:
                 raise STLError(rc)
 
         return self.__get_stats(ports)
 
+    # sequence number of the last stats snapshot - get_stats(min_seq = seq + 1) waits for the next one
+    # kept by the client - it keeps increasing across reconnects and server restarts
+    def get_stats_seq (self):
+        return self.async_client.get_stats_seq()
+
+
+    def __bookmark (self):
+        return {'global': self.global_stats.get_bookmark(),
+                'ports':  dict((port_id, port.port_stats.get_bookmark()) for port_id, port in self.ports.iteritems())}
+
+    """
+        save the current counters of all ports under a name
+        marks are independent of clear_stats and of each other
+
+        :parameters:
+            name : str
+                bookmark name (an existing one is replaced)
+
+            async_barrier : bool
+                sync with the server before marking
+
+        :raises:
+            + :exc:`STLError`
+
+    """
+    def mark (self, name, async_barrier = False):
+        if async_barrier:
+            rc = self.async_client.barrier()
+            if not rc:
+                raise STLError(rc)
+
+        self.bookmarks[name] = self.__bookmark()
+
+
+    def get_marks (self):
+        return self.bookmarks.keys()
+
+
+    def remove_mark (self, name):
+        self.bookmarks.pop(name, None)
+
+
+    """
+        counter deltas and average rates between two marks
+
+        :parameters:
+            start : str
+                start mark
+
+            end : str
+                end mark - None for the current counters
+
+            ports : list
+                ports to diff - None for all the ports of the marks
+
+        :returns:
+            dict like get_stats - 'global', port ids and 'total'
+            each has the counter deltas and '<counter>_rate' per second
+            'duration' is the time between the marks
+
+        :raises:
+            + :exc:`STLArgumentError`
+
+    """
+    def diff (self, start, end = None, ports = None):
+        for name in [start] + ([end] if end != None else []):
+            if not name in self.bookmarks:
+                raise STLArgumentError('mark', name, valid_values = self.get_marks())
+
+        start = self.bookmarks[start]
+        end   = self.bookmarks[end] if end != None else self.__bookmark()
+
+        # ports of both marks
+        valid_ports = sorted(set(start['ports']).intersection(end['ports']))
+
+        if ports == None:
+            ports = valid_ports
+        else:
+            if isinstance(ports, int):
+                ports = [ports]
+
+            rc = self._validate_port_list(ports)
+            if not rc or not all([port_id in valid_ports for port_id in ports]):
+                raise STLArgumentError('ports', ports, valid_values = valid_ports)
+
+        output = {}
+        output['duration'] = end['global'][0] - start['global'][0]
+        output['global']   = self.global_stats.diff_bookmarks(start['global'], end['global'])
+
+        total = {}
+        for port_id in ports:
+            diff = self.ports[port_id].port_stats.diff_bookmarks(start['ports'][port_id], end['ports'][port_id])
+            output[port_id] = diff
+
+            for k, v in diff.iteritems():
+                total[k] = total.get(k, 0) + v
+
+        output['total'] = total
+        return output
+
+    """
+        define a named group of ports for get_group_stats
+        e.g. the direction sets returned by stl_map_ports
+
+        :parameters:
+            name : str
+                group name
+
+            ports : list
+                ports of the group
+
+        :raises:
+            + :exc:`STLArgumentError` - invalid port list
+
+    """
+    def set_port_group (self, name, ports):
+        rc = self._validate_port_list(ports)
+        if not rc:
+            raise STLArgumentError('ports', ports, valid_values = self.get_all_ports())
+
+        self.port_groups.set_group(name, ports)
+
+
+    def remove_port_group (self, name):
+        self.port_groups.remove_group(name)
+
+
+    # name -> list of ports
+    def get_port_groups (self):
+        return self.port_groups.get_groups()
+
+
+    """
+        aggregated stats of a group of ports - one pass over the port snapshots
+        results of named groups are cached until a port of the group is updated,
+        so they should not be modified
+
+        :parameters:
+            group : str or list
+                a group name (see set_port_group) or a list of ports
+
+        :returns:
+            dict with 'ports' and 'total', 'mean', 'min' and 'max' dicts of field -> value
+            counters (opackets, ierrors...) are relative to the last clear_stats
+
+        :raises:
+            + :exc:`STLArgumentError` - unknown group or invalid port list
+
+    """
+    def get_group_stats (self, group):
+        if isinstance(group, (list, tuple, set)):
+            rc = self._validate_port_list(list(group))
+            if not rc:
+                raise STLArgumentError('group', group, valid_values = self.get_all_ports())
+
+        try:
+            return self.port_groups.aggregate(group)
+        except KeyError:
+            raise STLArgumentError('group', group, valid_values = self.get_port_groups().keys())
+
+
+    """
+        pre-aggregated history of a stats field - buckets of 'resolution' seconds
+        read without scanning the raw samples. needs STLClient(stats_history = seconds)
+
+        :parameters:
+            ports : list
+                ports to return - all by default
+
+            field : str
+                snapshot field (e.g. 'm_total_tx_pps' of ports, 'm_cpu_util' of the global stats)
+
+            resolution : int
+                bucket size in seconds - one of 1, 10, 60, 600
+
+            seconds : int
+                buckets covering the last 'seconds' - all kept buckets by default
+
+        :returns:
+            dict of 'global' and port ids -> list of (ts, min, max, avg, last, count) buckets
+            oldest first, the newest bucket may still be open
+
+        :raises:
+            + :exc:`STLError` - stats history is disabled
+            + :exc:`STLArgumentError` - invalid port list or resolution
+
+    """
+    def get_stats_rollup (self, ports, field, resolution = 60, seconds = None):
+        if not self.stats_history:
+            raise STLError("stats history is disabled - create the client with 'stats_history'")
+
+        if ports == None:
+            ports = self.get_all_ports()
+        elif isinstance(ports, int):
+            ports = [ports]
+
+        rc = self._validate_port_list(ports)
+        if not rc:
+            raise STLArgumentError('ports', ports, valid_values = self.get_all_ports())
+
+        resolutions = [level[0] for level in trex_stl_stats.CStatsRollup.LEVELS]
+        if not resolution in resolutions:
+            raise STLArgumentError('resolution', resolution, valid_values = resolutions)
+
+        output = {'global': self.global_stats.get_rollup(field, resolution, seconds)}
+        for port_id in ports:
+            output[port_id] = self.ports[port_id].port_stats.get_rollup(field, resolution, seconds)
+
+        return output
+
+
+    """
+        per stream RX stats of streams added with rx_stats = STLRxStats(user_id)
+        updated from the server publish - no RPC call per stream
+
+        :parameters:
+            user_ids : list
+                user ids to return - all by default
+
+        :returns:
+            dict of user_id -> {'tx_pkts', 'rx_pkts', 'tx_pps', 'rx_pps', 'loss'}
+            counters and rates are dicts of port -> value with a 'total'
+            counters are relative to the last clear_stats
+
+    """
+    def get_rx_stats (self, user_ids = None):
+        return self.rx_stats.get_stats(user_ids)
+
+
     # return all async events
     def get_events (self):
         return self.event_handler.get_events()
 
+    # RPC counters per method - calls, bytes and encode / wire / decode latency
+    def get_rpc_stats (self):
+        return self.comm_link.rpc_link.get_rpc_stats()
+
+    def clear_rpc_stats (self):
+        self.comm_link.rpc_link.clear_rpc_stats()
+
+    # record all RPC requests and responses to a file (see trex_stl_rpc_replay)
+    def start_rpc_recording (self, filename):
+        self.comm_link.rpc_link.start_recording(filename)
+
+    def stop_rpc_recording (self):
+        self.comm_link.rpc_link.stop_recording()
+
+    # record stats and latency snapshots to binary files - read with CStatsFileReader
+    def start_stats_recording (self, prefix, names = None):
+        self.async_client.start_recording(prefix, names)
+
+    # returns the recorded files - name -> filename
+    def stop_stats_recording (self):
+        return self.async_client.stop_recording()
+
+    # serve stats, port states and RPC metrics in OpenMetrics format on 'http://host:port/metrics'
+    # the page is rendered on scrape at most once per stats snapshot - scrapes do not reach the server
+    def start_metrics_exporter (self, port = 9180, host = ''):
+        self.stop_metrics_exporter()
+
+        self.metrics_exporter = STLMetricsExporter(self, port, host)
+        self.metrics_exporter.start()
+
+        return self.metrics_exporter.port
+
+    def stop_metrics_exporter (self):
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+            self.metrics_exporter = None
+
     ############################   Commands   #############################
     ############################              #############################
     ############################              #############################
@@ -1629,7 +2045,107 @@ class STLClient(object):
     """
     @__api_check(True)
     def wait_on_traffic (self, ports = None, timeout = 60):
+        self.wait_for(ports, 'idle', timeout)
+
+
+    # port states for wait_for / wait_any
+    WAIT_STATES = {'idle':    lambda port: not port.is_active(),
+                   'active':  lambda port: port.is_active(),
+                   'tx':      lambda port: port.is_transmitting(),
+                   'paused':  lambda port: port.is_paused()}
+
+    """
+        block until all the specified port(s) are in a state
+        woken by async events - no polling
+
+        :parameters:
+            ports : list
+                ports to wait on
+
+            state : str
+                one of 'idle', 'active', 'tx', 'paused'
+
+            timeout : int
+                timeout in seconds
+
+        :raises:
+            + :exc:`STLTimeoutError` - in case timeout has expired
+            + :exe:'STLError'
+
+    """
+    @__api_check(True)
+    def wait_for (self, ports = None, state = 'idle', timeout = 60):
+        ports, in_state = self.__prepare_wait(ports, state)
+
+        if not self.event_handler.wait_until(lambda: self.alerts.aborted or all(in_state(self.ports[port_id]) for port_id in ports), timeout):
+            self.__check_wait_connected()
+            raise STLTimeoutError(timeout)
+
+        self.__check_wait_alerts()
+
+
+    """
+        block until any of the specified port(s) is in a state
 
+        :parameters:
+            ports : list
+                ports to wait on
+
+            state : str
+                one of 'idle', 'active', 'tx', 'paused'
+
+            timeout : int
+                timeout in seconds
+
+        :returns:
+            list of the ports that are in the state
+
+        :raises:
+            + :exc:`STLTimeoutError` - in case timeout has expired
+            + :exe:'STLError'
+
+    """
+    @__api_check(True)
+    def wait_any (self, ports = None, state = 'idle', timeout = 60):
+        ports, in_state = self.__prepare_wait(ports, state)
+
+        done = []
+        def predicate ():
+            done[:] = [port_id for port_id in ports if in_state(self.ports[port_id])]
+            return self.alerts.aborted or len(done) > 0
+
+        if not self.event_handler.wait_until(predicate, timeout):
+            self.__check_wait_connected()
+            raise STLTimeoutError(timeout)
+
+        self.__check_wait_alerts()
+
+        return list(done)
+
+
+    """
+        call a function on async events
+
+        :parameters:
+            callback : function
+                called as callback(type, data) from the async thread
+
+            event_types : list
+                event types to call on (e.g. 4 for port job done) - None for all
+
+        :returns:
+            id for unregister_event_callback
+
+    """
+    def register_event_callback (self, callback, event_types = None):
+        return self.event_handler.register_callback(callback, event_types)
+
+
+    def unregister_event_callback (self, callback_id):
+        self.event_handler.unregister_callback(callback_id)
+
+
+    def __prepare_wait (self, ports, state):
         # by default use all acquired ports
         if ports == None:
             ports = self.get_acquired_ports()
@@ -1639,13 +2155,85 @@ class STLClient(object):
         if not rc:
             raise STLArgumentError('ports', ports, valid_values = self.get_all_ports())
 
-        expr = time.time() + timeout
+        if not state in self.WAIT_STATES:
+            raise STLArgumentError('state', state, valid_values = self.WAIT_STATES.keys())
+
+        return ports, self.WAIT_STATES[state]
+
+
+    def __check_wait_connected (self):
+        if not self.connected:
+            raise STLError("lost connection to server while waiting")
+
+
+    def __check_wait_alerts (self):
+        alert = self.alerts.aborted
+        if alert:
+            raise STLError("wait aborted by alert {0}".format(format_alert(alert)))
 
-        # wait while any of the required ports are active
-        while set(self.get_active_ports()).intersection(ports):
-            time.sleep(0.01)
-            if time.time() > expr:
-                raise STLTimeoutError(timeout)
+
+    """
+        add a threshold rule evaluated on every async stats snapshot
+
+        rules compare two operands - a number or '[coef *] field [delta]':
+            'rx_pps < 0.99 * tx_pps for 2 samples'
+            'ierrors delta > 0'
+
+        fields are port snapshot fields (or global ones with is_global) -
+        tx_pps, rx_pps, tx_bps, rx_bps, tx_bps_L1, line_util, opackets, ierrors...
+
+        :parameters:
+            rule : str
+                the rule - fires when it holds for the given samples (default 1)
+
+            ports : list
+                ports to evaluate on - all ports by default
+
+            callback : function
+                called as callback(alert) from the async thread when the rule fires
+
+            abort : bool
+                when the rule fires, wait_on_traffic / wait_for / wait_any raise STLError
+                until clear_alerts is called
+
+            name : str
+                name for the event log - the rule by default
+
+            is_global : bool
+                evaluate on the global stats (cpu_util, rx_drop_bps, queue_full...) instead of ports
+
+        :returns:
+            id for remove_alert
+
+        :raises:
+            + :exc:`STLError` - invalid rule
+
+    """
+    def add_alert (self, rule, ports = None, callback = None, abort = True, name = None, is_global = False):
+        if is_global:
+            scopes = ['global']
+        else:
+            scopes = ports if ports != None else self.get_all_ports()
+
+            rc = self._validate_port_list(scopes)
+            if not rc:
+                raise STLArgumentError('ports', ports, valid_values = self.get_all_ports())
+
+        return self.alerts.add(CStatsAlertRule(rule, scopes, callback, abort, name))
+
+
+    def remove_alert (self, alert_id):
+        self.alerts.remove(alert_id)
+
+
+    # alerts fired since the last clear_alerts - list of {'ts', 'name', 'rule', 'scope'}
+    def get_alerts (self):
+        return self.alerts.get_fired()
+
+
+    # clear fired alerts and the abort flag
+    def clear_alerts (self):
+        self.alerts.clear()
 
 
     #
@@ -2007,6 +2595,59 @@ class STLClient(object):
 
 
 
+    @__console
+    def show_rpc_stats_line (self, line):
+        '''Show RPC counters per method\n'''
+
+        clear = parsing_opts.ArgumentPack(['-c', '--clear'],
+                                          {'action': "store_true",
+                                           'default': False,
+                                           'help': "clear the RPC counters"})
+
+        parser = parsing_opts.gen_parser(self,
+                                         "rpcstats",
+                                         self.show_rpc_stats_line.__doc__,
+                                         clear)
+
+        opts = parser.parse_args(line.split())
+        if opts is None:
+            return
+
+        if opts.clear:
+            self.clear_rpc_stats()
+            self.logger.log(format_text("\nRPC counters were cleared\n", 'bold'))
+            return
+
+        stats = self.get_rpc_stats()
+        if not stats:
+            self.logger.log(format_text("\nNo RPC calls were made\n", 'bold'))
+            return
+
+        header = ["method", "calls", "msgs", "out", "out (raw)", "in", "in (raw)", "encode avg", "wire avg", "decode avg"]
+
+        table = text_tables.TRexTextTable()
+        table.set_cols_align(["l"] + ["r"] * (len(header) - 1))
+        table.set_cols_width([22, 8, 8, 10, 10, 10, 10, 14, 14, 14])
+        table.set_cols_dtype(['t'] * len(header))
+
+        # busiest methods first
+        for method, s in sorted(stats.items(), key = lambda x: x[1]['calls'], reverse = True):
+            avg = [format_time(s['latency'][phase]['total'] / s['messages']) if s['messages'] else "N/A"
+                   for phase in ['encode', 'wire', 'decode']]
+
+            table.add_row([method if method else "N/A",
+                           s['calls'],
+                           s['messages'],
+                           format_num(s['bytes_out'], suffix = 'B'),
+                           format_num(s['raw_bytes_out'], suffix = 'B'),
+                           format_num(s['bytes_in'], suffix = 'B'),
+                           format_num(s['raw_bytes_in'], suffix = 'B')] + avg)
+
+        table.header(header)
+
+        text_tables.print_table_with_header(table, "RPC statistics")
+
+
     @__console
     def validate_line (self, line):
         '''validates port(s) stream configuration\n'''
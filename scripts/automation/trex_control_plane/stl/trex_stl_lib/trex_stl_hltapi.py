@@ -31,6 +31,7 @@ traffic_config_kwargs = {
     'rate_percent': 10,
     'stream_id': None,
     'name': None,
+    'flow_stats_id': None,                  # TRex extention: enable per stream RX stats with this user id (see traffic_stats mode 'streams')
     'bidirectional': 0,
     'direction': 0,                         # ( 0 | 1 ) TRex extention: 1 = exchange sources and destinations
     'pkts_per_burst': 1,
@@ -161,7 +162,7 @@ traffic_control_kwargs = {
 }
 
 traffic_stats_kwargs = {
-    'mode': 'aggregate',                    # ( aggregate )
+    'mode': 'aggregate',                    # ( aggregate | streams | all )
     'port_handle': None
 }
 
@@ -577,10 +578,8 @@ class CTRexHltApi(object):
         ALLOWED_MODES = ['aggregate', 'streams', 'all']
         if mode not in ALLOWED_MODES:
             return HLT_ERR("'mode' must be one of the following values: %s" % ALLOWED_MODES)
-        if mode == 'streams':
-            return HLT_ERR("mode 'streams' not implemented'")
+        hlt_stats_dict = {}
         if mode in ('all', 'aggregate'):
-            hlt_stats_dict = {}
             try:
                 stats = self.trex_client.get_stats(port_handle)
             except Exception as e:
@@ -609,7 +608,31 @@ class CTRexHltApi(object):
                                 }
                             }
                         }
-            return HLT_OK(hlt_stats_dict)
+        if mode in ('all', 'streams'):
+            if type(port_handle) is not list:
+                port_handle = [port_handle] if port_handle is not None else self.trex_client.get_acquired_ports()
+            # streams created with flow_stats_id - taken from the published RX stats
+            rx_stats = self.trex_client.get_rx_stats()
+            for port_id in port_handle:
+                streams = {}
+                for stream_id, stream_args in self._streams_history.get(port_id, {}).items():
+                    user_id = stream_args.get('flow_stats_id')
+                    if user_id is None or user_id not in rx_stats:
+                        continue
+                    stream_stats = rx_stats[user_id]
+                    streams[stream_id] = {
+                        'tx': {
+                            'total_pkts': stream_stats['tx_pkts'].get(port_id, 0),
+                            'total_pkt_rate': stream_stats['tx_pps'].get(port_id, 0),
+                            },
+                        'rx': {
+                            'total_pkts': stream_stats['rx_pkts']['total'],
+                            'total_pkt_rate': stream_stats['rx_pps']['total'],
+                            'loss_pkts': stream_stats['loss'],
+                            }
+                        }
+                hlt_stats_dict.setdefault(port_id, {})['stream'] = streams
+        return HLT_OK(hlt_stats_dict)
 
 
     # remove streams from given port(s).
@@ -736,7 +759,7 @@ def STLHltStream(**user_kwargs):
                            #enabled = True,
                            #self_start = True,
                            mode = transmit_mode_class,
-                           #rx_stats = rx_stats,
+                           rx_stats = STLRxStats(kwargs['flow_stats_id']) if kwargs['flow_stats_id'] is not None else None,
                            stream_id = kwargs['stream_id'],
                            name = kwargs['name'],
                            )
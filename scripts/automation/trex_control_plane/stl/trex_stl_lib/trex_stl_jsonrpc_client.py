@@ -3,11 +3,14 @@
 import zmq
 import json
 import re
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from trex_stl_types import *
 from utils.common import random_id_gen
 import zlib
 import struct
+import threading
+import time
+import bisect
 
 
 class bcolors:
@@ -20,33 +23,180 @@ class bcolors:
     BOLD = '\033[1m'
     UNDERLINE = '\033[4m'
 
+# payload codecs - how a request is put on the wire
+# 'server_codec' is the codec the server must advertise to accept it
+class RpcCodec(object):
+    server_codec = None
+
+    def __init__ (self, name):
+        self.name = name
+
+    def encode (self, msg):
+        return msg
+
+# plain JSON text
+class RpcJsonCodec(RpcCodec):
+    def __init__ (self, name = 'json'):
+        super(RpcJsonCodec, self).__init__(name)
+
+# zlib at a given compression level - the server accepts any level
+class RpcZlibCodec(RpcCodec):
+    server_codec = 'zlib'
+    HEADER_MAGIC = 0xABE85CEA
+
+    def __init__ (self, name = 'zlib', level = zlib.Z_DEFAULT_COMPRESSION):
+        super(RpcZlibCodec, self).__init__(name)
+        self.level = level
+
+    def encode (self, msg):
+        return struct.pack(">II", self.HEADER_MAGIC, len(msg)) + zlib.compress(msg, self.level)
+
+
+# counters and latency histograms of a single RPC method
+# latency is split to encode, wire (send to reply) and decode
+class RpcMethodStats(object):
+    # upper bounds of the histogram buckets in seconds
+    BUCKETS = [0.0001, 0.001, 0.01, 0.1, 1.0]
+    BUCKET_NAMES = ['<100us', '<1ms', '<10ms', '<100ms', '<1s', '>=1s']
+    PHASES = ['encode', 'wire', 'decode']
+
+    def __init__ (self):
+        self.calls         = 0
+        self.messages      = 0
+        self.bytes_out     = 0
+        self.raw_bytes_out = 0
+        self.bytes_in      = 0
+        self.raw_bytes_in  = 0
+        self.latency       = dict([(phase, [0] * len(self.BUCKET_NAMES)) for phase in self.PHASES])
+        self.latency_total = dict([(phase, 0.0) for phase in self.PHASES])
+
+        # codec name -> [messages, raw bytes, encoded bytes]
+        self.codecs        = {}
+
+    def add_latency (self, phase, sec):
+        self.latency[phase][bisect.bisect_left(self.BUCKETS, sec)] += 1
+        self.latency_total[phase] += sec
+
+    # a request message encoded by 'codec'
+    def add_message (self, codec, raw_bytes, wire_bytes, encode_time):
+        self.messages      += 1
+        self.raw_bytes_out += raw_bytes
+        self.bytes_out     += wire_bytes
+        self.add_latency('encode', encode_time)
+
+        c = self.codecs.setdefault(codec, [0, 0, 0])
+        c[0] += 1
+        c[1] += raw_bytes
+        c[2] += wire_bytes
+
+    def to_dict (self):
+        return {'calls':         self.calls,
+                'messages':      self.messages,
+                'bytes_out':     self.bytes_out,
+                'raw_bytes_out': self.raw_bytes_out,
+                'bytes_in':      self.bytes_in,
+                'raw_bytes_in':  self.raw_bytes_in,
+                'codecs':        dict([(codec, {'messages':   messages,
+                                                'raw_bytes':  raw_bytes,
+                                                'wire_bytes': wire_bytes,
+                                                'ratio':      float(raw_bytes) / wire_bytes if wire_bytes else 0})
+                                       for codec, (messages, raw_bytes, wire_bytes) in self.codecs.items()]),
+                'latency':       dict([(phase, {'total': self.latency_total[phase],
+                                                'hist':  OrderedDict(zip(self.BUCKET_NAMES, self.latency[phase]))})
+                                       for phase in self.PHASES])}
+
+
+# records RPC requests and responses to an append-only file - one JSON object per line
+class RpcRecorder(object):
+    def __init__ (self, filename):
+        self.filename = filename
+        self.f = open(filename, 'a')
+        self.lock = threading.Lock()
+
+    def write (self, record):
+        line = json.dumps(record) + '\n'
+        with self.lock:
+            self.f.write(line)
+            self.f.flush()
+
+    def close (self):
+        with self.lock:
+            self.f.close()
+
+
 # sub class to describe a batch
 class BatchMessage(object):
     def __init__ (self, rpc_client):
         self.rpc_client = rpc_client
         self.batch_list = []
+        self.first_id   = None
+        self.method     = None
 
+    # requests are encoded as they are added
+    # params can be a dict or an already encoded JSON string
     def add (self, method_name, params={}):
 
-        id, msg = self.rpc_client.create_jsonrpc_v2(method_name, params, encode = False)
+        id, msg = self.rpc_client.create_jsonrpc_v2(method_name, params)
         self.batch_list.append(msg)
 
-    def invoke(self, block = False):
+        if self.first_id == None:
+            self.first_id = id
+            self.method   = method_name
+
+    # with block = False a future is returned instead of the response
+    def invoke(self, block = True):
         if not self.rpc_client.connected:
-            return RC_ERR("Not connected to server")
+            rc = RC_ERR("Not connected to server")
+            return rc if block else RpcFuture.resolved(rc)
+
+        msg = "[" + ", ".join(self.batch_list) + "]"
+
+        # the batch is tagged by the id of its first request
+        # and encoded by the codec of its first method
+        if block:
+            return self.rpc_client.send_msg(msg, self.first_id, self.method)
+        else:
+            return self.rpc_client.send_msg_async(msg, self.first_id, self.method)
+
+
+# a pending RPC request - resolved once the reply with its id arrives
+class RpcFuture(object):
+    def __init__ (self, rpc_client, id, compressed = False, method = None, sent_at = None, record = None):
+        self.rpc_client = rpc_client
+        self.id = id
+        self.compressed = compressed
+        self.method = method
+        self.sent_at = sent_at
+        self.record = record
+        self.rc = None
+
+    # a future that already holds a response
+    @staticmethod
+    def resolved (rc):
+        f = RpcFuture(None, None)
+        f.rc = rc
+        return f
+
+    def done (self):
+        return (self.rc != None)
 
-        msg = json.dumps(self.batch_list)
+    # block until the response arrives and return it as RC
+    def result (self):
+        if self.rc == None:
+            self.rc = self.rpc_client.wait_for_reply(self)
 
-        return self.rpc_client.send_msg(msg)
+        return self.rc
 
 
 # JSON RPC v2.0 client
 class JsonRpcClient(object):
 
     MSG_COMPRESS_THRESHOLD = 4096
-    MSG_COMPRESS_HEADER_MAGIC = 0xABE85CEA
+    MSG_COMPRESS_HEADER_MAGIC = RpcZlibCodec.HEADER_MAGIC
 
-    def __init__ (self, default_server, default_port, logger):
+    # pipelined - use a DEALER socket and allow many requests in flight
+    # otherwise fallback to a lock-step REQ socket
+    def __init__ (self, default_server, default_port, logger, pipelined = True):
         self.logger = logger
         self.connected = False
 
@@ -54,8 +204,32 @@ class JsonRpcClient(object):
         self.port   = default_port
         self.server = default_server
 
+        self.pipelined = pipelined
+
         self.id_gen = random_id_gen()
 
+        # pipelined mode - requests in flight and replies not yet claimed
+        self.in_flight = set()
+        self.replies   = {}
+        self.lock      = threading.Lock()
+
+        # codecs by name - bulk uploads favor speed over ratio
+        self.codecs = {}
+        for codec in [RpcJsonCodec(), RpcZlibCodec(), RpcZlibCodec('zlib-fast', level = 1)]:
+            self.add_codec(codec)
+
+        self.default_codec = 'zlib'
+        self.method_codecs = {'add_stream': 'zlib-fast'}
+
+        # servers that do not advertise codecs accept zlib
+        self.server_codecs = ['zlib']
+
+        # per method RPC counters (including the codecs used) - always on
+        self.rpc_stats = {}
+
+        # optional recording of all requests and responses
+        self.recorder = None
+
 
     def get_connection_details (self):
         rc = {}
@@ -64,6 +238,82 @@ class JsonRpcClient(object):
 
         return rc
 
+    # register a codec (e.g. RpcZlibCodec('zlib-max', level = 9))
+    def add_codec (self, codec):
+        self.codecs[codec.name] = codec
+
+    # set the codec for a method or the default codec when method is None
+    def set_codec (self, codec_name, method = None):
+        if not codec_name in self.codecs:
+            return RC_ERR("unknown codec '{0}' - valid codecs are: {1}".format(codec_name, self.codecs.keys()))
+
+        if method:
+            self.method_codecs[method] = codec_name
+        else:
+            self.default_codec = codec_name
+
+        return RC_OK()
+
+    # codecs are reported by the server in get_version as 'codecs'
+    def negotiate_codecs (self, server_version):
+        self.server_codecs = server_version.get('codecs') or ['zlib']
+
+    # the codec to encode a method with - falls back to JSON if the server does not accept it
+    def get_codec (self, method = None):
+        codec = self.codecs[self.method_codecs.get(method, self.default_codec)]
+        if codec.server_codec and not codec.server_codec in self.server_codecs:
+            return self.codecs['json']
+
+        return codec
+
+    def get_method_stats (self, method):
+        s = self.rpc_stats.get(method)
+        if s == None:
+            s = self.rpc_stats[method] = RpcMethodStats()
+        return s
+
+    # RPC counters per method (batches are accounted to their first method)
+    def get_rpc_stats (self):
+        return dict([(method, s.to_dict()) for method, s in self.rpc_stats.items()])
+
+    def clear_rpc_stats (self):
+        self.rpc_stats.clear()
+
+    # record every request and response to 'filename' (appended)
+    def start_recording (self, filename):
+        self.stop_recording()
+
+        self.recorder = RpcRecorder(filename)
+        self.recorder.write({'type': 'session', 'ts': time.time(), 'server': self.server, 'port': self.port})
+
+    def stop_recording (self):
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    # a record of a request about to be sent - None when not recording
+    def new_record (self, method, msg, wire_msg, compressed):
+        if not self.recorder:
+            return None
+
+        return {'type':         'rpc',
+                'ts':           time.time(),
+                'method':       method,
+                'request':      msg,
+                'request_size': len(wire_msg),
+                'compressed':   compressed}
+
+    # 'arrived' - when the response came off the wire (pipelined responses are decoded later)
+    def save_record (self, record, response, response_size, arrived):
+        recorder = self.recorder
+        if (record == None) or (recorder == None):
+            return
+
+        record['rtt']           = arrived - record['ts']
+        record['response']      = response
+        record['response_size'] = response_size
+        recorder.write(record)
+
     # pretty print for JSON
     def pretty_json (self, json_str, use_colors = True):
         pretty_str = json.dumps(json.loads(json_str), indent = 4, separators=(',', ': '), sort_keys = True)
@@ -93,7 +343,17 @@ class JsonRpcClient(object):
     def create_batch (self):
         return BatchMessage(self)
 
+    # params given as a string are taken as already encoded JSON (encode only)
     def create_jsonrpc_v2 (self, method_name, params = {}, encode = True):
+        self.get_method_stats(method_name).calls += 1
+
+        if isinstance(params, basestring):
+            id = self.id_gen.next()
+            msg = '{{"jsonrpc": "2.0", "method": {0}, "params": {1}, "id": {2}}}'.format(json.dumps(method_name),
+                                                                                        params,
+                                                                                        json.dumps(id))
+            return id, msg
+
         msg = {}
         msg["jsonrpc"] = "2.0"
         msg["method"]  = method_name
@@ -103,9 +363,9 @@ class JsonRpcClient(object):
         msg["id"] = self.id_gen.next()
 
         if encode:
-            return id, json.dumps(msg)
+            return msg["id"], json.dumps(msg)
         else:
-            return id, msg
+            return msg["id"], msg
 
 
     def invoke_rpc_method (self, method_name, params = {}):
@@ -114,14 +374,11 @@ class JsonRpcClient(object):
 
         id, msg = self.create_jsonrpc_v2(method_name, params)
 
-        return self.send_msg(msg)
+        return self.send_msg(msg, id, method_name)
 
 
     def compress_msg (self, msg):
-        # compress
-        compressed = zlib.compress(msg)
-        new_msg = struct.pack(">II", self.MSG_COMPRESS_HEADER_MAGIC, len(msg)) + compressed
-        return new_msg
+        return self.codecs['zlib'].encode(msg)
 
 
     def decompress_msg (self, msg):
@@ -138,21 +395,55 @@ class JsonRpcClient(object):
 
         return x
 
-    def send_msg (self, msg):
+    # prepare a message for the wire - returns (wire message, compressed)
+    def encode_msg (self, msg, method = None):
         # print before
         if self.logger.check_verbose(self.logger.VERBOSE_HIGH):
             self.verbose_msg("Sending Request To Server:\n\n" + self.pretty_json(msg) + "\n")
 
-        if len(msg) > self.MSG_COMPRESS_THRESHOLD:
-            response = self.send_raw_msg(self.compress_msg(msg))
-            if response:
-                response = self.decompress_msg(response)
-        else:
-            response = self.send_raw_msg(msg)
+        # small messages are not worth compressing
+        codec = self.get_codec(method) if len(msg) > self.MSG_COMPRESS_THRESHOLD else self.codecs['json']
+
+        start = time.time()
+        wire_msg = codec.encode(msg)
+        encode_time = time.time() - start
+
+        self.get_method_stats(method).add_message(codec.name, len(msg), len(wire_msg), encode_time)
+
+        return wire_msg, (codec.server_codec != None)
+
+
+    # process a response from the wire into RC
+    def decode_response (self, response, compressed, method = None, record = None, arrived = None):
+        if arrived == None:
+            arrived = time.time()
 
         if not response:
+            self.save_record(record, None, 0, arrived)
             return response
 
+        start = time.time()
+        s = self.get_method_stats(method)
+        s.bytes_in += len(response)
+        response_size = len(response)
+
+        if compressed:
+            response = self.decompress_msg(response)
+            if not response:
+                self.save_record(record, None, response_size, arrived)
+                return response
+
+        s.raw_bytes_in += len(response)
+        self.save_record(record, response, response_size, arrived)
+
+        rc = self.decode_json_response(response)
+        s.add_latency('decode', time.time() - start)
+
+        return rc
+
+
+    # process a plain JSON response into RC
+    def decode_json_response (self, response):
 
         # print after
         if self.logger.check_verbose(self.logger.VERBOSE_HIGH):
@@ -170,6 +461,54 @@ class JsonRpcClient(object):
             return self.process_single_response(response_json)
 
 
+    def send_msg (self, msg, id = None, method = None):
+        if self.pipelined:
+            return self.send_msg_async(msg, id, method).result()
+
+        raw_msg, compressed = self.encode_msg(msg, method)
+        record = self.new_record(method, msg, raw_msg, compressed)
+
+        start = time.time()
+        response = self.send_raw_msg(raw_msg)
+        arrived = time.time()
+        self.get_method_stats(method).add_latency('wire', arrived - start)
+
+        return self.decode_response(response, compressed, method, record, arrived)
+
+
+    # sends a message without waiting for the response
+    # the response is matched by 'id' when the future is resolved
+    def send_msg_async (self, msg, id = None, method = None):
+        # lock-step transport - nothing can be in flight
+        if not self.pipelined:
+            return RpcFuture.resolved(self.send_msg(msg, method = method))
+
+        if id == None:
+            id = self.id_gen.next()
+
+        raw_msg, compressed = self.encode_msg(msg, method)
+        record = self.new_record(method, msg, raw_msg, compressed)
+
+        with self.lock:
+            rc = self.send_raw_msg_tagged(id, raw_msg)
+            if not rc:
+                return RpcFuture.resolved(rc)
+
+            self.in_flight.add(id)
+
+        return RpcFuture(self, id, compressed, method, time.time(), record)
+
+
+    # block until the reply for 'future' arrives
+    def wait_for_reply (self, future):
+        with self.lock:
+            response, arrived = self.recv_raw_reply(future.id)
+
+        if response:
+            self.get_method_stats(future.method).add_latency('wire', arrived - future.sent_at)
+
+        return self.decode_response(response, future.compressed, future.method, future.record, arrived)
+
 
     # low level send of string message
     def send_raw_msg (self, msg):
@@ -199,6 +538,53 @@ class JsonRpcClient(object):
 
 
         return response
+
+
+    # low level send over the DEALER socket
+    # the tag is carried in the envelope and echoed back by the server
+    def send_raw_msg_tagged (self, tag, msg):
+
+        tries = 0
+        while True:
+            try:
+                self.socket.send_multipart([tag, '', msg])
+                return RC_OK()
+            except zmq.Again:
+                tries += 1
+                if tries > 5:
+                    self.disconnect()
+                    return RC_ERR("*** [RPC] - Failed to send message to server")
+
+
+    # low level receive of a tagged reply - returns (reply, arrival time)
+    # replies for other requests in flight are kept until claimed
+    def recv_raw_reply (self, tag):
+
+        tries = 0
+        while not tag in self.replies:
+            if not self.connected:
+                return RC_ERR("*** [RPC] - Connection to server was lost at {0}".format(self.transport)), None
+
+            try:
+                frames = self.socket.recv_multipart()
+            except zmq.Again:
+                tries += 1
+                if tries > 5:
+                    self.disconnect()
+                    return RC_ERR("*** [RPC] - Failed to get server response at {0}".format(self.transport)), None
+                continue
+
+            # [tag, empty delimiter, response]
+            if len(frames) != 3:
+                continue
+
+            # late replies of requests that were given up on are dropped
+            if frames[0] in self.in_flight:
+                self.replies[frames[0]] = (frames[2], time.time())
+
+        self.in_flight.discard(tag)
+
+        return self.replies.pop(tag)
        
      
 
@@ -240,6 +626,8 @@ class JsonRpcClient(object):
             self.socket.close(linger = 0)
             self.context.destroy(linger = 0)
             self.connected = False
+            self.in_flight.clear()
+            self.replies.clear()
             return RC_OK()
         else:
             return RC_ERR("Not connected to server")
@@ -257,7 +645,7 @@ class JsonRpcClient(object):
         #  Socket to talk to server
         self.transport = "tcp://{0}:{1}".format(self.server, self.port)
 
-        self.socket = self.context.socket(zmq.REQ)
+        self.socket = self.context.socket(zmq.DEALER if self.pipelined else zmq.REQ)
         try:
             self.socket.connect(self.transport)
         except zmq.error.ZMQError as e:
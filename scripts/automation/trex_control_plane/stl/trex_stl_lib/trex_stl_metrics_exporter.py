@@ -0,0 +1,285 @@
+#!/router/bin/python
+
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+import threading
+import time
+
+from trex_stl_port import Port
+from trex_stl_jsonrpc_client import RpcMethodStats
+
+# OpenMetrics exporter of the stateless client stats
+#
+# the page is rendered on a scrape, only if a new stats snapshot arrived
+# since the last render - otherwise the cached page is written. nothing is
+# done when nobody scrapes and a scrape never triggers a server call
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# (metric, snapshot field, help)
+GLOBAL_GAUGES = [('trex_cpu_util',        'm_cpu_util',       'DP cores utilization in percent'),
+                 ('trex_tx_bps',          'm_tx_bps',         'total TX L2 bits per second'),
+                 ('trex_tx_bps_l1',       'm_tx_bps_L1',      'total TX L1 bits per second'),
+                 ('trex_tx_pps',          'm_tx_pps',         'total TX packets per second'),
+                 ('trex_rx_bps',          'm_rx_bps',         'total RX bits per second'),
+                 ('trex_rx_pps',          'm_rx_pps',         'total RX packets per second'),
+                 ('trex_rx_drop_bps',     'm_rx_drop_bps',    'total RX drop bits per second')]
+
+GLOBAL_COUNTERS = [('trex_tx_packets',    'm_total_tx_pkts',     'total TX packets'),
+                   ('trex_rx_packets',    'm_total_rx_pkts',     'total RX packets'),
+                   ('trex_tx_bytes',      'm_total_tx_bytes',    'total TX bytes'),
+                   ('trex_rx_bytes',      'm_total_rx_bytes',    'total RX bytes'),
+                   ('trex_alloc_errors',  'm_total_alloc_error', 'total packet allocation errors'),
+                   ('trex_queue_full',    'm_total_queue_full',  'total TX queue full events'),
+                   ('trex_queue_drops',   'm_total_queue_drop',  'total TX queue drops')]
+
+PORT_GAUGES = [('trex_port_tx_bps',       'm_total_tx_bps',    'port TX L2 bits per second'),
+               ('trex_port_tx_bps_l1',    'm_total_tx_bps_L1', 'port TX L1 bits per second'),
+               ('trex_port_tx_pps',       'm_total_tx_pps',    'port TX packets per second'),
+               ('trex_port_rx_bps',       'm_total_rx_bps',    'port RX bits per second'),
+               ('trex_port_rx_pps',       'm_total_rx_pps',    'port RX packets per second'),
+               ('trex_port_line_util',    'm_percentage',      'port TX line utilization in percent')]
+
+PORT_COUNTERS = [('trex_port_opackets',   'opackets',  'port TX packets'),
+                 ('trex_port_obytes',     'obytes',    'port TX bytes'),
+                 ('trex_port_ipackets',   'ipackets',  'port RX packets'),
+                 ('trex_port_ibytes',     'ibytes',    'port RX bytes'),
+                 ('trex_port_oerrors',    'oerrors',   'port TX errors'),
+                 ('trex_port_ierrors',    'ierrors',   'port RX errors')]
+
+PORT_STATES = sorted(set(Port.STATES_MAP.values()))
+
+
+def format_value (value):
+    if isinstance(value, float):
+        if value != value:
+            return 'NaN'
+        return repr(value)
+    return str(value)
+
+
+def escape_label (value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels (labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{0}="{1}"'.format(k, escape_label(v)) for k, v in labels) + '}'
+
+
+# builds a page - one family at a time
+class CMetricsPage(object):
+    def __init__ (self):
+        self.lines = []
+
+    def family (self, name, type, help):
+        self.lines.append('# TYPE {0} {1}'.format(name, type))
+        self.lines.append('# HELP {0} {1}'.format(name, help))
+
+    def sample (self, name, value, labels = None):
+        self.lines.append('{0}{1} {2}'.format(name, format_labels(labels), format_value(value)))
+
+    def render (self):
+        self.lines.append('# EOF')
+        return '\n'.join(self.lines) + '\n'
+
+
+class CMetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET (self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        page = self.server.exporter.get_page()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    # scrapes are not logged
+    def log_message (self, format, *args):
+        pass
+
+
+class CMetricsHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class STLMetricsExporter(object):
+    def __init__ (self, client, port = 9180, host = ''):
+        self.client = client
+        self.host   = host
+        self.port   = port
+
+        # last rendered page and the snapshot it was rendered for
+        self.page     = None
+        self.page_key = None
+        self.lock     = threading.Lock()
+
+        self.server = None
+        self.thread = None
+
+
+    def start (self):
+        self.server = CMetricsHTTPServer((self.host, self.port), CMetricsRequestHandler)
+        self.server.exporter = self
+
+        # the actual port when started on port 0
+        self.port = self.server.server_address[1]
+
+        self.thread = threading.Thread(target = self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+
+    def stop (self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.server = None
+
+
+    def is_running (self):
+        return self.server != None
+
+
+    # called per scrape - renders once per stats snapshot
+    def get_page (self):
+        async_client = self.client.async_client
+        key = (async_client.get_stats_seq(), async_client.get_stats_ts())
+
+        with self.lock:
+            if key != self.page_key:
+                self.page     = self.render()
+                self.page_key = key
+
+            return self.page
+
+
+    def render (self):
+        client = self.client
+        page = CMetricsPage()
+
+        page.family('trex_connected', 'gauge', 'connection state to the server')
+        page.sample('trex_connected', 1 if client.is_connected() else 0)
+
+        page.family('trex_stats_seq', 'gauge', 'sequence number of the last stats snapshot')
+        page.sample('trex_stats_seq', client.async_client.get_stats_seq())
+
+        page.family('trex_stats_coalesced', 'counter', 'stats snapshots dropped for a newer one')
+        page.sample('trex_stats_coalesced_total', client.async_client.get_coalesced_count())
+
+        # snapshots are replaced, not modified - safe to read without a lock
+        snapshot = client.global_stats.latest_stats
+
+        for name, field, help in GLOBAL_GAUGES:
+            if field in snapshot:
+                page.family(name, 'gauge', help)
+                page.sample(name, snapshot[field])
+
+        for name, field, help in GLOBAL_COUNTERS:
+            if field in snapshot:
+                page.family(name, 'counter', help)
+                page.sample(name + '_total', snapshot[field])
+
+        self.render_ports(page)
+        self.render_rollups(page)
+        self.render_groups(page)
+        self.render_rpc(page)
+
+        return page.render()
+
+
+    def render_ports (self, page):
+        ports = [(str(port_id), port) for port_id, port in sorted(self.client.ports.iteritems())]
+
+        page.family('trex_port_state', 'stateset', 'port state')
+        for port_id, port in ports:
+            state = port.get_port_state_name()
+            for name in PORT_STATES:
+                page.sample('trex_port_state', 1 if name == state else 0, [('port', port_id), ('trex_port_state', name)])
+
+        snapshots = [(port_id, port.port_stats.latest_stats) for port_id, port in ports]
+
+        for name, field, help in PORT_GAUGES:
+            page.family(name, 'gauge', help)
+            for port_id, snapshot in snapshots:
+                if field in snapshot:
+                    page.sample(name, snapshot[field], [('port', port_id)])
+
+        for name, field, help in PORT_COUNTERS:
+            page.family(name, 'counter', help)
+            for port_id, snapshot in snapshots:
+                if field in snapshot:
+                    page.sample(name + '_total', snapshot[field], [('port', port_id)])
+
+
+    # average and peak port rates of the last closed minute - from the stats rollups
+    # (only with STLClient(stats_history = ...))
+    def render_rollups (self, page):
+        if not self.client.stats_history:
+            return
+
+        ports = sorted(self.client.ports)
+        now = time.time()
+
+        for name, field, help in PORT_GAUGES:
+            rollups = self.client.get_stats_rollup(ports, field, resolution = 60, seconds = 120)
+
+            last = []
+            for port_id in ports:
+                closed = [bucket for bucket in rollups[port_id] if bucket.ts + 60 <= now]
+                if closed:
+                    last.append((str(port_id), closed[-1]))
+
+            for stat in ('avg', 'max'):
+                page.family('{0}_1m_{1}'.format(name, stat), 'gauge', '{0} - {1} of the last minute'.format(help, stat))
+                for port_id, bucket in last:
+                    page.sample('{0}_1m_{1}'.format(name, stat), getattr(bucket, stat), [('port', port_id)])
+
+
+    # rates of the port groups - summed over the ports of each group
+    def render_groups (self, page):
+        groups = sorted(self.client.port_groups.get_groups())
+        if not groups:
+            return
+
+        totals = [(name, self.client.port_groups.aggregate(name)['total']) for name in groups]
+
+        for name, field, help in PORT_GAUGES:
+            metric = name.replace('trex_port_', 'trex_group_')
+            page.family(metric, 'gauge', help.replace('port ', 'port group ', 1))
+            for group, total in totals:
+                if field in total:
+                    page.sample(metric, total[field], [('group', group)])
+
+
+    def render_rpc (self, page):
+        rpc_stats = sorted(self.client.get_rpc_stats().iteritems())
+
+        for name, field, help in [('trex_rpc_calls',     'calls',     'RPC calls'),
+                                  ('trex_rpc_bytes_out', 'bytes_out', 'RPC bytes sent'),
+                                  ('trex_rpc_bytes_in',  'bytes_in',  'RPC bytes received')]:
+            page.family(name, 'counter', help)
+            for method, stats in rpc_stats:
+                page.sample(name + '_total', stats[field], [('method', method)])
+
+        # wire latency - send to reply
+        page.family('trex_rpc_latency_seconds', 'histogram', 'RPC wire latency')
+        for method, stats in rpc_stats:
+            wire = stats['latency']['wire']
+            counts = wire['hist'].values()
+
+            total = 0
+            for bound, count in zip(RpcMethodStats.BUCKETS, counts):
+                total += count
+                page.sample('trex_rpc_latency_seconds_bucket', total, [('method', method), ('le', repr(bound))])
+
+            total += counts[-1]
+            page.sample('trex_rpc_latency_seconds_bucket', total, [('method', method), ('le', '+Inf')])
+            page.sample('trex_rpc_latency_seconds_count', total, [('method', method)])
+            page.sample('trex_rpc_latency_seconds_sum', wire['total'], [('method', method)])
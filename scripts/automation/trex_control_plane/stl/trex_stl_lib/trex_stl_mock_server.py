@@ -0,0 +1,849 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Copyright (c) 2015-2015 Cisco Systems, Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+# mock server can be run as a standalone
+import trex_stl_ext
+
+import zmq
+import json
+import zlib
+import struct
+import base64
+import random
+import string
+import socket
+import time
+import threading
+import argparse
+from collections import OrderedDict
+
+# a pure Python stand-in for the stateless server
+#
+# implements the RPC commands (over ZMQ REP) and the async publisher
+# (trex-global, trex-event and trex-barrier over ZMQ PUB)
+# no traffic is generated - port counters are derived from the
+# stream rates so the control plane sees realistic values
+
+MSG_COMPRESS_HEADER_MAGIC = 0xABE85CEA
+
+# JSON RPC error codes as used by the server
+JSONRPC_V2_ERR_PARSE            = -32700
+JSONRPC_V2_ERR_INVALID_REQ      = -32600
+JSONRPC_V2_ERR_METHOD_NOT_FOUND = -32601
+JSONRPC_V2_ERR_INVALID_PARAMS   = -32602
+JSONRPC_V2_ERR_EXECUTE_ERROR    = -32000
+
+# async event types
+EVENT_PORT_STARTED        = 0
+EVENT_PORT_STOPPED        = 1
+EVENT_PORT_PAUSED         = 2
+EVENT_PORT_RESUMED        = 3
+EVENT_PORT_FINISHED_TX    = 4
+EVENT_PORT_FORCE_ACQUIRED = 5
+EVENT_SERVER_STOPPED      = 100
+
+
+class MockRpcError(Exception):
+    def __init__ (self, code, msg, specific_err):
+        super(MockRpcError, self).__init__(specific_err)
+        self.code = code
+        self.msg = msg
+        self.specific_err = specific_err
+
+def parse_err (specific_err):
+    return MockRpcError(JSONRPC_V2_ERR_INVALID_PARAMS, "Bad paramters for method", specific_err)
+
+def execute_err (specific_err):
+    return MockRpcError(JSONRPC_V2_ERR_EXECUTE_ERROR, "Failed To Execute Method", specific_err)
+
+
+# a single mock port
+class MockPort(object):
+    STATE_IDLE    = 1
+    STATE_STREAMS = 2
+    STATE_TX      = 4
+    STATE_PAUSE   = 8
+
+    STATE_NAMES = {STATE_IDLE:    "IDLE",
+                   STATE_STREAMS: "STREAMS",
+                   STATE_TX:      "TX",
+                   STATE_PAUSE:   "PAUSE"}
+
+    def __init__ (self, server, port_id, speed, driver):
+        self.server  = server
+        self.port_id = port_id
+        self.speed   = speed
+        self.driver  = driver
+
+        self.state   = self.STATE_IDLE
+        self.owner   = ""
+        self.handler = ""
+
+        self.promiscuous = False
+
+        # stream id -> (stream json, packet binary)
+        self.streams = {}
+
+        self.factor    = 1.0
+        self.end_time  = None
+        self.last_tick = time.time()
+
+        # kept as floats so slow rates are not lost to rounding
+        self.counters = dict.fromkeys(['opackets', 'obytes', 'ipackets', 'ibytes', 'ierrors', 'oerrors'], 0.0)
+
+        # rx stats user id -> packets (sent and looped back on this port)
+        self.flow_counters = {}
+
+    def get_speed_bps (self):
+        return self.speed * 1000.0 * 1000 * 1000
+
+    def get_state_name (self):
+        return self.STATE_NAMES[self.state]
+
+    def verify_state (self, state):
+        if not (self.state & state):
+            raise execute_err("command cannot be executed on current state: '{0}'".format(self.get_state_name()))
+
+    # ownership
+
+    def acquire (self, user, session_id, force):
+        if self.owner and not force:
+            if self.owner == user:
+                raise execute_err("port is already owned by another session of '{0}'".format(user))
+            else:
+                raise execute_err("port is already taken by '{0}'".format(self.owner))
+
+        if self.owner:
+            self.server.publish_event(EVENT_PORT_FORCE_ACQUIRED, {'port_id': self.port_id, 'who': user, 'session_id': session_id})
+
+        self.owner = user
+        self.handler = ''.join(random.choice(string.ascii_letters + string.digits) for _ in xrange(8))
+        return self.handler
+
+    def release (self):
+        self.owner = ""
+        self.handler = ""
+
+    def verify_ownership (self, handler):
+        if not self.owner:
+            raise execute_err("please acquire the port before modifying port state")
+
+        if handler != self.handler:
+            raise execute_err("port is not owned by you or your current executing session")
+
+    # streams
+
+    def add_stream (self, stream_id, stream):
+        self.verify_state(self.STATE_IDLE | self.STATE_STREAMS)
+
+        try:
+            pkt = base64.b64decode(stream['packet']['binary'])
+            stream['mode']['rate']['type']
+        except (KeyError, TypeError):
+            raise parse_err("bad stream format")
+
+        self.streams[stream_id] = (stream, pkt)
+        self.state = self.STATE_STREAMS
+
+    def remove_stream (self, stream_id):
+        if not stream_id in self.streams:
+            raise execute_err("stream {0} does not exists".format(stream_id))
+
+        self.verify_state(self.STATE_STREAMS)
+
+        del self.streams[stream_id]
+        if not self.streams:
+            self.state = self.STATE_IDLE
+
+    def remove_all_streams (self):
+        self.verify_state(self.STATE_IDLE | self.STATE_STREAMS)
+
+        self.streams = {}
+        self.state = self.STATE_IDLE
+
+    # stream JSON as returned to the client
+    def get_stream_json (self, stream_id, get_pkt, pkt_info = False):
+        stream, pkt = self.streams[stream_id]
+        stream = dict(stream)
+
+        if not get_pkt:
+            del stream['packet']
+            if pkt_info:
+                stream['packet_info'] = {'len': max(len(pkt), 60), 'crc32': zlib.crc32(pkt) & 0xffffffff}
+
+        return stream
+
+    # rates
+
+    # PPS of a single stream at a factor of 1
+    def get_stream_pps (self, stream, pkt):
+        rate = stream['mode']['rate']
+        l2_bits = max(len(pkt), 60) * 8.0
+        l1_bits = l2_bits + 20 * 8
+
+        if rate['type'] == 'pps':
+            return rate['value']
+        elif rate['type'] == 'bps_L2':
+            return rate['value'] / l2_bits
+        elif rate['type'] == 'bps_L1':
+            return rate['value'] / l1_bits
+        elif rate['type'] == 'percentage':
+            return (rate['value'] / 100.0) * self.get_speed_bps() / l1_bits
+
+        raise parse_err("unknown rate type '{0}'".format(rate['type']))
+
+    # max rates of the whole profile - all enabled streams are assumed to run together
+    def get_max_rates (self):
+        max_pps = max_bps_l2 = max_bps_l1 = 0.0
+
+        for stream, pkt in self.streams.values():
+            if not stream.get('enabled', True):
+                continue
+
+            pps = self.get_stream_pps(stream, pkt)
+            max_pps    += pps
+            max_bps_l2 += pps * max(len(pkt), 60) * 8
+            max_bps_l1 += pps * (max(len(pkt), 60) + 20) * 8
+
+        return max_pps, max_bps_l2, max_bps_l1
+
+    # time for all burst streams to finish at a factor - None for continuous
+    def get_profile_duration (self, factor):
+        duration = 0.0
+
+        for stream, pkt in self.streams.values():
+            if not stream.get('enabled', True):
+                continue
+
+            mode = stream['mode']
+            pps = self.get_stream_pps(stream, pkt) * factor
+
+            if mode['type'] == 'single_burst':
+                duration = max(duration, mode['total_pkts'] / pps)
+            elif mode['type'] == 'multi_burst':
+                duration = max(duration, mode['count'] * (mode['pkts_per_burst'] / pps + mode['ibg'] / 1000000.0))
+            else:
+                return None
+
+        return duration
+
+    def calculate_factor (self, mul):
+        max_pps, max_bps_l2, max_bps_l1 = self.get_max_rates()
+
+        if mul['type'] == 'raw':
+            return mul['value']
+        elif mul['type'] == 'bps':
+            return mul['value'] / max_bps_l2
+        elif mul['type'] == 'pps':
+            return mul['value'] / max_pps
+        elif mul['type'] == 'percentage':
+            if mul['op'] == 'abs':
+                return ((mul['value'] / 100.0) * self.get_speed_bps()) / max_bps_l1
+            else:
+                return self.factor * (mul['value'] / 100.0)
+
+        raise parse_err("bad type str: {0}".format(mul['type']))
+
+    def verify_line_rate (self, factor, force):
+        max_bps_l1 = self.get_max_rates()[2]
+        expected_l1_rate = factor * max_bps_l1
+
+        if (not force) and (expected_l1_rate > self.get_speed_bps()):
+            raise execute_err("Expected L1 B/W: '{0} Gbps' exceeds port line rate: '{1} Gbps'".format(expected_l1_rate / 1e9, self.get_speed_bps() / 1e9))
+
+    # traffic
+
+    def start (self, mul, duration, force):
+        self.verify_state(self.STATE_STREAMS)
+
+        if mul['op'] != 'abs':
+            raise parse_err("start message can only specify absolute speed rate")
+
+        factor = self.calculate_factor(mul)
+        self.verify_line_rate(factor, force)
+
+        self.factor    = factor
+        self.state     = self.STATE_TX
+        self.last_tick = time.time()
+
+        # when will the traffic end by itself
+        if duration > 0:
+            self.end_time = time.time() + duration
+        else:
+            profile_duration = self.get_profile_duration(factor)
+            self.end_time = (time.time() + profile_duration) if profile_duration != None else None
+
+        self.server.publish_event(EVENT_PORT_STARTED, {'port_id': self.port_id})
+
+    def stop (self, event_triggered = False):
+        if not (self.state & (self.STATE_TX | self.STATE_PAUSE)):
+            return
+
+        self.state    = self.STATE_STREAMS
+        self.end_time = None
+
+        self.server.publish_event(EVENT_PORT_FINISHED_TX if event_triggered else EVENT_PORT_STOPPED, {'port_id': self.port_id})
+
+    def pause (self):
+        self.verify_state(self.STATE_TX)
+
+        if self.end_time != None:
+            raise execute_err(" pause is supported when all streams are in continues mode ")
+
+        self.state = self.STATE_PAUSE
+        self.server.publish_event(EVENT_PORT_PAUSED, {'port_id': self.port_id})
+
+    def resume (self):
+        self.verify_state(self.STATE_PAUSE)
+
+        self.state = self.STATE_TX
+        self.server.publish_event(EVENT_PORT_RESUMED, {'port_id': self.port_id})
+
+    def update (self, mul, force):
+        self.verify_state(self.STATE_TX | self.STATE_PAUSE)
+
+        new_factor = self.calculate_factor(mul)
+
+        if mul['op'] == 'abs':
+            factor = new_factor
+        elif mul['op'] == 'add':
+            factor = self.factor + new_factor
+        elif mul['op'] == 'sub':
+            factor = self.factor - new_factor
+            if factor <= 0:
+                raise execute_err("Update request will lower traffic to less than zero")
+        else:
+            raise parse_err("bad op str: {0}".format(mul['op']))
+
+        self.verify_line_rate(factor, force)
+        self.factor = factor
+
+    def validate (self):
+        if not self.streams:
+            raise execute_err("no streams attached to port")
+
+        max_pps, max_bps_l2, max_bps_l1 = self.get_max_rates()
+        duration = self.get_profile_duration(1.0)
+
+        return {'rate':  {'max_bps_l2':    max_bps_l2,
+                          'max_bps_l1':    max_bps_l1,
+                          'max_pps':       max_pps,
+                          'max_line_util': (max_bps_l1 / self.get_speed_bps()) * 100.0},
+                'graph': {'expected_duration': (duration * 1000000.0) if duration != None else -1,
+                          'events_count':      0,
+                          'events':            []}}
+
+    # stats
+
+    # current TX rates - (pps, bps)
+    def get_tx_rates (self):
+        if self.state != self.STATE_TX:
+            return 0.0, 0.0
+
+        max_pps, max_bps_l2, _ = self.get_max_rates()
+        return max_pps * self.factor, max_bps_l2 * self.factor
+
+    # advance the counters up to 'now' - ports are assumed to be looped back
+    def tick (self, now):
+        pps, bps = self.get_tx_rates()
+
+        # traffic that ended during this tick is counted up to its end
+        ended = (self.state == self.STATE_TX) and (self.end_time != None) and (now >= self.end_time)
+        dt = max(0, (self.end_time if ended else now) - self.last_tick)
+        self.last_tick = now
+
+        self.counters['opackets'] += pps * dt
+        self.counters['obytes']   += bps * dt / 8
+        self.counters['ipackets'] += pps * dt
+        self.counters['ibytes']   += bps * dt / 8
+
+        # streams with rx stats are counted per user id
+        if pps > 0:
+            for stream, pkt in self.streams.values():
+                rx_stats = stream.get('rx_stats', {})
+                if stream.get('enabled', True) and rx_stats.get('enabled'):
+                    user_id = rx_stats['stream_id']
+                    self.flow_counters[user_id] = self.flow_counters.get(user_id, 0.0) + self.get_stream_pps(stream, pkt) * self.factor * dt
+
+        if ended:
+            self.stop(event_triggered = True)
+
+    def get_counter (self, name):
+        return int(round(self.counters[name]))
+
+    def get_port_stats (self):
+        pps, bps = self.get_tx_rates()
+
+        return {'tx_bps':         bps,
+                'rx_bps':         bps,
+                'tx_pps':         pps,
+                'rx_pps':         pps,
+                'total_tx_pkts':  self.get_counter('opackets'),
+                'total_rx_pkts':  self.get_counter('ipackets'),
+                'total_tx_bytes': self.get_counter('obytes'),
+                'total_rx_bytes': self.get_counter('ibytes'),
+                'tx_rx_errors':   0}
+
+
+# the mock server - a single thread serves the RPC socket and the publisher
+class STLMockServer(object):
+
+    def __init__ (self, port_count = 4, sync_port = 4501, async_port = 4500, stats_rate = 2.0, speed = 10, driver = 'mock'):
+        self.sync_port  = sync_port
+        self.async_port = async_port
+
+        # publishes per second of trex-global
+        self.stats_rate = stats_rate
+
+        self.ports = [MockPort(self, port_id, speed, driver) for port_id in xrange(port_count)]
+
+        self.start_ts = time.time()
+        self.stats_seq = 0
+        self.active   = False
+        self.t        = None
+
+        # method -> (handler, param count, needs ownership)
+        self.cmds = {'ping':               (self.rpc_ping,               0, False),
+                     'publish_now':        (self.rpc_publish_now,        1, False),
+                     'get_supported_cmds': (self.rpc_get_supported_cmds, 0, False),
+                     'get_version':        (self.rpc_get_version,        0, False),
+                     'get_system_info':    (self.rpc_get_system_info,    0, False),
+                     'get_owner':          (self.rpc_get_owner,          1, False),
+                     'acquire':            (self.rpc_acquire,            4, False),
+                     'release':            (self.rpc_release,            1, True),
+                     'get_port_stats':     (self.rpc_get_port_stats,     1, False),
+                     'get_port_status':    (self.rpc_get_port_status,    1, False),
+                     'set_port_attr':      (self.rpc_set_port_attr,      3, False),
+                     'add_stream':         (self.rpc_add_stream,         3, True),
+                     'remove_stream':      (self.rpc_remove_stream,      2, True),
+                     'remove_all_streams': (self.rpc_remove_all_streams, 1, True),
+                     'get_stream_list':    (self.rpc_get_stream_list,    1, False),
+                     'get_stream':         (self.rpc_get_stream,         3, False),
+                     'get_all_streams':    (self.rpc_get_all_streams,    1, False),
+                     'start_traffic':      (self.rpc_start_traffic,      4, True),
+                     'stop_traffic':       (self.rpc_stop_traffic,       1, True),
+                     'pause_traffic':      (self.rpc_pause_traffic,      1, True),
+                     'resume_traffic':     (self.rpc_resume_traffic,     1, True),
+                     'update_traffic':     (self.rpc_update_traffic,     3, True),
+                     'validate':           (self.rpc_validate,           2, False)}
+
+        # method -> params that may be omitted
+        self.opt_params = {'get_all_streams': 1}
+
+
+    ############################   control   #############################
+
+    # run the server on a background thread
+    def start (self):
+        self.bind()
+
+        self.active = True
+        self.t = threading.Thread(target = self.__run)
+        self.t.setDaemon(True)
+        self.t.start()
+
+    def stop (self):
+        if not self.active:
+            return
+
+        self.active = False
+        self.t.join()
+
+    # run the server on the calling thread
+    def run (self):
+        self.bind()
+
+        self.active = True
+        self.__run()
+
+    def bind (self):
+        self.context = zmq.Context()
+
+        self.rpc_socket = self.context.socket(zmq.REP)
+        self.rpc_socket.bind("tcp://*:{0}".format(self.sync_port))
+
+        self.pub_socket = self.context.socket(zmq.PUB)
+        self.pub_socket.bind("tcp://*:{0}".format(self.async_port))
+
+
+    def __run (self):
+        poller = zmq.Poller()
+        poller.register(self.rpc_socket, zmq.POLLIN)
+
+        interval = 1.0 / self.stats_rate
+        last_tick = time.time()
+
+        try:
+            while self.active:
+                timeout = max(0, last_tick + interval - time.time())
+                if poller.poll(min(timeout, 0.1) * 1000):
+                    self.rpc_socket.send(self.handle_raw_request(self.rpc_socket.recv()))
+
+                now = time.time()
+                if now >= last_tick + interval:
+                    for port in self.ports:
+                        port.tick(now)
+
+                    self.publish_stats()
+                    last_tick = now
+
+            self.publish_event(EVENT_SERVER_STOPPED, {})
+
+        finally:
+            self.rpc_socket.close(linger = 0)
+            self.pub_socket.close(linger = 0)
+            self.context.term()
+
+
+    ############################   publisher   #############################
+
+    def publish (self, name, type, data, header = []):
+        # same key order as the server - name first
+        msg = OrderedDict([('name', name), ('type', type)] + header + [('data', data)])
+        self.pub_socket.send(json.dumps(msg, separators = (',', ':')))
+
+    def publish_event (self, type, data):
+        self.publish('trex-event', type, data)
+
+    def publish_stats (self):
+        data = dict.fromkeys(['m_platform_factor'], 1.0)
+        data.update(dict.fromkeys(['m_tx_cps', 'm_tx_expected_cps', 'm_tx_expected_pps', 'm_tx_expected_bps',
+                                   'm_total_alloc_error', 'm_total_queue_full', 'm_total_queue_drop', 'm_rx_drop_bps',
+                                   'm_active_flows', 'm_open_flows'], 0))
+
+        total = dict.fromkeys(['tx_bps', 'tx_pps', 'opackets', 'ipackets', 'obytes', 'ibytes'], 0)
+
+        for port in self.ports:
+            pps, bps = port.get_tx_rates()
+
+            for name in port.counters:
+                data['{0}-{1}'.format(name, port.port_id)] = port.get_counter(name)
+
+            for name in ['m_total_tx_bps', 'm_total_rx_bps']:
+                data['{0}-{1}'.format(name, port.port_id)] = bps
+
+            for name in ['m_total_tx_pps', 'm_total_rx_pps']:
+                data['{0}-{1}'.format(name, port.port_id)] = pps
+
+            total['tx_bps'] += bps
+            total['tx_pps'] += pps
+            for name in ['opackets', 'ipackets', 'obytes', 'ibytes']:
+                total[name] += port.get_counter(name)
+
+        data['m_tx_bps']        = data['m_rx_bps'] = total['tx_bps']
+        data['m_tx_pps']        = data['m_rx_pps'] = total['tx_pps']
+        data['m_total_tx_pkts'] = total['opackets']
+        data['m_total_rx_pkts'] = total['ipackets']
+        data['m_total_tx_bytes'] = total['obytes']
+        data['m_total_rx_bytes'] = total['ibytes']
+
+        # synthetic CPU load - 10Gbps per core
+        data['m_cpu_util'] = min(100.0, total['tx_bps'] / 1e8)
+
+        data['unknown'] = 0
+
+        self.stats_seq += 1
+        self.publish('trex-global', 0, data, [('seq', self.stats_seq), ('ts', time.time() - self.start_ts)])
+
+        self.publish_rx_stats()
+
+    # per user id counters - published only when there are any, like the server
+    def publish_rx_stats (self):
+        flows = {}
+        for port in self.ports:
+            for user_id, value in port.flow_counters.iteritems():
+                flow = flows.setdefault(str(user_id), {'rx': {}, 'tx': {}})
+                flow['rx'][str(port.port_id)] = flow['tx'][str(port.port_id)] = int(round(value))
+
+        if flows:
+            ts = {'value': int((time.time() - self.start_ts) * 1000000), 'freq': 1000000}
+            self.publish('rx-stats', 0, {'ts': ts, 'flows': flows})
+
+
+    ############################   RPC   #############################
+
+    def handle_raw_request (self, msg):
+        compressed = False
+
+        if (len(msg) >= 8) and (struct.unpack(">I", msg[:4])[0] == MSG_COMPRESS_HEADER_MAGIC):
+            try:
+                msg = zlib.decompress(msg[8:])
+                compressed = True
+            except zlib.error:
+                pass
+
+        response = self.handle_request(msg)
+
+        if compressed:
+            response = struct.pack(">II", MSG_COMPRESS_HEADER_MAGIC, len(response)) + zlib.compress(response)
+
+        return response
+
+
+    def handle_request (self, msg):
+        try:
+            request = json.loads(msg)
+        except ValueError:
+            return json.dumps({'jsonrpc': '2.0', 'id': None, 'error': {'code': JSONRPC_V2_ERR_PARSE, 'message': "Bad JSON Format"}})
+
+        if isinstance(request, list):
+            return json.dumps([self.handle_single_request(r) for r in request])
+        else:
+            return json.dumps(self.handle_single_request(request))
+
+
+    def handle_single_request (self, request):
+        id = request.get('id')
+
+        if request.get('jsonrpc') != "2.0":
+            return self.error_response(id, JSONRPC_V2_ERR_INVALID_REQ, "Invalid JSONRPC Version")
+
+        method = request.get('method')
+        if not method:
+            return self.error_response(id, JSONRPC_V2_ERR_INVALID_REQ, "Missing Method Name")
+
+        if not method in self.cmds:
+            return self.error_response(id, JSONRPC_V2_ERR_METHOD_NOT_FOUND, "Method not registered")
+
+        handler, param_count, needs_ownership = self.cmds[method]
+        params = request.get('params', {})
+
+        # the handler is an extra parameter
+        if needs_ownership:
+            param_count += 1
+
+        opt_param_count = self.opt_params.get(method, 0)
+
+        try:
+            if not (param_count <= len(params) <= param_count + opt_param_count):
+                expected = "{0}' to '{1}".format(param_count, param_count + opt_param_count) if opt_param_count else param_count
+                raise parse_err("method expects '{0}' paramteres, '{1}' provided".format(expected, len(params)))
+
+            if needs_ownership:
+                self.get_port(params).verify_ownership(params.get('handler'))
+
+            result = handler(params)
+
+        except MockRpcError as e:
+            return self.error_response(id, e.code, e.msg, e.specific_err)
+
+        except (KeyError, TypeError, ValueError) as e:
+            return self.error_response(id, JSONRPC_V2_ERR_INVALID_PARAMS, "Bad paramters for method", "bad parameter: {0}".format(e))
+
+        return {'jsonrpc': '2.0', 'id': id, 'result': result}
+
+
+    def error_response (self, id, code, message, specific_err = None):
+        response = {'jsonrpc': '2.0', 'id': id, 'error': {'code': code, 'message': message}}
+        if specific_err != None:
+            response['error']['specific_err'] = specific_err
+
+        return response
+
+
+    def get_port (self, params):
+        if not 'port_id' in params:
+            raise parse_err("missing field 'port_id'")
+
+        port_id = params['port_id']
+        if not (0 <= port_id < len(self.ports)):
+            raise execute_err("invalid port id - should be between 0 and {0}".format(len(self.ports) - 1))
+
+        return self.ports[port_id]
+
+
+    # general
+
+    def rpc_ping (self, params):
+        return {}
+
+    def rpc_publish_now (self, params):
+        self.publish_stats()
+        self.publish('trex-barrier', params['key'], {})
+        return {}
+
+    def rpc_get_supported_cmds (self, params):
+        return self.cmds.keys()
+
+    def rpc_get_version (self, params):
+        return {'version':    'mock',
+                'build_date': time.strftime("%b %d %Y", time.localtime(self.start_ts)),
+                'build_time': time.strftime("%H:%M:%S", time.localtime(self.start_ts)),
+                'built_by':   'MOCK',
+                'codecs':     ['zlib']}
+
+    def rpc_get_system_info (self, params):
+        return {'hostname':      socket.gethostname(),
+                'uptime':        time.strftime("%b %d %Y @ %H:%M:%S", time.localtime(self.start_ts)),
+                'dp_core_count': 1,
+                'core_type':     'mock',
+                'port_count':    len(self.ports),
+                'ports':         [{'index':  port.port_id,
+                                   'driver': port.driver,
+                                   'speed':  port.speed,
+                                   'rx':     {'caps': 0, 'counters': 0}}
+                                  for port in self.ports]}
+
+    # ownership
+
+    def rpc_get_owner (self, params):
+        port = self.get_port(params)
+        return {'owner': port.owner if port.owner else "<FREE>"}
+
+    def rpc_acquire (self, params):
+        return self.get_port(params).acquire(params['user'], params['session_id'], params['force'])
+
+    def rpc_release (self, params):
+        self.get_port(params).release()
+        return {}
+
+    # port
+
+    def rpc_get_port_stats (self, params):
+        return self.get_port(params).get_port_stats()
+
+    def rpc_get_port_status (self, params):
+        port = self.get_port(params)
+        return {'owner':         port.owner,
+                'state':         port.get_state_name(),
+                'max_stream_id': max(port.streams.keys()) if port.streams else 0,
+                'attr':          {'promiscuous': {'enabled': port.promiscuous}}}
+
+    def rpc_set_port_attr (self, params):
+        port = self.get_port(params)
+        if 'promiscuous' in params['attr']:
+            port.promiscuous = params['attr']['promiscuous']['enabled']
+        return {}
+
+    # streams
+
+    def rpc_add_stream (self, params):
+        self.get_port(params).add_stream(params['stream_id'], params['stream'])
+        return {}
+
+    def rpc_remove_stream (self, params):
+        self.get_port(params).remove_stream(params['stream_id'])
+        return {}
+
+    def rpc_remove_all_streams (self, params):
+        self.get_port(params).remove_all_streams()
+        return {}
+
+    def rpc_get_stream_list (self, params):
+        return self.get_port(params).streams.keys()
+
+    def rpc_get_stream (self, params):
+        port = self.get_port(params)
+        stream_id = params['stream_id']
+
+        if not stream_id in port.streams:
+            raise execute_err("stream id {0} on port {1} does not exists".format(stream_id, port.port_id))
+
+        return {'stream': port.get_stream_json(stream_id, params['get_pkt'])}
+
+    def rpc_get_all_streams (self, params):
+        port = self.get_port(params)
+        return {'streams': dict([(str(stream_id), port.get_stream_json(stream_id, params.get('get_pkt', True), pkt_info = True))
+                                 for stream_id in port.streams])}
+
+    # traffic
+
+    def rpc_start_traffic (self, params):
+        port = self.get_port(params)
+        port.start(params['mul'], params['duration'], params['force'])
+        return {'multiplier': port.factor}
+
+    def rpc_stop_traffic (self, params):
+        self.get_port(params).stop()
+        return {}
+
+    def rpc_pause_traffic (self, params):
+        self.get_port(params).pause()
+        return {}
+
+    def rpc_resume_traffic (self, params):
+        self.get_port(params).resume()
+        return {}
+
+    def rpc_update_traffic (self, params):
+        port = self.get_port(params)
+        port.update(params['mul'], params['force'])
+        return {'multiplier': port.factor}
+
+    def rpc_validate (self, params):
+        return self.get_port(params).validate()
+
+
+
+def setParserOptions():
+    parser = argparse.ArgumentParser(prog="stl_mock_server.py",
+                                     description = "Mock stateless TRex server for control plane benchmarking")
+
+    parser.add_argument("-p", "--ports",
+                        help = "number of ports [default is 4]",
+                        dest = "port_count",
+                        default = 4,
+                        type = int)
+
+    parser.add_argument("--sync-port",
+                        help = "RPC port [default is 4501]",
+                        dest = "sync_port",
+                        default = 4501,
+                        type = int)
+
+    parser.add_argument("--async-port",
+                        help = "async publisher port [default is 4500]",
+                        dest = "async_port",
+                        default = 4500,
+                        type = int)
+
+    parser.add_argument("-r", "--stats-rate",
+                        help = "stats publishes per second [default is 2]",
+                        dest = "stats_rate",
+                        default = 2.0,
+                        type = float)
+
+    parser.add_argument("-s", "--speed",
+                        help = "port speed in Gbps [default is 10]",
+                        dest = "speed",
+                        default = 10,
+                        type = int,
+                        choices = [1, 10, 40])
+
+    return parser
+
+
+def main ():
+    parser = setParserOptions()
+    options = parser.parse_args()
+
+    server = STLMockServer(port_count = options.port_count,
+                           sync_port  = options.sync_port,
+                           async_port = options.async_port,
+                           stats_rate = options.stats_rate,
+                           speed      = options.speed)
+
+    print "mock server with {0} ports - RPC at port {1}, publisher at port {2}".format(options.port_count, options.sync_port, options.async_port)
+
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        print "\n\n*** Caught Ctrl + C... Exiting...\n\n"
+
+    exit(0)
+
+if __name__ == '__main__':
+    main()
+
@@ -8,9 +8,15 @@ import trex_stl_stats
 from trex_stl_types import *
 import time
 import copy
+import zlib
+import json
 
 StreamOnPort = namedtuple('StreamOnPort', ['compiled_stream', 'metadata'])
 
+# an operation on a port - RPC commands to send and a handler for their responses
+# (the handler gets one RC per command and returns the port level RC)
+PortOp = namedtuple('PortOp', ['cmds', 'on_response'])
+
 ########## utlity ############
 def mult_to_factor (mult, max_bps_l2, max_pps, line_util):
     if mult['type'] == 'raw':
@@ -40,6 +46,9 @@ class Port(object):
                   STATE_TX: "ACTIVE",
                   STATE_PAUSE: "PAUSE"}
 
+    # max number of streams sent in a single add_stream batch
+    ADD_STREAMS_CHUNK_SIZE = 1000
+
 
     def __init__ (self, port_id, speed, driver, user, comm_link, session_id):
         self.port_id = port_id
@@ -70,15 +79,29 @@ class Port(object):
     def get_speed_bps (self):
         return (self.speed * 1000 * 1000 * 1000)
 
+    # execute an operation on the port
+    # an operation is either a PortOp or an RC when there is nothing to send
+    def exec_op (self, op):
+        if isinstance(op, RC):
+            return op
+
+        rcs = [self.transmit(cmd.method, cmd.params) for cmd in op.cmds]
+        return op.on_response(*rcs)
+
+
     # take the port
     def acquire(self, force = False):
+        return self.exec_op(self.acquire_op(force))
+
+    def acquire_op (self, force = False):
         params = {"port_id":     self.port_id,
                   "user":        self.user,
                   "session_id":  self.session_id,
                   "force":       force}
 
-        command = RpcCmdData("acquire", params)
-        rc = self.transmit(command.method, command.params)
+        return PortOp([RpcCmdData("acquire", params)], self.__on_acquire)
+
+    def __on_acquire (self, rc):
         if rc.good():
             self.handler = rc.data()
             return self.ok()
@@ -87,11 +110,15 @@ class Port(object):
 
     # release the port
     def release(self):
+        return self.exec_op(self.release_op())
+
+    def release_op (self):
         params = {"port_id": self.port_id,
                   "handler": self.handler}
 
-        command = RpcCmdData("release", params)
-        rc = self.transmit(command.method, command.params)
+        return PortOp([RpcCmdData("release", params)], self.__on_release)
+
+    def __on_release (self, rc):
         self.handler = None
 
         if rc.good():
@@ -113,10 +140,17 @@ class Port(object):
 
 
     def sync(self):
+        return self.exec_op(self.sync_op())
+
+    # streams are synced without their packets - those are fetched on demand
+    def sync_op (self):
         params = {"port_id": self.port_id}
 
-        command = RpcCmdData("get_port_status", params)
-        rc = self.transmit(command.method, command.params)
+        return PortOp([RpcCmdData("get_port_status", params),
+                       RpcCmdData("get_all_streams", {"port_id": self.port_id, "get_pkt": False})],
+                      self.__on_sync)
+
+    def __on_sync (self, rc, rc_streams):
         if rc.bad():
             return self.err(rc.err())
 
@@ -143,22 +177,60 @@ class Port(object):
         self.attr = rc.data()['attr']
 
         # sync the streams
-        params = {"port_id": self.port_id}
+        if rc_streams.bad():
+            return self.err(rc_streams.err())
 
-        command = RpcCmdData("get_all_streams", params)
-        rc = self.transmit(command.method, command.params)
-        if rc.bad():
-            return self.err(rc.err())
+        streams = {}
+
+        for k, v in rc_streams.data()['streams'].iteritems():
+            stream_id = long(k)
+
+            obj = {'next_id': v['next_stream_id'],
+                   'mode'   : v['mode']['type'],
+                   'rate'   : STLStream.get_rate_from_field(v['mode']['rate'])}
+
+            if 'packet' in v:
+                obj['pkt'] = base64.b64decode(v['packet']['binary'])
+                obj['pkt_crc'] = zlib.crc32(obj['pkt']) & 0xffffffff
+            else:
+                obj['pkt_len'] = v['packet_info']['len']
+                obj['pkt_crc'] = v['packet_info']['crc32']
 
-        for k, v in rc.data()['streams'].iteritems():
-            self.streams[k] = {'next_id': v['next_stream_id'],
-                               'pkt'    : base64.b64decode(v['packet']['binary']),
-                               'mode'   : v['mode']['type'],
-                               'rate'   : STLStream.get_rate_from_field(v['mode']['rate'])}
+                # same content as the packet we already have - no need to fetch it again
+                prev = self.streams.get(stream_id)
+                if prev and ('pkt' in prev) and (prev.get('pkt_crc') == obj['pkt_crc']):
+                    obj['pkt'] = prev['pkt']
+
+            streams[stream_id] = obj
+
+        self.streams = streams
 
         return self.ok()
 
 
+    # fetch the packets of streams that were synced without them
+    def __fetch_pkts (self, stream_id_list):
+        missing = [stream_id for stream_id in stream_id_list if not 'pkt' in self.streams[stream_id]]
+        if not missing:
+            return self.ok()
+
+        batch = []
+        for stream_id in missing:
+            params = {"port_id":   self.port_id,
+                      "stream_id": stream_id,
+                      "get_pkt":   True}
+
+            batch.append(RpcCmdData('get_stream', params))
+
+        rc = self.transmit_batch(batch)
+
+        for stream_id, single_rc in zip(missing, rc.split()):
+            if single_rc:
+                self.streams[stream_id]['pkt'] = base64.b64decode(single_rc.data()['stream']['packet']['binary'])
+
+        return self.ok() if rc else self.err(rc.err())
+
+
     # return TRUE if write commands
     def is_port_writable (self):
         # operations on port can be done on state idle or state streams
@@ -172,7 +244,8 @@ class Port(object):
 
 
     # add streams
-    def add_streams (self, streams_list):
+    # 'progress' is called as progress(port_id, uploaded, total) after each chunk
+    def add_streams (self, streams_list, progress = None):
 
         if not self.is_acquired():
             return self.err("port is not owned")
@@ -199,46 +272,84 @@ class Port(object):
                 return self.err("multiple streams with duplicate name: '{0}'".format(name))
             lookup[name] = stream_id
 
-        batch = []
+        # verify dependencies before anything is sent
         for stream in streams_list:
+            next = stream.get_next()
+            if next and not next in lookup:
+                return self.err("stream dependency error - unable to find '{0}'".format(next))
+
+        # large profiles are uploaded in chunks - a chunk is encoded, compressed
+        # and sent before the reply to the previous one is collected
+        total   = len(streams_list)
+        handler = json.dumps(self.handler)
+        rc      = RC_OK()
+        pending = None
+
+        for offset in range(0, total, self.ADD_STREAMS_CHUNK_SIZE):
+            chunk  = streams_list[offset:offset + self.ADD_STREAMS_CHUNK_SIZE]
+            batch  = self.__encode_add_streams(chunk, lookup, handler)
+            future = self.comm_link.transmit_batch_async([cmd for cmd, _ in batch])
+
+            if pending:
+                rc = self.__on_add_streams(total, progress, *pending)
+
+            pending = (offset, chunk, batch, future)
+            if not rc:
+                break
+
+        # the last chunk sent is collected even after a failure - its streams
+        # may already be on the server
+        if pending:
+            last_rc = self.__on_add_streams(total, progress, *pending)
+            if rc:
+                rc = last_rc
+
+        self.state = self.STATE_STREAMS if (len(self.streams) > 0) else self.STATE_IDLE
+
+        return self.ok() if rc else self.err(str(rc))
+
+
+    # encode add_stream commands for a chunk of streams
+    # returns a list of (cmd, (stream_id, next_id))
+    def __encode_add_streams (self, chunk, lookup, handler):
+        batch = []
+
+        for stream in chunk:
 
             name = stream.get_name() if stream.get_name() is not None else id(stream)
             stream_id = lookup[name]
-            next_id = -1
-
             next = stream.get_next()
-            if next:
-                if not next in lookup:
-                    return self.err("stream dependency error - unable to find '{0}'".format(next))
-                next_id = lookup[next]
+            next_id = lookup[next] if next else -1
 
-            stream_json = stream.to_json()
-            stream_json['next_stream_id'] = next_id
+            # the stream itself is encoded once - only the port specific fields are spliced in
+            params = '{{"handler": {0}, "port_id": {1}, "stream_id": {2}, "stream": {{"next_stream_id": {3}, {4}}}}}'.format(handler,
+                                                                                                                             self.port_id,
+                                                                                                                             stream_id,
+                                                                                                                             next_id,
+                                                                                                                             stream.to_json_fragment())
 
-            params = {"handler": self.handler,
-                      "port_id": self.port_id,
-                      "stream_id": stream_id,
-                      "stream": stream_json}
+            batch.append((RpcCmdData('add_stream', params), (stream_id, next_id)))
 
-            cmd = RpcCmdData('add_stream', params)
-            batch.append(cmd)
+        return batch
 
 
-        rc = self.transmit_batch(batch)
+    # wait for a chunk of add_stream commands and record the streams that were added
+    def __on_add_streams (self, total, progress, offset, chunk, batch, future):
+        rc = future.result()
 
         for i, single_rc in enumerate(rc):
             if single_rc:
-                stream_id = batch[i].params['stream_id']
-                next_id   = batch[i].params['stream']['next_stream_id']
+                stream_id, next_id = batch[i][1]
                 self.streams[stream_id] = {'next_id' : next_id,
-                                           'pkt'  : streams_list[i].get_pkt(),
-                                           'mode' : streams_list[i].get_mode(),
-                                           'rate' : streams_list[i].get_rate()}
+                                           'pkt'     : chunk[i].get_pkt(),
+                                           'pkt_crc' : zlib.crc32(chunk[i].get_pkt()) & 0xffffffff,
+                                           'mode'    : chunk[i].get_mode(),
+                                           'rate'    : chunk[i].get_rate()}
 
+        if rc and progress:
+            progress(self.port_id, offset + len(chunk), total)
 
-        self.state = self.STATE_STREAMS if (len(self.streams) > 0) else self.STATE_IDLE
-
-        return self.ok() if rc else self.err(str(rc))
+        return rc
 
 
 
@@ -306,6 +417,7 @@ class Port(object):
     # get a specific stream
     def get_stream (self, stream_id):
         if stream_id in self.streams:
+            self.__fetch_pkts([stream_id])
             return self.streams[stream_id]
         else:
             return None
@@ -316,6 +428,9 @@ class Port(object):
 
     # start traffic
     def start (self, mul, duration, force):
+        return self.exec_op(self.start_op(mul, duration, force))
+
+    def start_op (self, mul, duration, force):
         if not self.is_acquired():
             return self.err("port is not owned")
 
@@ -334,7 +449,9 @@ class Port(object):
                   "duration": duration,
                   "force":    force}
 
-        rc = self.transmit("start_traffic", params)
+        return PortOp([RpcCmdData("start_traffic", params)], self.__on_start)
+
+    def __on_start (self, rc):
         if rc.bad():
             return self.err(rc.err())
 
@@ -345,6 +462,9 @@ class Port(object):
     # stop traffic
     # with force ignores the cached state and sends the command
     def stop (self, force = False):
+        return self.exec_op(self.stop_op(force))
+
+    def stop_op (self, force = False):
 
         if not self.is_acquired():
             return self.err("port is not owned")
@@ -358,7 +478,9 @@ class Port(object):
         params = {"handler": self.handler,
                   "port_id": self.port_id}
 
-        rc = self.transmit("stop_traffic", params)
+        return PortOp([RpcCmdData("stop_traffic", params)], self.__on_stop)
+
+    def __on_stop (self, rc):
         if rc.bad():
             return self.err(rc.err())
 
@@ -368,6 +490,9 @@ class Port(object):
         return self.ok()
 
     def pause (self):
+        return self.exec_op(self.pause_op())
+
+    def pause_op (self):
 
         if not self.is_acquired():
             return self.err("port is not owned")
@@ -378,7 +503,9 @@ class Port(object):
         params = {"handler": self.handler,
                   "port_id": self.port_id}
 
-        rc  = self.transmit("pause_traffic", params)
+        return PortOp([RpcCmdData("pause_traffic", params)], self.__on_pause)
+
+    def __on_pause (self, rc):
         if rc.bad():
             return self.err(rc.err())
 
@@ -389,6 +516,9 @@ class Port(object):
 
 
     def resume (self):
+        return self.exec_op(self.resume_op())
+
+    def resume_op (self):
 
         if not self.is_acquired():
             return self.err("port is not owned")
@@ -399,7 +529,9 @@ class Port(object):
         params = {"handler": self.handler,
                   "port_id": self.port_id}
 
-        rc = self.transmit("resume_traffic", params)
+        return PortOp([RpcCmdData("resume_traffic", params)], self.__on_resume)
+
+    def __on_resume (self, rc):
         if rc.bad():
             return self.err(rc.err())
 
@@ -410,6 +542,9 @@ class Port(object):
 
 
     def update (self, mul, force):
+        return self.exec_op(self.update_op(mul, force))
+
+    def update_op (self, mul, force):
 
         if not self.is_acquired():
             return self.err("port is not owned")
@@ -422,7 +557,9 @@ class Port(object):
                   "mul":     mul,
                   "force":   force}
 
-        rc = self.transmit("update_traffic", params)
+        return PortOp([RpcCmdData("update_traffic", params)], self.__on_update)
+
+    def __on_update (self, rc):
         if rc.bad():
             return self.err(rc.err())
 
@@ -430,6 +567,9 @@ class Port(object):
 
 
     def validate (self):
+        return self.exec_op(self.validate_op())
+
+    def validate_op (self):
 
         if not self.is_acquired():
             return self.err("port is not owned")
@@ -443,7 +583,9 @@ class Port(object):
         params = {"handler": self.handler,
                   "port_id": self.port_id}
 
-        rc = self.transmit("validate", params)
+        return PortOp([RpcCmdData("validate", params)], self.__on_validate)
+
+    def __on_validate (self, rc):
         if rc.bad():
             return self.err(rc.err())
 
@@ -453,6 +595,9 @@ class Port(object):
 
 
     def set_attr (self, attr_dict):
+        return self.exec_op(self.set_attr_op(attr_dict))
+
+    def set_attr_op (self, attr_dict):
         if not self.is_acquired():
             return self.err("port is not owned")
 
@@ -463,14 +608,15 @@ class Port(object):
                   "port_id": self.port_id,
                   "attr": attr_dict}
 
-        rc = self.transmit("set_port_attr", params)
-        if rc.bad():
-            return self.err(rc.err())
+        def on_set_attr (rc):
+            if rc.bad():
+                return self.err(rc.err())
 
+            self.attr.update(attr_dict)
 
-        self.attr.update(attr_dict)
+            return self.ok()
 
-        return self.ok()
+        return PortOp([RpcCmdData("set_port_attr", params)], on_set_attr)
 
 
     def get_attr (self):
@@ -550,16 +696,21 @@ class Port(object):
         if self.state == self.STATE_DOWN:
             return {}
 
+        # packets are needed for the description
+        self.__fetch_pkts(self.streams.keys())
+
         data = {}
         for id, obj in self.streams.iteritems():
 
             # lazy build scapy repr.
-            if not 'pkt_type' in obj:
+            if not 'pkt_type' in obj and 'pkt' in obj:
                 obj['pkt_type'] = CScapyTRexPktBuilder.pkt_layers_desc_from_buffer(obj['pkt'])
+
+            pkt_len = len(obj['pkt']) if 'pkt' in obj else obj['pkt_len']
             
             data[id] = OrderedDict([ ('id',  id),
-                                     ('packet_type',  obj['pkt_type']),
-                                     ('L2 len',       len(obj['pkt']) + 4),
+                                     ('packet_type',  obj.get('pkt_type', "N/A")),
+                                     ('L2 len',       pkt_len + 4),
                                      ('mode',         obj['mode']),
                                      ('rate',         obj['rate']),
                                      ('next_stream',  obj['next_id'])
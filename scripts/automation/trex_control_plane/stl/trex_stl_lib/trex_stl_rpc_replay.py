@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Copyright (c) 2015-2015 Cisco Systems, Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+# replayer can be run as a standalone
+import trex_stl_ext
+
+import zmq
+import json
+import zlib
+import struct
+import time
+import argparse
+
+from trex_stl_jsonrpc_client import RpcZlibCodec
+from utils import text_tables
+
+
+# loads a file written by JsonRpcClient.start_recording
+def load_records (filename):
+    records = []
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            record = json.loads(line)
+            if record.get('type') == 'rpc':
+                records.append(record)
+
+    records.sort(key = lambda x: x['ts'])
+    return records
+
+
+def is_error (response):
+    return (response != None) and ('"error"' in response)
+
+
+# replays a recorded RPC session against a server (real or mock)
+# requests are sent in lock-step in the recorded order
+# realtime - keep the recorded gaps between requests, otherwise send at max speed
+class RpcReplayer(object):
+    def __init__ (self, records, server = 'localhost', port = 4501, realtime = False, timeout_sec = 5):
+        self.records  = records
+        self.server   = server
+        self.port     = port
+        self.realtime = realtime
+        self.timeout_sec = timeout_sec
+
+        self.codec = RpcZlibCodec()
+
+        # recorded port handlers to the ones given by the live server
+        self.handlers = {}
+
+
+    def decompress (self, msg):
+        if len(msg) < 8:
+            return None
+
+        magic, size = struct.unpack(">II", msg[:8])
+        if magic != RpcZlibCodec.HEADER_MAGIC:
+            return None
+
+        return zlib.decompress(msg[8:])
+
+
+    # requests holding a recorded handler are sent with the live one
+    def rewrite (self, request):
+        for old, new in self.handlers.iteritems():
+            request = request.replace(old, new)
+        return request
+
+
+    # learn the handlers given by 'acquire'
+    def learn_handlers (self, request, recorded, response):
+        if ('"acquire"' not in request) or not recorded or not response:
+            return
+
+        try:
+            requests  = json.loads(request)
+            recorded  = json.loads(recorded)
+            responses = json.loads(response)
+        except ValueError:
+            return
+
+        if not isinstance(requests, list):
+            requests, recorded, responses = [requests], [recorded], [responses]
+
+        for req, old, new in zip(requests, recorded, responses):
+            if req.get('method') != 'acquire':
+                continue
+
+            if ('result' in old) and ('result' in new) and (old['result'] != new['result']):
+                self.handlers[old['result']] = new['result']
+
+
+    def run (self):
+        context = zmq.Context()
+        socket = context.socket(zmq.REQ)
+        socket.setsockopt(zmq.SNDTIMEO, self.timeout_sec * 1000)
+        socket.setsockopt(zmq.RCVTIMEO, self.timeout_sec * 1000)
+        socket.connect("tcp://{0}:{1}".format(self.server, self.port))
+
+        summary = {'requests': 0, 'bytes_out': 0, 'bytes_in': 0, 'mismatch': 0, 'methods': {}}
+
+        try:
+            start = time.time()
+            base = self.records[0]['ts'] if self.records else 0
+
+            for record in self.records:
+                if self.realtime:
+                    delay = (record['ts'] - base) - (time.time() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+
+                request = self.rewrite(record['request']).encode('utf-8')
+                msg = self.codec.encode(request) if record['compressed'] else request
+
+                t = time.time()
+                try:
+                    socket.send(msg)
+                    response = socket.recv()
+                except zmq.Again:
+                    summary['timeout'] = record['method']
+                    break
+
+                rtt = time.time() - t
+
+                summary['bytes_out'] += len(msg)
+                summary['bytes_in']  += len(response)
+
+                if record['compressed']:
+                    response = self.decompress(response) or response
+
+                self.learn_handlers(record['request'], record['response'], response)
+
+                # a request that failed in the recording should fail now and vice versa
+                mismatch = is_error(record['response']) != is_error(response)
+
+                m = summary['methods'].setdefault(record['method'], {'count': 0, 'rtt': 0.0, 'recorded_rtt': 0.0, 'mismatch': 0})
+                m['count']        += 1
+                m['rtt']          += rtt
+                m['recorded_rtt'] += record.get('rtt') or 0
+                m['mismatch']     += mismatch
+
+                summary['requests'] += 1
+                summary['mismatch'] += mismatch
+
+            summary['elapsed']  = time.time() - start
+            summary['handlers'] = dict(self.handlers)
+
+        finally:
+            socket.close(linger = 0)
+            context.term()
+
+        return summary
+
+
+def print_summary (summary):
+    print "\nreplayed {0} requests in {1:.3f} sec - {2} bytes out, {3} bytes in, {4} result mismatches\n".format(summary['requests'],
+                                                                                                               summary.get('elapsed', 0),
+                                                                                                               summary['bytes_out'],
+                                                                                                               summary['bytes_in'],
+                                                                                                               summary['mismatch'])
+    if 'timeout' in summary:
+        print "*** timeout waiting for a response to '{0}'\n".format(summary['timeout'])
+
+    table = text_tables.TRexTextTable()
+    table.set_cols_align(["l", "r", "r", "r", "r"])
+    table.set_cols_dtype(["t", "i", "t", "t", "i"])
+    table.header(["method", "count", "avg rtt", "recorded avg rtt", "mismatch"])
+
+    for method, m in sorted(summary['methods'].items(), key = lambda x: x[1]['count'], reverse = True):
+        table.add_row([method,
+                       m['count'],
+                       "{0:.3f} ms".format(m['rtt'] * 1000 / m['count']),
+                       "{0:.3f} ms".format(m['recorded_rtt'] * 1000 / m['count']),
+                       m['mismatch']])
+
+    text_tables.print_table_with_header(table, "RPC replay")
+
+
+def setParserOptions():
+    parser = argparse.ArgumentParser(prog="stl_rpc_replay.py",
+                                     description = "Replay a recorded RPC session against a TRex server")
+
+    parser.add_argument("input_file",
+                        help = "recording file (see STLClient.start_rpc_recording)")
+
+    parser.add_argument("-s", "--server",
+                        help = "server address [default is localhost]",
+                        dest = "server",
+                        default = "localhost")
+
+    parser.add_argument("-p", "--port",
+                        help = "RPC port [default is 4501]",
+                        dest = "port",
+                        default = 4501,
+                        type = int)
+
+    parser.add_argument("--realtime",
+                        help = "keep the recorded time between requests [default is max speed]",
+                        action = "store_true",
+                        default = False)
+
+    return parser
+
+
+def main ():
+    parser = setParserOptions()
+    options = parser.parse_args()
+
+    records = load_records(options.input_file)
+    print "loaded {0} requests from '{1}'".format(len(records), options.input_file)
+
+    replayer = RpcReplayer(records, options.server, options.port, options.realtime)
+
+    try:
+        summary = replayer.run()
+    except KeyboardInterrupt:
+        print "\n\n*** Caught Ctrl + C... Exiting...\n\n"
+        exit(1)
+
+    print_summary(summary)
+    exit(0)
+
+if __name__ == '__main__':
+    main()
+
@@ -4,8 +4,9 @@ from utils import text_tables
 from utils.text_opts import format_text, format_threshold, format_num
 
 from trex_stl_async_client import CTRexAsyncStats
+from trex_stl_timeseries import CTimeSeries, CStatsRollup
 
-from collections import namedtuple, OrderedDict, deque
+from collections import namedtuple, OrderedDict
 import copy
 import datetime
 import time
@@ -22,53 +23,16 @@ COMPACT = {GLOBAL_STATS, PORT_STATS}
 
 ExportableStats = namedtuple('ExportableStats', ['raw_data', 'text_table'])
 
-# use to calculate diffs relative to the previous values
-# for example, BW
-def calculate_diff (samples):
-    total = 0.0
-
-    weight_step = 1.0 / sum(xrange(0, len(samples)))
-    weight = weight_step
-
-    for i in xrange(0, len(samples) - 1):
-        current = samples[i] if samples[i] > 0 else 1
-        next = samples[i + 1] if samples[i + 1] > 0 else 1
-
-        s = 100 * ((float(next) / current) - 1.0)
-
-        # block change by 100% 
-        total  += (min(s, 100) * weight)
-        weight += weight_step
-
-    return total
-
-
-# calculate by absolute values and not relatives (useful for CPU usage in % and etc.)
-def calculate_diff_raw (samples):
-    total = 0.0
-
-    weight_step = 1.0 / sum(xrange(0, len(samples)))
-    weight = weight_step
-
-    for i in xrange(0, len(samples) - 1):
-        current = samples[i]
-        next = samples[i + 1]
-
-        total  += ( (next - current) * weight )
-        weight += weight_step
-
-    return total
-
-
 class CTRexInfoGenerator(object):
     """
     This object is responsible of generating stats and information from objects maintained at
     STLClient and the ports.
     """
 
-    def __init__(self, global_stats_ref, ports_dict_ref):
+    def __init__(self, global_stats_ref, ports_dict_ref, port_groups_ref):
         self._global_stats = global_stats_ref
         self._ports_dict = ports_dict_ref
+        self._port_groups = port_groups_ref
 
     def generate_single_statistic(self, port_id_list, statistic_type):
         if statistic_type == GLOBAL_STATS:
@@ -143,14 +107,10 @@ class CTRexInfoGenerator(object):
                                       ]
                                       )
 
-        total_stats = CPortStats(None)
-
         for port_obj in relevant_ports:
             # fetch port data
             port_stats = port_obj.generate_port_stats()
 
-            total_stats += port_obj.port_stats
-
             # populate to data structures
             return_stats_data[port_obj.port_id] = port_stats
             self.__update_per_field_dict(port_stats, per_field_stats)
@@ -159,6 +119,8 @@ class CTRexInfoGenerator(object):
         header = ["port"] + [port.port_id for port in relevant_ports]
 
         if (total_cols > 1):
+            # cached until one of the ports gets a new snapshot
+            total_stats = self._port_groups.get_total_stats([port_obj.port_id for port_obj in relevant_ports])
             self.__update_per_field_dict(total_stats.generate_stats(), per_field_stats)
             header += ['total']
             total_cols += 1
@@ -270,44 +232,113 @@ class CTRexInfoGenerator(object):
 class CTRexStats(object):
     """ This is an abstract class to represent a stats object """
 
+    # monotonic counters - used for bookmark diffs
+    COUNTERS = []
+
+    # EWMA weight of the newest change - about the weight of the last
+    # sample in a linear weighting of 10 samples
+    TREND_ALPHA = 0.2
+
+    # changes needed before a trend is reported
+    TREND_MIN_STEPS = 4
+
+    # raw history samples per second of history - the default publish rate of the server
+    HISTORY_RATE = 2
+
     def __init__(self):
         self.reference_stats = {}
         self.latest_stats = {}
         self.last_update_ts = time.time()
-        self.history = deque(maxlen = 10)
         self.lock = threading.Lock()
 
-    def __getitem__(self, item):
-        # override this to allow quick and clean access to fields
-        if not item in self.latest_stats:
-            return "N/A"
+        # field -> [last value, relative trend, raw trend, steps]
+        self.trends = {}
+
+        # long term per field history (raw series and 1s / 10s / 1m / 10m rollups)
+        # off unless enabled - see enable_history
+        self.series  = None
+        self.rollups = None
+
+    # field -> (relative, suffix) or None for fields without a known format
+    # built once per field name - shared by all stats objects
+    FIELD_FORMATS = {}
+
+    @staticmethod
+    def get_field_format (item):
+        try:
+            return CTRexStats.FIELD_FORMATS[item]
+        except KeyError:
+            pass
+
+        fmt = None
 
-        # item must exist
         m = re.search('_(([a-z])ps)$', item)
         if m:
             # this is a non-relative item
             unit = m.group(2)
             if unit == "b":
-                return self.get(item, format=True, suffix="b/sec")
+                fmt = (False, "b/sec")
             elif unit == "p":
-                return self.get(item, format=True, suffix="pkt/sec")
+                fmt = (False, "pkt/sec")
             else:
-                return self.get(item, format=True, suffix=m.group(1))
+                fmt = (False, m.group(1))
 
-        m = re.search('^[i|o](a-z+)$', item)
-        if m:
-            # this is a non-relative item
-            type = m.group(1)
-            if type == "bytes":
-                return self.get_rel(item, format=True, suffix="B")
-            elif type == "packets":
-                return self.get_rel(item, format=True, suffix="pkts")
-            else:
-                # do not format with suffix
-                return self.get_rel(item, format=True)
+        else:
+            m = re.search('^[io]([a-z]+)$', item)
+            if m:
+                # counters are relative
+                type = m.group(1)
+                if type == "bytes":
+                    fmt = (True, "B")
+                elif type == "packets":
+                    fmt = (True, "pkts")
+                else:
+                    # do not format with suffix
+                    fmt = (True, "")
+
+        CTRexStats.FIELD_FORMATS[item] = fmt
+        return fmt
+
+
+    def __getitem__(self, item):
+        # override this to allow quick and clean access to fields
+        if not item in self.latest_stats:
+            return "N/A"
+
+        fmt = self.get_field_format(item)
+        if fmt is None:
+            # can't match to any known pattern, return N/A
+            return "N/A"
+
+        relative, suffix = fmt
+        if relative:
+            return self.get_rel(item, format=True, suffix=suffix)
+        else:
+            return self.get(item, format=True, suffix=suffix)
+
+
+    # field -> (raw value, formatted value) for many fields at once
+    # raw values of counters are relative to the last clear
+    def get_many (self, fields):
+        output = {}
+        latest = self.latest_stats
+        reference = self.reference_stats
 
-        # can't match to any known pattern, return N/A
-        return "N/A"
+        for field in fields:
+            if not field in latest:
+                output[field] = ("N/A", "N/A")
+                continue
+
+            fmt = self.get_field_format(field)
+            if fmt is None:
+                output[field] = (latest[field], "N/A")
+                continue
+
+            relative, suffix = fmt
+            value = (latest[field] - reference.get(field, 0)) if relative else latest[field]
+            output[field] = (value, format_num(value, suffix))
+
+        return output
 
 
     def generate_stats(self):
@@ -326,8 +357,14 @@ class CTRexStats(object):
         # update
         self.latest_stats = snapshot
 
-        with self.lock:
-            self.history.append(snapshot)
+        self.__update_trends(snapshot)
+
+        if self.series is not None:
+            with self.lock:
+                if self.series is not None:
+                    now = time.time()
+                    self.series.append(now, snapshot)
+                    self.rollups.append(now, snapshot)
 
         diff_time = time.time() - self.last_update_ts
 
@@ -344,9 +381,92 @@ class CTRexStats(object):
         self.reference_stats = self.latest_stats
 
 
+    # O(1) per field - the relative change is in percent and capped at 100%
+    def __update_trends (self, snapshot):
+        trends = self.trends
+        alpha = self.TREND_ALPHA
+
+        for field, value in snapshot.iteritems():
+            if not isinstance(value, (int, long, float)):
+                continue
+
+            t = trends.get(field)
+            if t is None:
+                trends[field] = [value, 0.0, 0.0, 0]
+                continue
+
+            prev = t[0]
+            current = prev if prev > 0 else 1
+            next = value if value > 0 else 1
+
+            t[1] += alpha * (min(100 * ((float(next) / current) - 1.0), 100) - t[1])
+            t[2] += alpha * ((value - prev) - t[2])
+            t[0] = value
+            t[3] += 1
+
+    # keep 'seconds' of history - fixed memory per field, about
+    # 16 bytes per second of raw samples plus the rollups of that span
+    def enable_history (self, seconds):
+        with self.lock:
+            self.series  = CTimeSeries(max(1, int(seconds * self.HISTORY_RATE)))
+            self.rollups = CStatsRollup(CStatsRollup.get_levels(seconds))
+
+    def disable_history (self):
+        with self.lock:
+            self.series  = None
+            self.rollups = None
+
+    def has_history (self):
+        return self.series is not None
+
+
+    # window query on the stats history - None without history
+    # stat is one of 'mean', 'max', 'min', 'rate' or 'percentile' (with p)
+    def get_window (self, field, stat = 'mean', seconds = None, p = 99):
+        if not stat in ('mean', 'max', 'min', 'rate', 'percentile'):
+            raise ValueError("unknown window stat '{0}'".format(stat))
+
+        with self.lock:
+            if self.series is None:
+                return None
+
+            if stat == 'percentile':
+                return self.series.percentile(field, p, seconds)
+
+            return getattr(self.series, stat)(field, seconds)
+
+    # pre-aggregated buckets (ts, min, max, avg, last, count) of 'resolution' seconds
+    # resolution is one of 1, 10, 60, 600 - empty without history
+    def get_rollup (self, field, resolution = 60, seconds = None):
+        with self.lock:
+            if self.rollups is None:
+                return []
+
+            return self.rollups.get_series(field, resolution, seconds)
+
+
     def invalidate (self):
         self.latest_stats = {}
 
+    # a cheap reference to the current counters - snapshots are replaced, never modified
+    def get_bookmark (self):
+        return (self.last_update_ts, self.latest_stats)
+
+    # counter deltas between two bookmarks and the average rate of each
+    # ('<counter>_rate' per second)
+    def diff_bookmarks (self, start, end):
+        (start_ts, start_stats), (end_ts, end_stats) = start, end
+        duration = end_ts - start_ts
+
+        diff = {}
+        for field in self.COUNTERS:
+            if (field in start_stats) and (field in end_stats):
+                delta = end_stats[field] - start_stats[field]
+                diff[field] = delta
+                diff[field + '_rate'] = (delta / duration) if duration > 0 else 0.0
+
+        return diff
+
     def get(self, field, format=False, suffix=""):
         if not field in self.latest_stats:
             return "N/A"
@@ -369,26 +489,22 @@ class CTRexStats(object):
             return format_num(self.latest_stats[field] - self.reference_stats[field], suffix)
 
     # get trend for a field
+    # use_raw - absolute change per snapshot (useful for CPU usage in % and etc.)
+    #           otherwise relative change in percent
     def get_trend (self, field, use_raw = False, percision = 10.0):
         if not field in self.latest_stats:
             return 0
 
         # not enough history - no trend
-        if len(self.history) < 5:
+        t = self.trends.get(field)
+        if (t is None) or (t[3] < self.TREND_MIN_STEPS):
             return 0
 
         # absolute value is too low 0 considered noise
         if self.latest_stats[field] < percision:
             return 0
-        
-        # must lock, deque is not thread-safe for iteration
-        with self.lock:
-            field_samples = [sample[field] for sample in self.history]
 
-        if use_raw:
-            return calculate_diff_raw(field_samples)
-        else:
-            return calculate_diff(field_samples)
+        return t[2] if use_raw else t[1]
 
 
     def get_trend_gui (self, field, show_value = False, use_raw = False, up_color = 'red', down_color = 'green'):
@@ -426,6 +542,9 @@ class CTRexStats(object):
 
 class CGlobalStats(CTRexStats):
 
+    COUNTERS = ['m_total_tx_pkts', 'm_total_rx_pkts', 'm_total_tx_bytes', 'm_total_rx_bytes',
+                'm_total_alloc_error', 'm_total_queue_full', 'm_total_queue_drop']
+
     def __init__(self, connection_info, server_version, ports_dict_ref):
         super(CGlobalStats, self).__init__()
         self.connection_info = connection_info
@@ -503,6 +622,8 @@ class CGlobalStats(CTRexStats):
 
 class CPortStats(CTRexStats):
 
+    COUNTERS = ['opackets', 'obytes', 'ipackets', 'ibytes', 'oerrors', 'ierrors']
+
     def __init__(self, port_obj):
         super(CPortStats, self).__init__()
         self._port_obj = port_obj
@@ -515,6 +636,25 @@ class CPortStats(CTRexStats):
             else:
                 target[k] = v
 
+    # trends - raw changes add up, relative changes are weighted by value
+    @staticmethod
+    def merge_trends (target, src):
+        for field, t in src.iteritems():
+            mine = target.get(field)
+            if mine is None:
+                target[field] = list(t)
+                continue
+
+            total = mine[0] + t[0]
+            if total > 0:
+                mine[1] = ((mine[1] * mine[0]) + (t[1] * t[0])) / total
+            else:
+                mine[1] = (mine[1] + t[1]) / 2
+
+            mine[0]  = total
+            mine[2] += t[2]
+            mine[3]  = min(mine[3], t[3])
+
 
     def __add__ (self, x):
         if not isinstance(x, CPortStats):
@@ -533,12 +673,7 @@ class CPortStats(CTRexStats):
             else:
                 self.__merge_dicts(self.reference_stats, x.reference_stats)
 
-        # history
-        if not self.history:
-            self.history = copy.deepcopy(x.history)
-        else:
-            for h1, h2 in zip(self.history, x.history):
-                self.__merge_dicts(h1, h2)
+        self.merge_trends(self.trends, x.trends)
 
         return self
 
@@ -585,6 +720,7 @@ class CPortStats(CTRexStats):
         else:
             state = format_text(state, 'bold')
 
+        counters = self.get_many(self.COUNTERS)
 
         return {"owner": self._port_obj.user if self._port_obj else "",
                 "state": "{0}".format(state),
@@ -614,27 +750,313 @@ class CPortStats(CTRexStats):
                 "Rx pps": u"{0} {1}".format(self.get_trend_gui("m_total_rx_pps", show_value = False),
                                             self.get("m_total_rx_pps", format = True, suffix = "pps")),
 
-                 "opackets" : self.get_rel("opackets"),
-                 "ipackets" : self.get_rel("ipackets"),
-                 "obytes"   : self.get_rel("obytes"),
-                 "ibytes"   : self.get_rel("ibytes"),
+                 "opackets" : counters["opackets"][0],
+                 "ipackets" : counters["ipackets"][0],
+                 "obytes"   : counters["obytes"][0],
+                 "ibytes"   : counters["ibytes"][0],
 
-                 "tx-bytes": self.get_rel("obytes", format = True, suffix = "B"),
-                 "rx-bytes": self.get_rel("ibytes", format = True, suffix = "B"),
-                 "tx-pkts": self.get_rel("opackets", format = True, suffix = "pkts"),
-                 "rx-pkts": self.get_rel("ipackets", format = True, suffix = "pkts"),
+                 "tx-bytes": counters["obytes"][1],
+                 "rx-bytes": counters["ibytes"][1],
+                 "tx-pkts": counters["opackets"][1],
+                 "rx-pkts": counters["ipackets"][1],
 
-                 "oerrors"  : format_num(self.get_rel("oerrors"),
+                 "oerrors"  : format_num(counters["oerrors"][0],
                                          compact = False,
-                                         opts = 'green' if (self.get_rel("oerrors")== 0) else 'red'),
+                                         opts = 'green' if (counters["oerrors"][0] == 0) else 'red'),
 
-                 "ierrors"  : format_num(self.get_rel("ierrors"),
+                 "ierrors"  : format_num(counters["ierrors"][0],
                                          compact = False,
-                                         opts = 'green' if (self.get_rel("ierrors")== 0) else 'red'),
+                                         opts = 'green' if (counters["ierrors"][0] == 0) else 'red'),
 
                 }
 
 
 
+# per stream RX stats - packet counters of streams with STLRxStats(user_id)
+# fed by the 'rx-stats' publish, indexed by (port_id, user_id)
+#
+# a snapshot replaces the whole index so readers never see a partial update.
+# rates are derived from the server timestamps of consecutive snapshots
+#
+# the server stops publishing once all its counters are zero (streams removed),
+# so a snapshot not followed by another within a few publish intervals is aged out
+class CRxStreamStats(object):
+
+    # publish intervals without a snapshot before the entries are aged out
+    AGE_INTERVALS = 3
+
+    # lower bound of the age in seconds - covers the delivery jitter of fast publishers
+    MIN_AGE = 1.0
+
+    def __init__ (self):
+        # (port_id, user_id) -> {'tx_pkts', 'rx_pkts', 'tx_pps', 'rx_pps'}
+        self.latest = {}
+
+        # (port_id, user_id) -> (tx_pkts, rx_pkts) at the last clear
+        self.reference = {}
+
+        # server time of the last snapshot and the interval to the one before it
+        self.last_ts  = None
+        self.interval = None
+
+        # local time the last snapshot arrived
+        self.last_update_ts = None
+
+
+    def update (self, data):
+        ts = data.get('ts')
+        ts = (float(ts['value']) / ts['freq']) if (ts and ts.get('freq')) else time.time()
+
+        latest = {}
+        for user_id, flow in data.get('flows', {}).iteritems():
+            user_id = int(user_id)
+            for direction in ('tx', 'rx'):
+                for port_id, value in flow.get(direction, {}).iteritems():
+                    key = (int(port_id), user_id)
+                    entry = latest.get(key)
+                    if entry is None:
+                        entry = latest[key] = {'tx_pkts': 0, 'rx_pkts': 0, 'tx_pps': 0.0, 'rx_pps': 0.0}
+
+                    entry[direction + '_pkts'] = value
+
+        # rates - counters that went back (stream re-added) count as 0
+        # no rates over a gap that aged the previous snapshot out
+        dt = (ts - self.last_ts) if self.last_ts != None else 0
+        if (dt > 0) and self.__current():
+            for key, entry in latest.iteritems():
+                prev = self.latest.get(key)
+                if prev:
+                    entry['tx_pps'] = max(0, entry['tx_pkts'] - prev['tx_pkts']) / dt
+                    entry['rx_pps'] = max(0, entry['rx_pkts'] - prev['rx_pkts']) / dt
+
+        if dt > 0:
+            self.interval = dt
+
+        # a stream that is gone or was re-added (counters went back) counts from 0 again
+        reference = {}
+        for key, (tx_ref, rx_ref) in self.reference.iteritems():
+            entry = latest.get(key)
+            if (entry is None) or (entry['tx_pkts'] < tx_ref) or (entry['rx_pkts'] < rx_ref):
+                continue
+
+            prev = self.latest.get(key)
+            if prev and ((entry['tx_pkts'] < prev['tx_pkts']) or (entry['rx_pkts'] < prev['rx_pkts'])):
+                continue
+
+            reference[key] = (tx_ref, rx_ref)
+
+        self.reference = reference
+        self.latest  = latest
+        self.last_ts = ts
+        self.last_update_ts = time.time()
+
+
+    # the last snapshot - empty once it aged out
+    def __current (self):
+        if self.last_update_ts is None:
+            return self.latest
+
+        age = max(self.AGE_INTERVALS * (self.interval or 0), self.MIN_AGE)
+        if (time.time() - self.last_update_ts) > age:
+            return {}
+
+        return self.latest
+
+
+    # counters become relative to now - for all ports or some
+    def clear (self, port_id_list = None):
+        reference = dict(self.reference)
+        for (port_id, user_id), entry in self.__current().iteritems():
+            if (port_id_list is None) or (port_id in port_id_list):
+                reference[(port_id, user_id)] = (entry['tx_pkts'], entry['rx_pkts'])
+
+        self.reference = reference
+
+
+    def get_keys (self):
+        return self.__current().keys()
+
+
+    # relative counters and rates of a stream on a port - None if not seen
+    def get (self, port_id, user_id):
+        return self.__relative(self.__current(), (port_id, user_id))
+
+
+    def __relative (self, latest, key):
+        entry = latest.get(key)
+        if entry is None:
+            return None
+
+        tx_ref, rx_ref = self.reference.get(key, (0, 0))
+        return {'tx_pkts': entry['tx_pkts'] - tx_ref,
+                'rx_pkts': entry['rx_pkts'] - rx_ref,
+                'tx_pps':  entry['tx_pps'],
+                'rx_pps':  entry['rx_pps']}
+
+
+    # user_id -> {'tx_pkts', 'rx_pkts', 'tx_pps', 'rx_pps'}, each a dict of port -> value
+    # with a 'total', and 'loss' - packets sent and not received (total)
+    def get_stats (self, user_ids = None):
+        output = {}
+        latest = self.__current()
+
+        for port_id, user_id in latest.keys():
+            if (user_ids != None) and (user_id not in user_ids):
+                continue
+
+            stream = output.get(user_id)
+            if stream is None:
+                stream = output[user_id] = dict((field, {'total': 0}) for field in ('tx_pkts', 'rx_pkts', 'tx_pps', 'rx_pps'))
+
+            for field, value in self.__relative(latest, (port_id, user_id)).iteritems():
+                stream[field][port_id] = value
+                stream[field]['total'] += value
+
+        for stream in output.values():
+            stream['loss'] = stream['tx_pkts']['total'] - stream['rx_pkts']['total']
+
+        return output
+
+
+# total, mean, min and max of every numeric field over a list of port stats
+# in a single pass - counters are relative to the last clear (like get_stats)
+def aggregate_port_stats (port_stats_list):
+    total  = {}
+    mins   = {}
+    maxs   = {}
+    counts = {}
+
+    get_format = CTRexStats.get_field_format
+
+    for port_stats in port_stats_list:
+        reference = port_stats.reference_stats
+
+        for field, value in port_stats.latest_stats.iteritems():
+            if not isinstance(value, (int, long, float)) or isinstance(value, bool):
+                continue
+
+            fmt = get_format(field)
+            if fmt and fmt[0]:
+                value -= reference.get(field, 0)
+
+            if field in total:
+                total[field] += value
+                counts[field] += 1
+                if value < mins[field]:
+                    mins[field] = value
+                if value > maxs[field]:
+                    maxs[field] = value
+            else:
+                total[field]  = value
+                counts[field] = 1
+                mins[field]   = value
+                maxs[field]   = value
+
+    mean = dict((field, float(value) / counts[field]) for field, value in total.iteritems())
+
+    return {'total': total, 'mean': mean, 'min': mins, 'max': maxs}
+
+
+# named groups of ports (e.g. the 'dir' sets of stl_map_ports)
+# the aggregate of a group is cached until one of its ports gets a new snapshot
+# or is cleared - repeated reads (TUI, exporter) do not recompute it
+class CPortStatsGroups(object):
+    def __init__ (self, ports_dict_ref):
+        self._ports_dict = ports_dict_ref
+        self.groups = {}
+        self.cache  = {}
+        self.lock   = threading.Lock()
+
+        # ports tuple -> (snapshots key, CPortStats) of the total columns
+        self.totals = {}
+
+
+    def set_group (self, name, ports):
+        with self.lock:
+            self.groups[name] = tuple(ports)
+            self.cache.pop(name, None)
+
+
+    def remove_group (self, name):
+        with self.lock:
+            self.groups.pop(name, None)
+            self.cache.pop(name, None)
+
+
+    def get_groups (self):
+        with self.lock:
+            return dict((name, list(ports)) for name, ports in self.groups.iteritems())
+
+
+    # aggregate of a named group or of a list of ports
+    def aggregate (self, group):
+        if isinstance(group, (list, tuple, set)):
+            return self.__aggregate(list(group))
+
+        with self.lock:
+            ports = self.groups.get(group)
+            cached = self.cache.get(group)
+
+        if ports is None:
+            raise KeyError(group)
+
+        port_stats = [self._ports_dict[port_id].port_stats for port_id in ports]
+
+        key = self.__key(port_stats)
+        if cached and self.__same(cached[0], key):
+            return cached[1]
+
+        output = self.__aggregate(ports, port_stats)
+
+        with self.lock:
+            if self.groups.get(group) == ports:
+                self.cache[group] = (key, output)
+
+        return output
+
+
+    # a stats object of the sum of 'ports' - for the total column of the ports table
+    # counters are already relative to the last clear of each port
+    def get_total_stats (self, ports):
+        ports = tuple(ports)
+        port_stats = [self._ports_dict[port_id].port_stats for port_id in ports]
+
+        key = self.__key(port_stats)
+        cached = self.totals.get(ports)
+        if cached and self.__same(cached[0], key):
+            return cached[1]
+
+        total = aggregate_port_stats(port_stats)['total']
+
+        # a plain stats object - history is not allocated
+        total_stats = CPortStats(None)
+        total_stats.latest_stats = total
+        total_stats.reference_stats = dict.fromkeys(total, 0)
+        for s in port_stats:
+            CPortStats.merge_trends(total_stats.trends, s.trends)
+
+        self.totals[ports] = (key, total_stats)
+        return total_stats
+
+
+    # snapshots are replaced on update and clear - identity tells if anything changed
+    @staticmethod
+    def __key (port_stats):
+        return [(s.latest_stats, s.reference_stats) for s in port_stats]
+
+    @staticmethod
+    def __same (key1, key2):
+        return all((a is c) and (b is d) for (a, b), (c, d) in zip(key1, key2))
+
+
+    def __aggregate (self, ports, port_stats = None):
+        if port_stats is None:
+            port_stats = [self._ports_dict[port_id].port_stats for port_id in ports]
+
+        output = aggregate_port_stats(port_stats)
+        output['ports'] = list(ports)
+        return output
+
+
 if __name__ == "__main__":
     pass
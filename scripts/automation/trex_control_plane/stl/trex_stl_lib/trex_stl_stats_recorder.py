@@ -0,0 +1,233 @@
+#!/router/bin/python
+
+from array import array
+import struct
+import json
+import mmap
+import os
+import time
+import threading
+
+# binary recording of async snapshots (trex-global, latency)
+#
+# one file per snapshot name - '<prefix>.<name>.trxs'
+#
+#   header : magic (4) | version (u16) | schema length (u32) | schema (JSON list of fields)
+#   record : 'ts', 'seq' and one double per schema field - fixed size
+#
+# the schema is taken from the first snapshot - nested dicts are flattened
+# to 'a.b' and non numeric values are dropped. later snapshots are mapped
+# to the schema - missing fields are NaN, new fields are not recorded
+#
+# snapshots are recorded as decoded - stats snapshots replaced by a newer one
+# before decoding (async client coalescing, see get_coalesced_count) are not
+# recorded. gaps show in the 'seq' column
+
+FILE_MAGIC   = 'TRXS'
+FILE_VERSION = 1
+FILE_HEADER  = struct.Struct('<4sHI')
+
+NAN = float('nan')
+
+DEFAULT_NAMES = ['trex-global', 'trex-latecny', 'trex-latecny-v2']
+
+
+# {'a': {'b': 1}, 'c': 'x'} -> {'a.b': 1}
+def flatten_snapshot (data, prefix = '', output = None):
+    if output is None:
+        output = {}
+
+    for key, value in data.iteritems():
+        if isinstance(value, dict):
+            flatten_snapshot(value, prefix + key + '.', output)
+        elif isinstance(value, (int, long, float)) and not isinstance(value, bool):
+            output[prefix + key] = value
+
+    return output
+
+
+def read_header (f):
+    raw = f.read(FILE_HEADER.size)
+    if len(raw) < FILE_HEADER.size:
+        return None
+
+    magic, version, size = FILE_HEADER.unpack(raw)
+    if (magic != FILE_MAGIC) or (version != FILE_VERSION):
+        return None
+
+    return json.loads(f.read(size))
+
+
+# appends records of a single snapshot name
+class CStatsFileWriter(object):
+    def __init__ (self, filename, fields):
+        self.filename = filename
+        self.fields   = fields
+        self.record   = struct.Struct('<{0}d'.format(len(fields) + 2))
+
+        exists = os.path.exists(filename) and (os.path.getsize(filename) > 0)
+
+        self.f = open(filename, 'ab')
+        if not exists:
+            schema = json.dumps(fields)
+            self.f.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, len(schema)) + schema)
+        else:
+            # drop a partial record left by a crash
+            header = FILE_HEADER.size + len(json.dumps(fields))
+            records = (os.path.getsize(filename) - header) // self.record.size
+            self.f.truncate(header + records * self.record.size)
+
+
+    def write (self, ts, seq, snapshot):
+        values = [snapshot.get(field, NAN) for field in self.fields]
+        self.f.write(self.record.pack(ts, seq, *values))
+
+
+    def close (self):
+        self.f.close()
+
+
+    # a file we can append to - same schema, otherwise a new numbered file
+    @staticmethod
+    def open (prefix, name, fields):
+        n = 0
+        while True:
+            filename = '{0}.{1}.trxs'.format(prefix, name) if n == 0 else '{0}.{1}.{2}.trxs'.format(prefix, name, n)
+            if not os.path.exists(filename):
+                break
+
+            with open(filename, 'rb') as f:
+                if read_header(f) == fields:
+                    break
+
+            n += 1
+
+        return CStatsFileWriter(filename, fields)
+
+
+# records snapshots passed by the async client
+class CStatsRecorder(object):
+    def __init__ (self, prefix, names = None):
+        self.prefix  = prefix
+        self.names   = set(names if names != None else DEFAULT_NAMES)
+        self.writers = {}
+        self.seq     = {}
+        self.lock    = threading.Lock()
+        self.active  = True
+
+
+    def record (self, name, msg):
+        if not name in self.names:
+            return
+
+        snapshot = flatten_snapshot(msg['data'])
+
+        with self.lock:
+            if not self.active:
+                return
+
+            writer = self.writers.get(name)
+            if writer is None:
+                writer = self.writers[name] = CStatsFileWriter.open(self.prefix, name, sorted(snapshot.keys()))
+
+            # servers that do not stamp snapshots get a local count
+            seq = msg.get('seq')
+            if seq is None:
+                seq = self.seq.get(name, 0) + 1
+            self.seq[name] = seq
+
+            writer.write(time.time(), seq, snapshot)
+
+
+    def get_files (self):
+        with self.lock:
+            return dict((name, writer.filename) for name, writer in self.writers.iteritems())
+
+
+    def close (self):
+        with self.lock:
+            self.active = False
+            for writer in self.writers.values():
+                writer.close()
+
+
+# memory mapped reader of a recording file
+# records are not loaded - indexing and column reads go to the mapping
+class CStatsFileReader(object):
+    def __init__ (self, filename):
+        self.filename = filename
+
+        self.f = open(filename, 'rb')
+        schema = read_header(self.f)
+        if schema is None:
+            self.f.close()
+            raise ValueError("'{0}' is not a stats recording".format(filename))
+
+        self.fields = ['ts', 'seq'] + schema
+        self.index  = dict((field, i) for i, field in enumerate(self.fields))
+        self.record = struct.Struct('<{0}d'.format(len(self.fields)))
+        self.offset = self.f.tell()
+
+        size = os.path.getsize(filename)
+        self.count = (size - self.offset) // self.record.size
+
+        self.mm = mmap.mmap(self.f.fileno(), 0, access = mmap.ACCESS_READ) if size > 0 else None
+
+
+    def close (self):
+        if self.mm:
+            self.mm.close()
+        self.f.close()
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, *args):
+        self.close()
+
+
+    def __len__ (self):
+        return self.count
+
+
+    def __getitem__ (self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in xrange(*i.indices(self.count))]
+
+        if i < 0:
+            i += self.count
+        if not (0 <= i < self.count):
+            raise IndexError(i)
+
+        return dict(zip(self.fields, self.record.unpack_from(self.mm, self.offset + i * self.record.size)))
+
+
+    # generator of the values of a field for records [start, stop)
+    # rows are read in chunks of 'chunk' records - memory does not grow with the range
+    def column (self, field, start = 0, stop = None, chunk = 4096):
+        start, stop, _ = slice(start, stop).indices(self.count)
+        index = self.index[field]
+        width = len(self.fields)
+
+        for first in xrange(start, stop, chunk):
+            last = min(first + chunk, stop)
+
+            rows = array('d')
+            rows.fromstring(self.mm[self.offset + first * self.record.size : self.offset + last * self.record.size])
+
+            for value in rows[index::width]:
+                yield value
+
+
+    # index of the first record with ts >= 'ts'
+    def find_ts (self, ts):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if struct.unpack_from('<d', self.mm, self.offset + mid * self.record.size)[0] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo
+
@@ -10,6 +10,7 @@ from dpkt import pcap
 import random
 import yaml
 import base64
+import json
 import string
 import traceback
 from types import NoneType
@@ -236,6 +237,9 @@ class STLStream(object):
         # this is heavy, calculate lazy
         self.packet_desc = None
 
+        # encoded JSON - calculate lazy
+        self.json_fragment = None
+
         if not rx_stats:
             self.fields['rx_stats'] = STLRxStats.defaults()
         else:
@@ -251,6 +255,14 @@ class STLStream(object):
     def to_json (self):
         return dict(self.fields)
 
+    # the stream JSON encoded without its enclosing braces
+    # encoded once - attaching the stream to many ports reuses it
+    def to_json_fragment (self):
+        if self.json_fragment == None:
+            self.json_fragment = json.dumps(self.fields)[1:-1]
+
+        return self.json_fragment
+
     def get_id (self):
         return self.id
 
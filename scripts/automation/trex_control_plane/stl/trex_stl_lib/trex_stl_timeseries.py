@@ -0,0 +1,311 @@
+#!/router/bin/python
+
+from array import array
+from collections import namedtuple
+import math
+
+NAN = float('nan')
+
+# columnar ring buffer of stats snapshots
+#
+# every numeric field gets a preallocated array of 'capacity' doubles
+# so memory is fixed (capacity * 8 bytes per field) no matter how long
+# the run is - the oldest samples are overwritten
+#
+# queries work on a time window (last 'seconds') and run on array
+# slices - sum / max / min / sorted are done in C
+class CTimeSeries(object):
+    def __init__ (self, capacity = 3600):
+        self.capacity = capacity
+        self.ts       = array('d', [0.0]) * capacity
+        self.columns  = {}
+
+        # next physical slot and number of valid samples
+        self.head  = 0
+        self.count = 0
+
+
+    # O(1) per field - called from the async thread
+    def append (self, ts, snapshot):
+        head = self.head
+        self.ts[head] = ts
+
+        columns = self.columns
+        updated = 0
+        for field, value in snapshot.iteritems():
+            if not isinstance(value, (int, long, float)) or isinstance(value, bool):
+                continue
+
+            column = columns.get(field)
+            if column is None:
+                # samples before the field appeared are NaN
+                column = columns[field] = array('d', [NAN]) * self.capacity
+
+            column[head] = value
+            updated += 1
+
+        # a field missing from this snapshot - don't leave an old sample in the slot
+        if updated < len(columns):
+            for field, column in columns.iteritems():
+                if not field in snapshot:
+                    column[head] = NAN
+
+        self.head  = (head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+
+    def clear (self):
+        self.columns = {}
+        self.head  = 0
+        self.count = 0
+
+
+    def __len__ (self):
+        return self.count
+
+
+    def get_fields (self):
+        return self.columns.keys()
+
+
+    # physical index of the logical sample 'i' (0 is the oldest)
+    def __index (self, i):
+        return (self.head - self.count + i) % self.capacity
+
+
+    # first logical sample with ts >= start - timestamps are increasing
+    def __find (self, start):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts[self.__index(mid)] < start:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo
+
+
+    # slice of a column (or the timestamps) for the logical range [first, count)
+    def __slice (self, column, first):
+        if first >= self.count:
+            return array('d')
+
+        begin = self.__index(first)
+        end   = self.head if self.head != 0 else self.capacity
+
+        if begin < end:
+            return column[begin:end]
+        else:
+            return column[begin:] + column[:end]
+
+
+    # (timestamps, values) of the last 'seconds' - all samples if None
+    def window (self, field, seconds = None):
+        column = self.columns.get(field)
+        if (column is None) or (self.count == 0):
+            return array('d'), array('d')
+
+        first = 0
+        if seconds != None:
+            last_ts = self.ts[self.__index(self.count - 1)]
+            first = self.__find(last_ts - seconds)
+
+        return self.__slice(self.ts, first), self.__slice(column, first)
+
+
+    def values (self, field, seconds = None):
+        values = self.window(field, seconds)[1]
+
+        # drop samples where the field was missing (NaN poisons the sum)
+        total = sum(values)
+        if total != total:
+            values = array('d', [v for v in values if v == v])
+
+        return values
+
+
+    def mean (self, field, seconds = None):
+        values = self.values(field, seconds)
+        return (sum(values) / len(values)) if values else None
+
+
+    def max (self, field, seconds = None):
+        values = self.values(field, seconds)
+        return max(values) if values else None
+
+
+    def min (self, field, seconds = None):
+        values = self.values(field, seconds)
+        return min(values) if values else None
+
+
+    # per second change of a counter over the window
+    def rate (self, field, seconds = None):
+        ts, values = self.window(field, seconds)
+        if len(values) < 2 or math.isnan(values[0]) or math.isnan(values[-1]) or (ts[-1] == ts[0]):
+            return None
+
+        return (values[-1] - values[0]) / (ts[-1] - ts[0])
+
+
+    # nearest rank percentile - p is 0 - 100
+    def percentile (self, field, p, seconds = None):
+        values = self.values(field, seconds)
+        if not values:
+            return None
+
+        values = sorted(values)
+        rank = int(math.ceil((p / 100.0) * len(values))) - 1
+        return values[max(0, min(rank, len(values) - 1))]
+
+
+# a pre-aggregated bucket of a rollup level
+CRollupBucket = namedtuple('CRollupBucket', ['ts', 'min', 'max', 'avg', 'last', 'count'])
+
+# one resolution of a rollup - a ring of 'capacity' buckets of 'resolution' seconds
+# each field keeps min / max / sum / last / count per bucket
+# closed buckets are folded into the next (coarser) level
+class CRollupLevel(object):
+    def __init__ (self, resolution, capacity, next_level = None):
+        self.resolution = resolution
+        self.capacity   = capacity
+        self.next_level = next_level
+
+        # bucket number held by each slot
+        self.buckets = array('d', [-1.0]) * capacity
+        self.current = None
+
+        # field -> (min, max, sum, last, count) arrays
+        self.fields = {}
+
+
+    def __new_field (self):
+        return (array('d', [NAN]) * self.capacity,
+                array('d', [NAN]) * self.capacity,
+                array('d', [0.0]) * self.capacity,
+                array('d', [NAN]) * self.capacity,
+                array('L', [0]) * self.capacity)
+
+
+    # samples - field -> (min, max, sum, last, count)
+    def add (self, ts, samples):
+        bucket = int(ts // self.resolution)
+
+        # the newest bucket is closed - pass it down
+        if (self.current != None) and (bucket > self.current):
+            if self.next_level:
+                self.next_level.add(self.current * self.resolution, self.get_bucket(self.current))
+
+        if (self.current == None) or (bucket > self.current):
+            self.current = bucket
+
+        slot = bucket % self.capacity
+        new = (self.buckets[slot] != bucket)
+        if new:
+            self.buckets[slot] = bucket
+
+        fields = self.fields
+        for field, (mn, mx, sm, last, count) in samples.iteritems():
+            f = fields.get(field)
+            if f is None:
+                f = fields[field] = self.__new_field()
+
+            mins, maxs, sums, lasts, counts = f
+            if new or (counts[slot] == 0):
+                mins[slot]   = mn
+                maxs[slot]   = mx
+                sums[slot]   = sm
+                counts[slot] = count
+            else:
+                if mn < mins[slot]:
+                    mins[slot] = mn
+                if mx > maxs[slot]:
+                    maxs[slot] = mx
+                sums[slot]   += sm
+                counts[slot] += count
+
+            lasts[slot] = last
+
+        # evicted slot - clear fields that did not get a sample
+        if new and (len(samples) < len(fields)):
+            for field, f in fields.iteritems():
+                if not field in samples:
+                    f[4][slot] = 0
+
+
+    # field -> (min, max, sum, last, count) of a bucket
+    def get_bucket (self, bucket):
+        slot = bucket % self.capacity
+        if self.buckets[slot] != bucket:
+            return {}
+
+        return dict((field, (mins[slot], maxs[slot], sums[slot], lasts[slot], counts[slot]))
+                    for field, (mins, maxs, sums, lasts, counts) in self.fields.iteritems()
+                    if counts[slot] > 0)
+
+
+    # buckets of a field in time order - the newest one may still be open
+    def series (self, field, seconds = None):
+        f = self.fields.get(field)
+        if (f is None) or (self.current == None):
+            return []
+
+        mins, maxs, sums, lasts, counts = f
+
+        first = self.current - self.capacity + 1
+        if seconds != None:
+            first = max(first, self.current - int(seconds // self.resolution))
+
+        output = []
+        for bucket in xrange(first, self.current + 1):
+            slot = bucket % self.capacity
+            if (self.buckets[slot] == bucket) and (counts[slot] > 0):
+                output.append(CRollupBucket(bucket * self.resolution, mins[slot], maxs[slot], sums[slot] / counts[slot], lasts[slot], int(counts[slot])))
+
+        return output
+
+
+# multi resolution rollups of stats snapshots - fixed memory
+# a snapshot updates the finest level only, coarser levels are fed
+# when a finer bucket closes
+class CStatsRollup(object):
+    # (resolution in seconds, buckets) - 2 minutes of 1s, 1 hour of 10s, 24 hours of 1m, 3 days of 10m
+    LEVELS = [(1, 120), (10, 360), (60, 1440), (600, 432)]
+
+    # the default levels cut to cover 'seconds' - memory follows the history kept
+    @staticmethod
+    def get_levels (seconds):
+        return [(resolution, min(capacity, int(math.ceil(float(seconds) / resolution))))
+                for resolution, capacity in CStatsRollup.LEVELS]
+
+    def __init__ (self, levels = None):
+        self.levels = []
+
+        next_level = None
+        for resolution, capacity in reversed(levels or self.LEVELS):
+            next_level = CRollupLevel(resolution, capacity, next_level)
+            self.levels.insert(0, next_level)
+
+
+    def append (self, ts, snapshot):
+        samples = {}
+        for field, value in snapshot.iteritems():
+            if isinstance(value, (int, long, float)) and not isinstance(value, bool):
+                samples[field] = (value, value, value, value, 1)
+
+        self.levels[0].add(ts, samples)
+
+
+    def get_resolutions (self):
+        return [level.resolution for level in self.levels]
+
+
+    # buckets of 'resolution' seconds covering the last 'seconds'
+    def get_series (self, field, resolution, seconds = None):
+        for level in self.levels:
+            if level.resolution == resolution:
+                return level.series(field, seconds)
+
+        raise ValueError("no rollup of {0} seconds - resolutions are {1}".format(resolution, self.get_resolutions()))
+
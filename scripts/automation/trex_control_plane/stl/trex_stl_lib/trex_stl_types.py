@@ -57,6 +57,10 @@ class RC():
     def __iter__(self):
         return self.rc_list.__iter__()
 
+    # break a compound RC (such as a batch response) to a list of single RCs
+    def split (self):
+        return [RC(x.rc, x.data, x.is_warn) for x in self.rc_list]
+
 
     def prn_func (self, msg, newline = True):
         if newline:
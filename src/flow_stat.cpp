@@ -571,21 +571,25 @@ int CFlowStatRuleMgr::stop_stream(const TrexStream * stream) {
 }
 
 // return false if no counters changed since last run. true otherwise
-bool CFlowStatRuleMgr::dump_json(std::string & json) {
+/*
+ * per user id counters for the "rx-stats" publish
+ *
+ * data: {"ts":    {"value": <hr ticks>, "freq": <hr ticks per sec>},
+ *        "flows": {"<user id>": {"rx": {"<port>": <pkts>}, "tx": {"<port>": <pkts>}}}}
+ */
+bool CFlowStatRuleMgr::dump_json(Json::Value &data) {
     uint64_t stats[TREX_FDIR_STAT_SIZE];
-    Json::FastWriter writer;
-    Json::Value root;
     bool ret = false;
 
     if (! m_api ) {
         return false;
     }
-    root["name"] = "rx-stats";
-    root["type"] = 0;
-    Json::Value &data_section = root["data"];
+
+    data = Json::objectValue;
 
     // read hw counters, and update
-    data_section["timestamp"] = Json::Value::UInt64(os_get_hr_tick_64());
+    data["ts"]["value"] = Json::Value::UInt64(os_get_hr_tick_64());
+    data["ts"]["freq"] = Json::Value::UInt64(os_get_hr_freq());
     for (uint8_t port = 0; port < m_num_ports; port++) {
         int rc = m_api->get_rx_stats(port, stats, -1, false);
         if (rc == -1) {
@@ -601,6 +605,9 @@ bool CFlowStatRuleMgr::dump_json(std::string & json) {
     }
 
     // build json report
+    Json::Value &flows = data["flows"];
+    flows = Json::objectValue;
+
     flow_stat_user_id_map_it_t it;
     for (it = m_user_id_map.begin(); it != m_user_id_map.end(); it++) {
         CFlowStatUserIdInfo *user_id_info = it->second;
@@ -611,13 +618,12 @@ bool CFlowStatRuleMgr::dump_json(std::string & json) {
             if ((user_id_info->get_tx_counter(port) != 0) || (user_id_info->get_rx_counter(port) != 0)) {
                 std::string str_port = static_cast<std::ostringstream*>( &(std::ostringstream()
                                                                            << port) )->str();
-                data_section[str_user_id]["rx"][str_port] = Json::Value::UInt64(user_id_info->get_rx_counter(port));
-                data_section[str_user_id]["tx"][str_port] = Json::Value::UInt64(user_id_info->get_tx_counter(port));
+                flows[str_user_id]["rx"][str_port] = Json::Value::UInt64(user_id_info->get_rx_counter(port));
+                flows[str_user_id]["tx"][str_port] = Json::Value::UInt64(user_id_info->get_tx_counter(port));
                 ret = true;
             }
         }
     }
 
-    json = writer.write(root);
     return ret;
 }
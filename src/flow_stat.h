@@ -24,6 +24,7 @@
 #include <stdio.h>
 #include <string>
 #include <map>
+#include <json/json.h>
 #include "trex_defs.h"
 
 #define MAX_FLOW_STATS 128
@@ -123,7 +124,7 @@ class CFlowStatRuleMgr {
     int del_stream(const TrexStream * stream);
     int start_stream(TrexStream * stream);
     int stop_stream(const TrexStream * stream);
-    bool dump_json(std::string & json);
+    bool dump_json(Json::Value &data);
 
  private:
     int compile_stream(const TrexStream * stream, Cxl710Parser &parser);
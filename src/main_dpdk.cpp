@@ -2360,7 +2360,7 @@ public:
 public:
     void Dump(FILE *fd,DumpFormat mode);
     void DumpAllPorts(FILE *fd);
-    void dump_json(std::string & json);
+    void dump_json(std::string & json, uint64_t seq);
 private:
     std::string get_field(std::string name,float &f);
     std::string get_field(std::string name,uint64_t &f);
@@ -2394,8 +2394,11 @@ std::string CGlobalStats::get_field_port(int port,std::string name,uint64_t &f){
 }
 
 
-void CGlobalStats::dump_json(std::string & json){
-    json="{\"name\":\"trex-global\",\"type\":0,\"data\":{";
+/* seq - increasing snapshot number , ts - server time of the snapshot */
+void CGlobalStats::dump_json(std::string & json, uint64_t seq){
+    char buff[200];
+    sprintf(buff,"{\"name\":\"trex-global\",\"type\":0,\"seq\":%llu,\"ts\":%.6f,\"data\":{", (unsigned long long)seq, now_sec());
+    json=buff;
 
     #define GET_FIELD(f) get_field(std::string(#f),f)
     #define GET_FIELD_PORT(p,f) get_field_port(p,std::string(#f),lp->f)
@@ -2625,6 +2628,7 @@ public:
        m_expected_cps=0.0;
        m_expected_bps=0.0;
        m_trex_stateless = NULL;
+       m_publish_seq=0;
     }
 
     bool Create();
@@ -2729,6 +2733,7 @@ private:
     CLatencyPktInfo     m_latency_pkt;
     TrexPublisher       m_zmq_publisher;
     CGlobalStats        m_stats;
+    uint64_t            m_publish_seq;  /* trex-global snapshot number */
 
 public:
     TrexStateless       *m_trex_stateless;
@@ -3572,7 +3577,7 @@ void
 CGlobalTRex::publish_async_data() {
      std::string json;
 
-     m_stats.dump_json(json);
+     m_stats.dump_json(json, ++m_publish_seq);
      m_zmq_publisher.publish_json(json);
 
      /* generator json , all cores are the same just sample the first one */
@@ -3599,8 +3604,9 @@ CGlobalTRex::publish_async_data() {
      m_zmq_publisher.publish_json(json);
 
      if (get_is_stateless()) {
-         if (m_trex_stateless->m_rx_flow_stat.dump_json(json))
-             m_zmq_publisher.publish_json(json);
+         Json::Value rx_stats;
+         if (m_trex_stateless->m_rx_flow_stat.dump_json(rx_stats))
+             m_zmq_publisher.publish_topic("rx-stats", 0, rx_stats);
      }
 }
 
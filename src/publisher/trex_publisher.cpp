@@ -80,32 +80,34 @@ TrexPublisher::publish_json(const std::string &s){
     }
 }
 
+/**
+ * publish a JSON message with the name (topic) first
+ * subscribers can filter by the prefix {"name":"<name>"
+ * 
+ */
 void
-TrexPublisher::publish_event(event_type_e type, const Json::Value &data) {
+TrexPublisher::publish_topic(const std::string &name, uint32_t type, const Json::Value &data) {
     Json::FastWriter writer;
-    Json::Value value;
-    std::string s;
-    
-    value["name"] = "trex-event";
-    value["type"] = type;
-    value["data"] = data;
-
-    s = writer.write(value);
-    publish_json(s);
+    std::stringstream ss;
+
+    /* FastWriter sorts the keys - so the envelope is written by hand */
+    std::string s = writer.write(data);
+    if (!s.empty() && (s[s.size() - 1] == '\n')) {
+        s.erase(s.size() - 1);
+    }
+
+    ss << "{\"name\":\"" << name << "\",\"type\":" << type << ",\"data\":" << s << "}\n";
+    publish_json(ss.str());
+}
+
+void
+TrexPublisher::publish_event(event_type_e type, const Json::Value &data) {
+    publish_topic("trex-event", type, data);
 }
 
 void
 TrexPublisher::publish_barrier(uint32_t key) {
-    Json::FastWriter writer;
-    Json::Value value;
-    std::string s;
-    
-    value["name"] = "trex-barrier";
-    value["type"] = key;
-    value["data"] = Json::objectValue;
-
-    s = writer.write(value);
-    publish_json(s);
+    publish_topic("trex-barrier", key, Json::objectValue);
 }
 
 
@@ -67,6 +67,13 @@ public:
      */
     virtual void publish_barrier(uint32_t key);
 
+    /**
+     * publishes a JSON message starting with {"name":"<name>"
+     * (the topic subscribers filter on)
+     * 
+     */
+    virtual void publish_topic(const std::string &name, uint32_t type, const Json::Value &data);
+
 private:
     void show_zmq_last_error(const std::string &err);
 private:
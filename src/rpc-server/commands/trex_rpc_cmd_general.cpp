@@ -24,6 +24,7 @@ limitations under the License.
 #include <trex_stateless.h>
 #include <trex_stateless_port.h>
 #include <trex_rpc_cmds_table.h>
+#include <trex_rpc_zip.h>
 
 #include <internal_api/trex_platform_api.h>
 
@@ -91,6 +92,10 @@ TrexRpcCmdGetVersion::_run(const Json::Value &params, Json::Value &result) {
 
     #endif
 
+    /* payload codecs accepted by the server */
+    section["codecs"] = Json::arrayValue;
+    section["codecs"].append(TrexRpcZip::get_codec_name());
+
     return (TREX_RPC_CMD_OK);
 }
 
@@ -25,6 +25,7 @@ limitations under the License.
 #include <trex_stateless_port.h>
 #include <trex_streams_compiler.h>
 #include <common/base64.h>
+#include <zlib.h>
 #include <iostream>
 #include <memory>
 
@@ -588,6 +589,8 @@ TrexRpcCmdStopTraffic::_run(const Json::Value &params, Json::Value &result) {
 /***************************
  * get all streams
  * 
+ * with 'get_pkt' false the packet is replaced
+ * by its length and a CRC32 of its content
  **************************/
 trex_rpc_cmd_rc_e
 TrexRpcCmdGetAllStreams::_run(const Json::Value &params, Json::Value &result) {
@@ -595,6 +598,9 @@ TrexRpcCmdGetAllStreams::_run(const Json::Value &params, Json::Value &result) {
     uint8_t port_id = parse_port(params, result);
     TrexStatelessPort *port = get_stateless_obj()->get_port_by_id(port_id);
 
+    /* optional - older clients do not send it */
+    bool get_pkt = parse_bool(params, "get_pkt", result, true);
+
     std::vector <TrexStream *> streams;
     port->get_object_list(streams);
 
@@ -602,6 +608,11 @@ TrexRpcCmdGetAllStreams::_run(const Json::Value &params, Json::Value &result) {
     for (auto stream : streams) {
 
         Json::Value j = stream->get_stream_json();
+        if (!get_pkt) {
+            j.removeMember("packet");
+            j["packet_info"]["len"]   = stream->m_pkt.len;
+            j["packet_info"]["crc32"] = Json::Value::UInt(crc32(0, stream->m_pkt.binary, stream->m_pkt.len));
+        }
 
         std::stringstream ss;
         ss << stream->m_stream_id;
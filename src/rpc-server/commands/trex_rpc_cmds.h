@@ -47,6 +47,17 @@ class TrexStream;
 
 #define TREX_RPC_CMD_DEFINE(class_name, cmd_name, param_count, needs_ownership) TREX_RPC_CMD_DEFINE_EXTENDED(class_name, cmd_name, param_count, needs_ownership, ;)
 
+/**
+ * a command with optional params - they may be omitted
+ */
+#define TREX_RPC_CMD_DEFINE_OPT(class_name, cmd_name, param_count, opt_param_count, needs_ownership)         \
+    class class_name : public TrexRpcCommand {                                                            \
+    public:                                                                                               \
+        class_name () : TrexRpcCommand(cmd_name, param_count, needs_ownership, opt_param_count) {}        \
+    protected:                                                                                            \
+        virtual trex_rpc_cmd_rc_e _run(const Json::Value &params, Json::Value &result);                   \
+    }
+
 /**
  * test cmds
  */
@@ -107,7 +118,7 @@ void parse_vm_instr_write_mask_flow_var(const Json::Value &inst, std::unique_ptr
 
 
 TREX_RPC_CMD_DEFINE(TrexRpcCmdGetStreamList, "get_stream_list", 1, false);
-TREX_RPC_CMD_DEFINE(TrexRpcCmdGetAllStreams, "get_all_streams", 1, false);
+TREX_RPC_CMD_DEFINE_OPT(TrexRpcCmdGetAllStreams, "get_all_streams", 1, 1, false);
 
 TREX_RPC_CMD_DEFINE(TrexRpcCmdGetStream, "get_stream", 3, false);
 
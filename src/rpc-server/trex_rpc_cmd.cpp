@@ -30,7 +30,7 @@ TrexRpcCommand::run(const Json::Value &params, Json::Value &result) {
     /* the internal run can throw a parser error / other error */
     try {
 
-        check_param_count(params, m_param_count, result);
+        check_param_count(params, m_param_count, m_opt_param_count, result);
 
         if (m_needs_ownership && !g_test_override_ownership) {
             verify_ownership(params, result);
@@ -47,11 +47,15 @@ TrexRpcCommand::run(const Json::Value &params, Json::Value &result) {
 }
 
 void 
-TrexRpcCommand::check_param_count(const Json::Value &params, int expected, Json::Value &result) {
+TrexRpcCommand::check_param_count(const Json::Value &params, int expected, int optional, Json::Value &result) {
 
-    if (params.size() != expected) {
+    if ( (params.size() < expected) || (params.size() > expected + optional) ) {
         std::stringstream ss;
-        ss << "method expects '" << expected << "' paramteres, '" << params.size() << "' provided";
+        ss << "method expects '" << expected;
+        if (optional > 0) {
+            ss << "' to '" << (expected + optional);
+        }
+        ss << "' paramteres, '" << params.size() << "' provided";
         generate_parse_err(result, ss.str());
     }
 }
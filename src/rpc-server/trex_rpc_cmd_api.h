@@ -67,10 +67,13 @@ public:
 
     /**
      * method name and params
+     * 
+     * 'opt_param_count' params may be omitted (parsed with a default)
      */
-    TrexRpcCommand(const std::string &method_name, int param_count, bool needs_ownership) : 
+    TrexRpcCommand(const std::string &method_name, int param_count, bool needs_ownership, int opt_param_count = 0) : 
                                                                     m_name(method_name),
                                                                     m_param_count(param_count),
+                                                                    m_opt_param_count(opt_param_count),
                                                                     m_needs_ownership(needs_ownership) {
 
         /* if needs ownership - another field is needed (handler) */
@@ -126,9 +129,9 @@ protected:
     virtual trex_rpc_cmd_rc_e _run(const Json::Value &params, Json::Value &result) = 0;
 
     /**
-     * check param count
+     * check param count - 'expected' up to 'expected + optional'
      */
-    void check_param_count(const Json::Value &params, int expected, Json::Value &result);
+    void check_param_count(const Json::Value &params, int expected, int optional, Json::Value &result);
 
     /**
      * verify ownership
@@ -362,6 +365,7 @@ protected:
     /* RPC command name */
     std::string   m_name;
     int           m_param_count;
+    int           m_opt_param_count;
     bool          m_needs_ownership;
 
     static bool   g_test_override_ownership;
@@ -41,6 +41,14 @@ public:
      */
     static bool compress(const std::string &input, std::string &output);
 
+    /**
+     * codec name as advertised to clients
+     * (any zlib compression level is accepted)
+     */
+    static const char *get_codec_name() {
+        return "zlib";
+    }
+
 private:
 
     /**